@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark for the ElevenLabs Lambda
+Measures module init + first client creation in fresh subprocesses
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parent
+
+# Runs inside a fresh interpreter: import the handler module, then build the
+# clients the first invocation would need, timing both phases.
+INIT_SCRIPT = """
+import json, time
+started = time.perf_counter()
+import eleven_labs_lambda as handler
+imported = time.perf_counter()
+if {touch_clients}:
+    handler.get_client('dynamodb')
+    handler.get_client('s3')
+ready = time.perf_counter()
+print(json.dumps({{
+    'import_ms': (imported - started) * 1000,
+    'first_invoke_ms': (ready - imported) * 1000,
+    'total_ms': (ready - started) * 1000,
+    'profile': handler.cold_start_report(),
+}}))
+"""
+
+def parse_importtime(stderr, top=10):
+    """Return the slowest modules (cumulative us) from -X importtime output"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        try:
+            _, self_us, cumulative_us, name = [p.strip() for p in line[len("import time:"):].split("|")]
+            rows.append((int(cumulative_us), name.strip()))
+        except ValueError:
+            continue
+    rows.sort(reverse=True)
+    return rows[:top]
+
+def run_once(mode, touch_clients, importtime=False):
+    env = dict(os.environ)
+    env["COLD_START_MODE"] = mode
+    env.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+    cmd = [sys.executable]
+    if importtime:
+        cmd += ["-X", "importtime"]
+    cmd += ["-c", INIT_SCRIPT.format(touch_clients=touch_clients)]
+    result = subprocess.run(cmd, cwd=REPO_DIR, env=env, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1]), result.stderr
+
+def summarize(samples, field):
+    values = [s[field] for s in samples]
+    return {
+        "median": round(statistics.median(values), 2),
+        "min": round(min(values), 2),
+        "max": round(max(values), 2),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Lambda cold-start init")
+    parser.add_argument("--runs", type=int, default=10, help="Fresh interpreters per mode")
+    parser.add_argument("--modes", nargs="+", default=["lazy", "eager"], help="COLD_START_MODE values to compare")
+    parser.add_argument("--no-clients", action="store_true", help="Only measure module import")
+    args = parser.parse_args()
+
+    report = {}
+    for mode in args.modes:
+        samples = [run_once(mode, not args.no_clients)[0] for _ in range(args.runs)]
+        _, stderr = run_once(mode, not args.no_clients, importtime=True)
+        report[mode] = {
+            "import_ms": summarize(samples, "import_ms"),
+            "first_invoke_ms": summarize(samples, "first_invoke_ms"),
+            "total_ms": summarize(samples, "total_ms"),
+            "profile": samples[-1]["profile"],
+            "slowest_imports_us": parse_importtime(stderr),
+        }
+        print(f"🧊 {mode}: import {report[mode]['import_ms']['median']} ms, "
+              f"first invoke {report[mode]['first_invoke_ms']['median']} ms, "
+              f"total {report[mode]['total_ms']['median']} ms (median of {args.runs})")
+
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Worker-count benchmark for webhook_server.py
+Starts the server with each --workers value in a scratch directory (no AWS), drives it with
+signed post_call_transcription webhooks from parallel client processes and reports throughput
+and latency percentiles per worker count
+"""
+import argparse
+import http.client
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import webhook_signature
+
+REPO_DIR = Path(__file__).resolve().parent
+BENCH_SECRET = "bench-secret"
+signer = webhook_signature.SignatureVerifier(BENCH_SECRET)
+
+def build_payload(turns):
+    """A unique webhook body (new conversation_id, so dedup never short-circuits) with `turns` transcript turns"""
+    conversation_id = f"bench_{uuid.uuid4().hex}"
+    transcript = [
+        {'role': 'agent' if i % 2 else 'user', 'message': f"Turn {i}: there is smoke coming from the building on Main Street."}
+        for i in range(turns)
+    ]
+    return json.dumps({
+        'type': 'post_call_transcription',
+        'event_timestamp': int(time.time()),
+        'data': {
+            'agent_id': 'bench',
+            'conversation_id': conversation_id,
+            'status': 'done',
+            'transcript': transcript,
+            'metadata': {'call_duration_secs': 60},
+            'analysis': {
+                'transcript_summary': 'Benchmark call',
+                'call_successful': 'success',
+                'data_collection_results': {
+                    'emergency_type': {'value': 'fire'},
+                    'location': {'value': '100 Main St'},
+                    'latitude': {'value': 36.16},
+                    'longitude': {'value': -86.78},
+                    'severity': {'value': 'high'}
+                }
+            }
+        }
+    }, separators=(',', ':')).encode('utf-8')
+
+def run_client(port, requests, turns):
+    """One client process: keep-alive POSTs, returns (latencies in ms, errors)"""
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    latencies, errors = [], 0
+    for _ in range(requests):
+        body = build_payload(turns)
+        headers = {'Content-Type': 'application/json', 'elevenlabs-signature': signer.sign(body)}
+        started = time.perf_counter()
+        try:
+            conn.request("POST", "/elevenlabs-webhook", body=body, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            if response.status != 200:
+                errors += 1
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            conn.close()
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+            continue
+        latencies.append((time.perf_counter() - started) * 1000)
+    conn.close()
+    return latencies, errors
+
+def wait_ready(port, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/")
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Server on port {port} did not start")
+
+def percentile(ordered, pct):
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))], 2) if ordered else None
+
+def run_workers(workers, args):
+    scratch = tempfile.mkdtemp(prefix="webhook-bench-")
+    env = dict(os.environ)
+    # No AWS writes and a known secret; empty values also stop .env from filling them in
+    env.update({
+        "AWS_ACCESS_KEY_ID": "",
+        "AWS_SECRET_ACCESS_KEY": "",
+        "ELEVENLABS_WEBHOOK_SECRET": BENCH_SECRET,
+        "PYTHONPATH": str(REPO_DIR),
+    })
+    server = subprocess.Popen(
+        [sys.executable, str(REPO_DIR / "webhook_server.py"), "--host", "127.0.0.1",
+         "--port", str(args.port), "--workers", str(workers)],
+        cwd=scratch, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_ready(args.port)
+        per_client = args.requests // args.concurrency
+        started = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=args.concurrency) as pool:
+            results = list(pool.map(run_client, [args.port] * args.concurrency,
+                                    [per_client] * args.concurrency, [args.turns] * args.concurrency))
+        elapsed = time.perf_counter() - started
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    latencies = sorted(ms for client, _ in results for ms in client)
+    errors = sum(e for _, e in results)
+    return {
+        "workers": workers,
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "secs": round(elapsed, 2),
+        "requests_per_sec": round(len(latencies) / elapsed, 1),
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark webhook_server.py throughput by worker count")
+    parser.add_argument("--workers", nargs="+", type=int, default=[1, 2, 4], help="Worker counts to compare")
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per worker count")
+    parser.add_argument("--concurrency", type=int, default=16, help="Parallel client processes")
+    parser.add_argument("--turns", type=int, default=20, help="Transcript turns per payload")
+    parser.add_argument("--port", type=int, default=8765, help="Port for the benchmark server")
+    args = parser.parse_args()
+
+    report = []
+    for workers in args.workers:
+        result = run_workers(workers, args)
+        report.append(result)
+        print(f"⚙️  {workers} worker(s): {result['requests_per_sec']} req/s, p50 {result['p50_ms']} ms, "
+              f"p99 {result['p99_ms']} ms, {result['errors']} errors")
+
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+"""
+Compressed, content-addressed archival of raw call payloads in S3
+
+Payloads are stored under calls/{conversation_id}/{sha256}.json.{zst|gz}, keyed
+by the hash of the raw webhook body, so a redelivered webhook maps onto the
+object that is already there instead of adding a new one. ArchiveBatcher
+packs many calls into one object for high-volume ingest.
+"""
+import gzip
+import hashlib
+import json
+import os
+import struct
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+try:
+    import zstandard
+except ImportError:  # gzip fallback
+    zstandard = None
+
+ARCHIVE_PREFIX = 'calls'
+ARCHIVE_CODEC = os.environ.get('ARCHIVE_CODEC', 'zstd' if zstandard else 'gzip')
+
+# Content-Encoding value -> object key suffix
+EXTENSIONS = {
+    'zstd': '.zst',
+    'gzip': '.gz',
+    'identity': '',
+}
+
+_zstd_compressor = None
+_zstd_decompressor = None
+
+def compress(raw, codec=None):
+    """Compress raw payload bytes, returning (body, content_encoding)"""
+    codec = codec or ARCHIVE_CODEC
+    if codec == 'zstd':
+        if zstandard is None:
+            raise RuntimeError("ARCHIVE_CODEC=zstd requires the zstandard package")
+        global _zstd_compressor
+        if _zstd_compressor is None:
+            _zstd_compressor = zstandard.ZstdCompressor(level=3)
+        return _zstd_compressor.compress(raw), 'zstd'
+    if codec == 'gzip':
+        # mtime=0 keeps the output byte-identical for identical payloads
+        return gzip.compress(raw, compresslevel=6, mtime=0), 'gzip'
+    return raw, 'identity'
+
+def decompress(body, content_encoding):
+    """Inverse of compress(); unknown or empty encodings pass through"""
+    if content_encoding == 'zstd':
+        global _zstd_decompressor
+        if _zstd_decompressor is None:
+            _zstd_decompressor = zstandard.ZstdDecompressor()
+        # Frames written by compress() carry their content size
+        return _zstd_decompressor.decompress(body)
+    if content_encoding == 'gzip':
+        return gzip.decompress(body)
+    return body
+
+def encoding_for_key(key):
+    """Infer the Content-Encoding of an archived object from its key"""
+    if key.endswith('.zst'):
+        return 'zstd'
+    if key.endswith('.gz'):
+        return 'gzip'
+    return 'identity'
+
+def payload_digest(raw):
+    return hashlib.sha256(raw).hexdigest()
+
+def archive_key(conversation_id, raw, content_encoding):
+    """Content-addressed key for a raw payload"""
+    return f"{ARCHIVE_PREFIX}/{conversation_id}/{payload_digest(raw)}.json{EXTENSIONS[content_encoding]}"
+
+def archive_payload(s3_client, bucket, conversation_id, raw, codec=None):
+    """
+    Compress and upload a raw webhook body
+    Returns the object key; re-archiving identical bytes rewrites the same key
+    """
+    body, content_encoding = compress(raw, codec)
+    key = archive_key(conversation_id, raw, content_encoding)
+    s3_client.put_object(
+        Bucket=bucket,
+        Key=key,
+        Body=body,
+        ContentType='application/json',
+        ContentEncoding=content_encoding,
+        Metadata={
+            'sha256': payload_digest(raw),
+            'raw-length': str(len(raw)),
+        }
+    )
+    return key
+
+def read_payload(s3_client, bucket, key):
+    """Download an archived payload and return the raw JSON bytes"""
+    obj = s3_client.get_object(Bucket=bucket, Key=key)
+    content_encoding = obj.get('ContentEncoding') or encoding_for_key(key)
+    return decompress(obj['Body'].read(), content_encoding)
+
+# --- Batched archival -------------------------------------------------------
+#
+# A pack object is a run of framed records followed by a footer:
+#
+#   [uint32 length][compressed payload] ... [JSON index][uint32 index length][b'CPK1']
+#
+# Each payload is compressed on its own, so one call can be fetched with a
+# ranged GET of (offset, length) from the index without reading the pack.
+
+BATCH_PREFIX = 'batches'
+PACK_MAGIC = b'CPK1'
+_FRAME = struct.Struct('>I')
+_TRAILER = struct.Struct('>I4s')
+
+def build_pack(records, codec=None):
+    """
+    Pack (conversation_id, raw) pairs into one object body
+    Returns (body, index) where index entries carry each payload's byte range
+    """
+    chunks = []
+    index = []
+    offset = 0
+    for conversation_id, raw in records:
+        body, content_encoding = compress(raw, codec)
+        chunks.append(_FRAME.pack(len(body)))
+        offset += _FRAME.size
+        chunks.append(body)
+        index.append({
+            'conversation_id': conversation_id,
+            'sha256': payload_digest(raw),
+            'offset': offset,
+            'length': len(body),
+            'content_encoding': content_encoding,
+        })
+        offset += len(body)
+    footer = json.dumps(index, separators=(',', ':')).encode('utf-8')
+    chunks.append(footer)
+    chunks.append(_TRAILER.pack(len(footer), PACK_MAGIC))
+    return b''.join(chunks), index
+
+def read_pack_index(body):
+    """Parse the footer index of a pack object body"""
+    footer_length, magic = _TRAILER.unpack(body[-_TRAILER.size:])
+    if magic != PACK_MAGIC:
+        raise ValueError("Not a call archive pack")
+    footer_end = len(body) - _TRAILER.size
+    return json.loads(body[footer_end - footer_length:footer_end])
+
+def iter_pack(body):
+    """Yield (index_entry, raw_payload) for every record in a pack object body"""
+    for entry in read_pack_index(body):
+        start = entry['offset']
+        yield entry, decompress(body[start:start + entry['length']], entry['content_encoding'])
+
+def read_packed_payload(s3_client, bucket, key, offset, length, content_encoding):
+    """Fetch one call out of a pack object with a ranged GET"""
+    obj = s3_client.get_object(Bucket=bucket, Key=key, Range=f"bytes={offset}-{offset + length - 1}")
+    return decompress(obj['Body'].read(), content_encoding)
+
+def pack_key():
+    now = datetime.now(timezone.utc)
+    return f"{BATCH_PREFIX}/{now.strftime('%Y/%m/%d')}/{now.strftime('%H%M%S')}-{uuid.uuid4().hex}.pack"
+
+class ArchiveBatcher:
+    """
+    Buffers raw payloads and writes them to S3 as one pack object once
+    max_items are queued or the oldest has waited max_wait_ms.
+
+    on_flush(key, entries) is called after each upload; every entry is the
+    pack index entry plus the `context` passed to add(), so callers can record
+    where each call landed (e.g. its DynamoDB key).
+
+    When a pack upload fails, every call in it is archived on its own with
+    archive_payload() and on_fallback(key, context) is called for each.
+    Calls that can't be written either way are counted in `dropped` and kept
+    in `unwritten`, which close() returns.
+    """
+
+    def __init__(self, s3_client, bucket, max_items=100, max_wait_ms=500, on_flush=None, codec=None,
+                 on_fallback=None):
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.max_items = max_items
+        self.max_wait = max_wait_ms / 1000
+        self.on_flush = on_flush
+        self.on_fallback = on_fallback
+        self.codec = codec
+        self.dropped = 0
+        self.unwritten = []
+        self._pending = []
+        self._digests = set()
+        self._oldest = None
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='archive-batcher', daemon=True)
+        self._thread.start()
+
+    def add(self, conversation_id, raw, context=None):
+        """Queue a payload; identical bytes already in the buffer are skipped"""
+        digest = payload_digest(raw)
+        batch = None
+        with self._lock:
+            if digest in self._digests:
+                return
+            self._digests.add(digest)
+            if not self._pending:
+                self._oldest = time.monotonic()
+                self._wakeup.set()
+            self._pending.append((conversation_id, raw, context))
+            if len(self._pending) >= self.max_items:
+                batch = self._take()
+        if batch:
+            self._write(batch)
+
+    def flush(self):
+        """Write whatever is buffered now"""
+        with self._lock:
+            batch = self._take()
+        if batch:
+            self._write(batch)
+
+    def close(self):
+        """Write what is buffered; returns (conversation_id, context) for every call never archived"""
+        self._closed = True
+        self._wakeup.set()
+        self._thread.join()
+        self.flush()
+        with self._lock:
+            unwritten = list(self.unwritten)
+        if unwritten:
+            print(f"❌ S3: {len(unwritten)} calls were never archived: "
+                  f"{', '.join(str(conversation_id) for conversation_id, _ in unwritten[:20])}")
+        return unwritten
+
+    def _take(self):
+        batch = self._pending
+        self._pending = []
+        self._digests = set()
+        self._oldest = None
+        return batch
+
+    def _run(self):
+        while not self._closed:
+            self._wakeup.wait()
+            with self._lock:
+                oldest = self._oldest
+                if oldest is None:
+                    self._wakeup.clear()
+                    continue
+            remaining = oldest + self.max_wait - time.monotonic()
+            if remaining > 0:
+                time.sleep(remaining)
+                continue
+            self.flush()
+
+    def _write(self, batch):
+        body, index = build_pack([(conversation_id, raw) for conversation_id, raw, _ in batch], self.codec)
+        key = pack_key()
+        try:
+            self.s3_client.put_object(
+                Bucket=self.bucket,
+                Key=key,
+                Body=body,
+                ContentType='application/octet-stream',
+                Metadata={'records': str(len(index))}
+            )
+        except Exception as e:
+            print(f"❌ S3 pack upload failed ({len(batch)} calls), archiving them one by one: {e}")
+            self._write_each(batch)
+            return
+        print(f"✅ S3: Packed {len(batch)} calls into s3://{self.bucket}/{key} ({len(body)} bytes)")
+        if self.on_flush:
+            entries = [dict(entry, context=context) for entry, (_, _, context) in zip(index, batch)]
+            try:
+                self.on_flush(key, entries)
+            except Exception as e:
+                print(f"❌ Pack index callback failed for {key}: {e}")
+
+    def _write_each(self, batch):
+        """Fallback for a failed pack: one archive_payload() object per call"""
+        failed = []
+        for conversation_id, raw, context in batch:
+            try:
+                key = archive_payload(self.s3_client, self.bucket, conversation_id, raw, self.codec)
+            except Exception as e:
+                print(f"❌ S3 upload failed for {conversation_id}: {e}")
+                failed.append((conversation_id, context))
+                continue
+            if self.on_fallback:
+                try:
+                    self.on_fallback(key, context)
+                except Exception as e:
+                    print(f"❌ Archive location callback failed for {key}: {e}")
+        if failed:
+            with self._lock:
+                self.dropped += len(failed)
+                self.unwritten.extend(failed)
+                dropped = self.dropped
+            print(f"❌ S3: dropped {len(failed)} calls ({dropped} unrecoverable so far)")
@@ -4,6 +4,8 @@ from pathlib import Path
 from datetime import datetime
 from typing import List, Dict, Any
 
+import webhook_log
+
 class CallDataProcessor:
     """
     Process and analyze ElevenLabs call data
@@ -13,6 +15,10 @@ class CallDataProcessor:
         self.data_dir = Path(data_dir)
         self.data_dir.mkdir(exist_ok=True)
 
+    def _load_calls(self) -> List[Dict[str, Any]]:
+        """Records from every server worker's log segment"""
+        return list(webhook_log.iter_events(self.data_dir, key=None))
+
     def export_to_csv(self, output_file: str = None) -> str:
         """
         Export all call data to CSV format
@@ -20,14 +26,10 @@ class CallDataProcessor:
         if output_file is None:
             output_file = f"call_summaries_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
 
-        log_file = self.data_dir / "webhook_log.jsonl"
-        if not log_file.exists():
+        if not webhook_log.segment_paths(self.data_dir):
             raise FileNotFoundError("No webhook data found")
 
-        calls = []
-        with open(log_file, "r") as f:
-            for line in f:
-                calls.append(json.loads(line.strip()))
+        calls = self._load_calls()
 
         if not calls:
             raise ValueError("No call data to export")
@@ -73,14 +75,10 @@ class CallDataProcessor:
         """
         Get basic statistics about received calls
         """
-        log_file = self.data_dir / "webhook_log.jsonl"
-        if not log_file.exists():
+        if not webhook_log.segment_paths(self.data_dir):
             return {"error": "No webhook data found"}
 
-        calls = []
-        with open(log_file, "r") as f:
-            for line in f:
-                calls.append(json.loads(line.strip()))
+        calls = self._load_calls()
 
         if not calls:
             return {"error": "No call data available"}
@@ -119,28 +117,21 @@ class CallDataProcessor:
         """
         Search calls by summary or transcript content
         """
-        log_file = self.data_dir / "webhook_log.jsonl"
-        if not log_file.exists():
-            return []
-
         matching_calls = []
         query_lower = query.lower()
 
-        with open(log_file, "r") as f:
-            for line in f:
-                call = json.loads(line.strip())
-
-                # Search in summary and transcript
-                summary = call.get("summary", "").lower()
-                transcript = call.get("transcript", "").lower()
-
-                if query_lower in summary or query_lower in transcript:
-                    matching_calls.append({
-                        "conversation_id": call.get("conversation_id"),
-                        "timestamp": call.get("webhook_received_at"),
-                        "summary": call.get("summary"),
-                        "relevance_score": summary.count(query_lower) + transcript.count(query_lower)
-                    })
+        for call in webhook_log.iter_events(self.data_dir, key=None):
+            # Search in summary and transcript
+            summary = call.get("summary", "").lower()
+            transcript = call.get("transcript", "").lower()
+
+            if query_lower in summary or query_lower in transcript:
+                matching_calls.append({
+                    "conversation_id": call.get("conversation_id"),
+                    "timestamp": call.get("webhook_received_at"),
+                    "summary": call.get("summary"),
+                    "relevance_score": summary.count(query_lower) + transcript.count(query_lower)
+                })
 
         # Sort by relevance
         matching_calls.sort(key=lambda x: x["relevance_score"], reverse=True)
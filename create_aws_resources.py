@@ -17,6 +17,7 @@ AWS_SECRET_KEY = os.getenv("AWS_SECRET_ACCESS_KEY")
 AWS_SESSION_TOKEN = os.getenv("AWS_SESSION_TOKEN")
 DYNAMODB_TABLE = os.getenv("DYNAMODB_TABLE_NAME")
 S3_BUCKET = os.getenv("S3_BUCKET_NAME")
+IDEMPOTENCY_TABLE = os.getenv("IDEMPOTENCY_TABLE")
 
 print("="*80)
 print("🏗️  CREATING AWS RESOURCES")
@@ -132,6 +133,45 @@ except ClientError as e:
         print(f"❌ Failed to create bucket: {e}")
         exit(1)
 
+# Step 3: Create Idempotency Table (optional)
+if IDEMPOTENCY_TABLE:
+    print("\n📋 STEP 3: Creating Idempotency Table")
+    print("-" * 80)
+
+    try:
+        print(f"Creating table: {IDEMPOTENCY_TABLE}")
+        dynamodb.create_table(
+            TableName=IDEMPOTENCY_TABLE,
+            KeySchema=[
+                {
+                    'AttributeName': 'idempotency_key',
+                    'KeyType': 'HASH'
+                }
+            ],
+            AttributeDefinitions=[
+                {
+                    'AttributeName': 'idempotency_key',
+                    'AttributeType': 'S'
+                }
+            ],
+            BillingMode='PAY_PER_REQUEST'
+        )
+        dynamodb.get_waiter('table_exists').wait(TableName=IDEMPOTENCY_TABLE)
+
+        # Expired claims are removed by DynamoDB TTL
+        dynamodb.update_time_to_live(
+            TableName=IDEMPOTENCY_TABLE,
+            TimeToLiveSpecification={'Enabled': True, 'AttributeName': 'expires_at'}
+        )
+        print(f"✅ Table is now ACTIVE with TTL on 'expires_at'!")
+
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ResourceInUseException':
+            print(f"⚠️  Table '{IDEMPOTENCY_TABLE}' already exists!")
+        else:
+            print(f"❌ Failed to create idempotency table: {e}")
+            exit(1)
+
 # Summary
 print("\n" + "="*80)
 print("✅ AWS RESOURCES CREATED SUCCESSFULLY!")
@@ -143,5 +183,9 @@ print(f"   - Billing: Pay-per-request")
 print(f"\nS3 Bucket: {S3_BUCKET}")
 print(f"   - Region: {AWS_REGION}")
 print(f"   - Versioning: Enabled")
+if IDEMPOTENCY_TABLE:
+    print(f"\nIdempotency Table: {IDEMPOTENCY_TABLE}")
+    print(f"   - Primary Key: idempotency_key (String)")
+    print(f"   - TTL: expires_at")
 print(f"\n✅ Ready to integrate with webhook_server.py!")
 print("="*80)
\ No newline at end of file
@@ -5,6 +5,7 @@ export async function GET(request: NextRequest) {
     const { searchParams } = new URL(request.url);
     const numCalls = searchParams.get('num_calls') || '50';
     const scenario = searchParams.get('scenario') || 'nashville_tornado';
+    const shards = searchParams.get('shards');
     
         // Call Amazon API directly
         const response = await fetch('https://v2y08vmfga.execute-api.us-east-1.amazonaws.com/simulate', {
@@ -15,7 +16,8 @@ export async function GET(request: NextRequest) {
           },
           body: JSON.stringify({
             num_calls: parseInt(numCalls),
-            scenario: scenario
+            scenario: scenario,
+            ...(shards ? { shards: parseInt(shards) } : {})
           })
         });
 
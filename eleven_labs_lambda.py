@@ -1,90 +1,86 @@
+import time
+
+_INIT_STARTED = time.perf_counter()
+
 import json
-import boto3
 import os
-import hmac
-from hashlib import sha256
-import time
+import traceback
 from datetime import datetime
-from decimal import Decimal
 
-# Initialize AWS clients
-dynamodb = boto3.resource('dynamodb')
-s3_client = boto3.client('s3')
+import call_archive
+import geocoding
+import idempotency
+import replay_guard
+import webhook_codec
+import webhook_signature
 
 # Environment variables (set in Lambda configuration)
 DYNAMODB_TABLE = os.environ.get('DYNAMODB_TABLE', 'elevenlabs-call-data')
 S3_BUCKET = os.environ.get('S3_BUCKET', 'elevenlabs-webhooks')
-WEBHOOK_SECRET = os.environ.get('WEBHOOK_SECRET', '')
-OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY', '')
+WEBHOOK_SECRET = os.environ.get('WEBHOOK_SECRET', '')  # comma-separated while rotating: new,old
+
+# Cold-start mode: 'lazy' defers boto3 and client creation to first use so
+# every scale-out pays only for what the invocation actually touches.
+# 'eager' builds the clients during init, which suits provisioned concurrency
+# where init time is already paid for.
+COLD_START_MODE = os.environ.get('COLD_START_MODE', 'lazy')
+COLD_START_PROFILE = os.environ.get('COLD_START_PROFILE', '') == '1'
+
+# Init timings in milliseconds, reported by cold_start_report()
+_INIT_PROFILE = {}
+_clients = {}
+_is_cold = True
+
+def _record_init(phase, started):
+    _INIT_PROFILE[phase] = round((time.perf_counter() - started) * 1000, 2)
+
+def get_client(service):
+    """Return a cached low-level boto3 client, creating it on first use"""
+    client = _clients.get(service)
+    if client is None:
+        started = time.perf_counter()
+        import boto3
+        if 'boto3_import' not in _INIT_PROFILE:
+            _record_init('boto3_import', started)
+        client_started = time.perf_counter()
+        client = boto3.client(service)
+        _record_init(f'{service}_client', client_started)
+        _clients[service] = client
+    return client
+
+# Keyed HMAC state built once per container, copied per request
+signature_verifier = webhook_signature.SignatureVerifier(WEBHOOK_SECRET)
+# Accepted (timestamp, signature) nonces, shared across containers via DynamoDB
+nonce_guard = replay_guard.ReplayGuard(client=lambda: get_client('dynamodb'))
+
+# Duplicate deliveries short-circuit here before any geocoding or writes
+ingest_guard = idempotency.IdempotencyGuard(client=lambda: get_client('dynamodb'))
+
+# Geocoding backend (GEOCODER_BACKEND: AWS Location when LOCATION_INDEX is set, else GPT),
+# cache, in-flight lookups and connections all live for the container
+geocoder = geocoding.GeocodingService(geocoding.make_geocoder())
+
+def cold_start_report():
+    """Return init timings (ms) collected since the module was imported"""
+    return dict(_INIT_PROFILE)
 
 def geocode_location(location_text):
     """
-    Geocode a location string to lat/lon using OpenAI GPT
+    Geocode a location string to lat/lon with the configured backend
     Returns (latitude, longitude) or (0.0, 0.0) if failed
 
-    Always assumes Nashville, TN for this project
-    Uses GPT to determine precise coordinates based on location knowledge
+    Always assumes Nashville, TN for this project. Lookups are cached per
+    container and concurrent lookups of the same address share one request.
     """
     if not location_text or location_text == 'unknown':
         print("⚠️  No location text to geocode")
         return 0.0, 0.0
 
-    if not OPENAI_API_KEY:
-        print("⚠️  OpenAI API key not configured")
+    if not geocoder.backend.enabled:
+        print(f"⚠️  Geocoder '{geocoder.backend.name}' not configured (LOCATION_INDEX / OPENAI_API_KEY)")
         return 0.0, 0.0
 
-    try:
-        import urllib.request
-
-        # Always append Nashville, TN for context
-        search_text = f"{location_text}, Nashville, TN"
-        print(f"🤖 Using GPT to geocode: '{search_text}'")
-
-        # Prepare OpenAI API request
-        prompt = f"""You are a precise geocoding system. Given an address, return ONLY the exact latitude and longitude coordinates in JSON format.
-
-Address: {search_text}
-
-Return the coordinates as a JSON object with this exact format:
-{{"latitude": <number>, "longitude": <number>}}
-
-Be as precise as possible. For Nashville, TN addresses, use your knowledge of the city's geography to determine the most accurate coordinates. Do not include any explanation, only the JSON."""
-
-        payload = {
-            "model": "gpt-4o",
-            "messages": [
-                {"role": "system", "content": "You are a precise geocoding API that returns coordinates in JSON format only."},
-                {"role": "user", "content": prompt}
-            ],
-            "response_format": {"type": "json_object"},
-            "temperature": 0
-        }
-
-        req = urllib.request.Request(
-            'https://api.openai.com/v1/chat/completions',
-            data=json.dumps(payload).encode('utf-8'),
-            headers={
-                'Content-Type': 'application/json',
-                'Authorization': f'Bearer {OPENAI_API_KEY}'
-            }
-        )
-
-        with urllib.request.urlopen(req, timeout=10) as response:
-            result = json.loads(response.read().decode())
-
-        # Parse GPT response
-        coords_json = json.loads(result['choices'][0]['message']['content'])
-        latitude = float(coords_json['latitude'])
-        longitude = float(coords_json['longitude'])
-
-        print(f"✅ GPT geocoded '{search_text}' → lat: {latitude}, lon: {longitude}")
-        return latitude, longitude
-
-    except Exception as e:
-        print(f"❌ GPT geocoding error: {e}")
-        import traceback
-        traceback.print_exc()
-        return 0.0, 0.0
+    return geocoder.geocode(location_text)
 
 def extract_metadata_from_elevenlabs(analysis):
     """Extract metadata from ElevenLabs data_collection_results"""
@@ -117,71 +113,74 @@ def extract_metadata_from_elevenlabs(analysis):
     return metadata
 
 def verify_signature(body, signature_header):
-    """Verify ElevenLabs webhook signature"""
-    if not WEBHOOK_SECRET or not signature_header:
-        return True  # Skip verification if not configured
-    
+    """
+    Verify the ElevenLabs webhook signature over the raw body bytes and
+    claim its nonce. Returns (status, nonce): status is 'ok', 'replayed' or
+    'invalid', nonce the claimed (timestamp, signature) or None. Replays of
+    an accepted request are caught before the body is hashed.
+    """
+    if not signature_verifier.enabled:
+        return 'ok', None  # Skip verification if not configured
     try:
-        # Parse signature header
-        parts = signature_header.split(",")
-        timestamp = None
-        signature = None
-        
-        for part in parts:
-            if part.startswith("t="):
-                timestamp = part[2:]
-            elif part.startswith("v0="):
-                signature = part
-        
-        if not timestamp or not signature:
-            return False
-        
-        # Check timestamp (within 30 minutes)
-        req_timestamp = int(timestamp) * 1000
-        tolerance = int(time.time() * 1000) - (30 * 60 * 1000)
-        if req_timestamp <= tolerance:
-            print("Signature timestamp too old")
-            return False
-        
-        # Verify signature
-        message = f"{timestamp}.{body}"
-        expected_digest = 'v0=' + hmac.new(
-            key=WEBHOOK_SECRET.encode("utf-8"),
-            msg=message.encode("utf-8"),
-            digestmod=sha256
-        ).hexdigest()
-        
-        return hmac.compare_digest(signature, expected_digest)
-        
-    except Exception as e:
-        print(f"Signature verification error: {e}")
-        return False
+        pending = signature_verifier.start(signature_header)
+    except webhook_signature.SignatureError as e:
+        print(f"Signature rejected: {e.reason}")
+        return 'invalid', None
+    if nonce_guard.seen(pending.timestamp, pending.signatures):
+        return 'replayed', None
+    pending.update(body)
+    if not pending.matches():
+        print("Signature rejected: invalid")
+        return 'invalid', None
+    if not nonce_guard.claim(pending.timestamp, pending.matched):
+        return 'replayed', None
+    return 'ok', (pending.timestamp, pending.matched)
+
+def release_delivery(dedup_key, nonce):
+    """Forget a delivery's dedup key and replay nonce so the sender's retry gets through"""
+    ingest_guard.release(dedup_key)
+    if nonce:
+        nonce_guard.release(*nonce)
+
+def _string_attr(value):
+    """String attribute; null stays NULL as the resource serializer stored it"""
+    return {'NULL': True} if value is None else {'S': str(value)}
+
+def _number_attr(value):
+    return {'NULL': True} if value is None else {'N': str(value)}
+
+def build_dynamodb_item(conversation_id, timestamp, call_data, analysis, metadata):
+    """
+    Build the call item directly in DynamoDB wire format ({'S': ...}, {'N': ...})
+    so the low-level client can write it without the resource layer's serializer
+    """
+    item = {
+        'conversation_id': {'S': str(conversation_id)},
+        'timestamp': {'N': str(int(timestamp))},
+        'agent_id': _string_attr(call_data.get('agent_id', '')),
+        'summary': _string_attr(analysis.get('transcript_summary', '')),
+        'call_successful': _string_attr(analysis.get('call_successful', '')),
+        'duration_secs': _number_attr((call_data.get('metadata') or {}).get('call_duration_secs', 0)),
+        'transcript_length': {'N': str(len(call_data.get('transcript') or []))},
+        'created_at': {'S': datetime.now().isoformat()}
+    }
+
+    # Add extracted metadata
+    if metadata:
+        item['emergency_type'] = _string_attr(metadata.get('emergency_type', 'unknown'))
+        item['location'] = _string_attr(metadata.get('location', 'unknown'))
+        latitude, longitude = metadata.get('latitude', 0.0), metadata.get('longitude', 0.0)
+        item['latitude'] = _number_attr(None if latitude is None else float(latitude))
+        item['longitude'] = _number_attr(None if longitude is None else float(longitude))
+        item['severity'] = _string_attr(metadata.get('severity', 'unknown'))
+
+    return item
 
 def save_to_dynamodb(conversation_id, timestamp, call_data, analysis, metadata):
     """Save call data to DynamoDB"""
     try:
-        table = dynamodb.Table(DYNAMODB_TABLE)
-        
-        item = {
-            'conversation_id': conversation_id,
-            'timestamp': int(timestamp),
-            'agent_id': call_data.get('agent_id', ''),
-            'summary': analysis.get('transcript_summary', ''),
-            'call_successful': analysis.get('call_successful', ''),
-            'duration_secs': call_data.get('metadata', {}).get('call_duration_secs', 0),
-            'transcript_length': len(call_data.get('transcript', [])),
-            'created_at': datetime.now().isoformat()
-        }
-        
-        # Add extracted metadata
-        if metadata:
-            item['emergency_type'] = metadata.get('emergency_type', 'unknown')
-            item['location'] = metadata.get('location', 'unknown')
-            item['latitude'] = Decimal(str(metadata.get('latitude', 0.0)))
-            item['longitude'] = Decimal(str(metadata.get('longitude', 0.0)))
-            item['severity'] = metadata.get('severity', 'unknown')
-        
-        table.put_item(Item=item)
+        item = build_dynamodb_item(conversation_id, timestamp, call_data, analysis, metadata)
+        get_client('dynamodb').put_item(TableName=DYNAMODB_TABLE, Item=item)
         print(f"✅ Saved to DynamoDB: {conversation_id}")
         return True
         
@@ -189,37 +188,17 @@ def save_to_dynamodb(conversation_id, timestamp, call_data, analysis, metadata):
         print(f"❌ DynamoDB error: {e}")
         return False
 
-def save_to_s3(conversation_id, data):
-    """Save full call data to S3"""
+def save_to_s3(conversation_id, data, raw_body=None):
+    """
+    Archive full call data to S3, compressed under a content-hash key
+    When the original request bytes are given they are archived as-is,
+    skipping the decode/re-encode round trip
+    """
     try:
-        s3_key = f"calls/{conversation_id}/{conversation_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-
-        # Convert to JSON string
-        json_data = json.dumps(data, indent=2, default=str)
-
-        print(f"\n📝 Writing object to S3: s3://{S3_BUCKET}/{s3_key}...")
-        s3_client.put_object(
-            Bucket=S3_BUCKET,
-            Key=s3_key,
-            Body=json_data,
-            ContentType='application/json'
-        )
-
-        # Read it back to verify
-        try:
-            obj = s3_client.get_object(Bucket=S3_BUCKET, Key=s3_key)
-            content = obj['Body'].read().decode('utf-8')
-            # Basic check: ensure content contains a known field from the data
-            if 'conversation_id' in content or 'test' in content or conversation_id in content:
-                print(f"✅ Successfully wrote and verified S3 object: s3://{S3_BUCKET}/{s3_key}")
-                return True
-            else:
-                print(f"⚠️  Wrote to S3 but verification failed (content mismatch)")
-                return False
-
-        except Exception as e:
-            print(f"❌ S3 verification read error: {e}")
-            return False
+        raw = raw_body if raw_body is not None else webhook_codec.dumps(data)
+        s3_key = call_archive.archive_payload(get_client('s3'), S3_BUCKET, conversation_id, raw)
+        print(f"✅ Archived to S3: s3://{S3_BUCKET}/{s3_key}")
+        return True
 
     except Exception as e:
         print(f"❌ S3 error: {e}")
@@ -237,6 +216,12 @@ def lambda_handler(event, context):
     }
     """
     
+    global _is_cold
+    if _is_cold:
+        _is_cold = False
+        if COLD_START_PROFILE:
+            print(f"🧊 Cold start profile (ms): {json.dumps(cold_start_report())}")
+
     print(f"🚨 Webhook received at {datetime.now().isoformat()}")
     print(f"Event keys: {list(event.keys())}")
     
@@ -253,43 +238,73 @@ def lambda_handler(event, context):
         headers = {k.lower(): v for k, v in event.get('headers', {}).items()}
         signature_header = headers.get('elevenlabs-signature', '')
         
-        # Verify signature
-        if WEBHOOK_SECRET and not verify_signature(body, signature_header):
+        # Verify signature (stale or malformed headers are rejected before hashing)
+        raw_body = webhook_codec.to_bytes(body)
+        signature_status, nonce = verify_signature(raw_body, signature_header)
+        if signature_status == 'invalid':
             print("❌ Signature verification failed")
             return {
                 'statusCode': 401,
                 'body': json.dumps({'error': 'Invalid signature'})
             }
+        if signature_status == 'replayed':
+            print("🔁 Replayed request ignored")
+            return {
+                'statusCode': 200,
+                'body': json.dumps({'status': 'ignored', 'reason': 'replayed'})
+            }
         
-        # Parse JSON
-        data = json.loads(body)
-        event_type = data.get('type', 'UNKNOWN')
+        # Read the routing fields without decoding the transcript
+        fields = webhook_codec.extract_fields(raw_body)
+        event_type = fields['type'] or 'UNKNOWN'
         
         print(f"📞 Event type: {event_type}")
         
         # Process post_call_transcription events
         if event_type == 'post_call_transcription':
-            call_data = data.get('data', {})
-            conversation_id = call_data.get('conversation_id', 'unknown')
-            event_timestamp = data.get('event_timestamp', int(time.time()))
-            analysis = call_data.get('analysis', {})
-            
-            print(f"📋 Processing call: {conversation_id}")
-            
-            # Extract metadata
-            metadata = extract_metadata_from_elevenlabs(analysis)
-            
-            # Save to DynamoDB
-            dynamodb_success = save_to_dynamodb(
-                conversation_id=conversation_id,
-                timestamp=event_timestamp,
-                call_data=call_data,
-                analysis=analysis,
-                metadata=metadata
+            dedup_key = idempotency.idempotency_key(
+                fields['conversation_id'], fields['event_timestamp'], signature_header
             )
-            
-            # Save to S3
-            s3_success = save_to_s3(conversation_id=conversation_id, data=data)
+            if not ingest_guard.claim(dedup_key):
+                print(f"🔁 Duplicate delivery ignored: {fields['conversation_id']}")
+                return {
+                    'statusCode': 200,
+                    'body': json.dumps({
+                        'status': 'duplicate',
+                        'conversation_id': fields['conversation_id']
+                    })
+                }
+
+            try:
+                data = webhook_codec.loads(raw_body)
+                call_data = data.get('data', {})
+                conversation_id = call_data.get('conversation_id', 'unknown')
+                event_timestamp = data.get('event_timestamp', int(time.time()))
+                analysis = call_data.get('analysis', {})
+
+                print(f"📋 Processing call: {conversation_id}")
+
+                # Extract metadata
+                metadata = extract_metadata_from_elevenlabs(analysis)
+
+                # Save to DynamoDB
+                dynamodb_success = save_to_dynamodb(
+                    conversation_id=conversation_id,
+                    timestamp=event_timestamp,
+                    call_data=call_data,
+                    analysis=analysis,
+                    metadata=metadata
+                )
+
+                # Save to S3
+                s3_success = save_to_s3(conversation_id=conversation_id, data=data, raw_body=raw_body)
+            except Exception:
+                release_delivery(dedup_key, nonce)
+                raise
+
+            # Let the sender's retry through if the call never reached the dashboard table
+            if not dynamodb_success:
+                release_delivery(dedup_key, nonce)
             
             return {
                 'statusCode': 200,
@@ -324,7 +339,6 @@ def lambda_handler(event, context):
     
     except Exception as e:
         print(f"❌ Unexpected error: {e}")
-        import traceback
         traceback.print_exc()
         
         return {
@@ -332,6 +346,12 @@ def lambda_handler(event, context):
             'body': json.dumps({'error': str(e)})
         }
 
+if COLD_START_MODE == 'eager':
+    get_client('dynamodb')
+    get_client('s3')
+
+_record_init('module_init', _INIT_STARTED)
+
 # For local testing
 if __name__ == "__main__":
     # Test event
@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+Export archived calls from S3 as fine-tuning JSONL
+
+Reads raw ElevenLabs payloads from the call archive (calls/... objects and,
+optionally, batches/... packs), converts each transcript into the
+{"messages": [...]} format fine_tune_911.py trains on, drops repeat
+conversations and writes sharded JSONL. The key space is split into ranges
+that are listed in parallel, downloads run concurrently, and a checkpoint
+records the last exported key of every range so an interrupted run resumes
+where it stopped. Per-call keys aren't time-ordered, so a finished run
+clears those positions: the next run re-lists (cheap) but only downloads
+objects of conversations it hasn't exported yet. Pack keys carry the time
+the pack was built, but packs from several workers can be uploaded after a
+later-named one was listed, so the pack range resumes PACK_RESUME_BACKOFF_SECS
+behind its last key and relies on the conversation dedup for the overlap.
+
+    python export_training_data.py --output-dir exports
+    python fineTunedAIModel/fine_tune_911.py --data_file "exports/*.jsonl"
+"""
+import argparse
+import json
+import os
+import string
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import boto3
+from botocore.config import Config
+from dotenv import load_dotenv
+
+import call_archive
+import webhook_codec
+
+load_dotenv()
+
+AWS_REGION = os.getenv("AWS_REGION")
+S3_BUCKET = os.getenv("S3_BUCKET_NAME") or os.getenv("S3_BUCKET")
+
+# Range boundaries are this alphabet appended to the keys' shared prefix
+SPLIT_ALPHABET = sorted(string.digits + string.ascii_letters)
+PACKS_RANGE = 'packs'
+# How far behind the last exported pack a resumed run starts listing again
+PACK_RESUME_BACKOFF_SECS = int(os.getenv("PACK_RESUME_BACKOFF_SECS", "900"))
+
+ROLES = {'agent': 'assistant', 'user': 'user'}
+
+def transcript_to_messages(transcript):
+    """
+    ElevenLabs transcript turns -> chat messages: agent turns become
+    assistant, empty turns are dropped and consecutive turns from the same
+    speaker are merged
+    """
+    messages = []
+    for turn in transcript or []:
+        role = ROLES.get(turn.get('role'))
+        content = (turn.get('message') or '').strip()
+        if not role or not content:
+            continue
+        if messages and messages[-1]['role'] == role:
+            messages[-1]['content'] += ' ' + content
+        else:
+            messages.append({'role': role, 'content': content})
+    return messages
+
+def payload_to_example(raw, min_turns=2):
+    """Training example for a raw webhook payload, or None if it has no usable transcript"""
+    try:
+        payload = webhook_codec.loads(raw)
+    except ValueError:
+        return None
+    if payload.get('type') != 'post_call_transcription':
+        return None
+    data = payload.get('data') or {}
+    messages = transcript_to_messages(data.get('transcript'))
+    roles = {m['role'] for m in messages}
+    if len(messages) < min_turns or roles != {'assistant', 'user'}:
+        return None
+    return {'conversation_id': data.get('conversation_id'), 'messages': messages}
+
+def split_ranges(s3, bucket, prefix):
+    """
+    Key-range boundaries for parallel listing. The shared prefix is taken
+    from the first key up to the first character of the conversation ID's
+    random part (e.g. calls/conv_); balance depends on that guess, coverage
+    does not — ranges are (lo, hi] and together span every key.
+    """
+    first = s3.list_objects_v2(Bucket=bucket, Prefix=prefix, MaxKeys=1).get('Contents')
+    if not first:
+        return []
+    key = first[0]['Key']
+    rest = key[len(prefix):]
+    cut = 0
+    for i, ch in enumerate(rest):
+        if ch == '/':
+            break
+        if not ch.isalnum():
+            cut = i + 1
+    base = prefix + rest[:cut]
+    return [base + ch for ch in SPLIT_ALPHABET]
+
+def conversation_id_from_key(key, prefix):
+    """calls/{conversation_id}/{sha256}.json.zst -> conversation_id"""
+    return key[len(prefix):].split('/', 1)[0]
+
+class Checkpoint:
+    """Last exported key per listing range plus the conversation IDs already written"""
+
+    def __init__(self, path):
+        self.path = path
+        self.seen_path = path + '.seen'
+        self._lock = threading.Lock()
+        self.state = {'boundaries': None, 'last_keys': {}, 'next_shard': 0, 'exported': 0}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self.state.update(json.load(f))
+        self.seen = set()
+        if os.path.exists(self.seen_path):
+            with open(self.seen_path, 'r', encoding='utf-8') as f:
+                self.seen = {line.strip() for line in f if line.strip()}
+        self._seen_file = open(self.seen_path, 'a', encoding='utf-8')
+
+    def claim(self, conversation_id):
+        """True the first time a conversation is seen (across runs)"""
+        with self._lock:
+            if conversation_id in self.seen:
+                return False
+            self.seen.add(conversation_id)
+            return True
+
+    def commit(self, range_id, last_key, conversation_ids, exported):
+        with self._lock:
+            if conversation_ids:
+                self._seen_file.write(''.join(f"{cid}\n" for cid in conversation_ids))
+                self._seen_file.flush()
+            self.state['last_keys'][range_id] = last_key
+            self.state['exported'] += exported
+            self.save()
+
+    def save(self):
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp, self.path)
+
+    def close(self):
+        self._seen_file.close()
+
+class ShardWriter:
+    """Appends examples to numbered JSONL shards, rotating every shard_size lines"""
+
+    def __init__(self, output_dir, shard_size, checkpoint):
+        self.output_dir = output_dir
+        self.shard_size = shard_size
+        self.checkpoint = checkpoint
+        self._lock = threading.Lock()
+        self._file = None
+        self._count = 0
+        os.makedirs(output_dir, exist_ok=True)
+
+    def _open_next(self):
+        if self._file:
+            self._file.close()
+        shard = self.checkpoint.state['next_shard']
+        self.checkpoint.state['next_shard'] = shard + 1
+        self._file = open(os.path.join(self.output_dir, f"calls-{shard:05d}.jsonl"), 'w', encoding='utf-8')
+        self._count = 0
+
+    def write(self, examples):
+        """Write and flush a group of examples (before their range is checkpointed)"""
+        with self._lock:
+            for example in examples:
+                if self._file is None or self._count >= self.shard_size:
+                    self._open_next()
+                self._file.write(json.dumps(example, ensure_ascii=False) + '\n')
+                self._count += 1
+            if self._file:
+                self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if self._file:
+                self._file.close()
+
+class Exporter:
+    def __init__(self, s3, bucket, writer, checkpoint, pool, min_turns=2):
+        self.s3 = s3
+        self.bucket = bucket
+        self.writer = writer
+        self.checkpoint = checkpoint
+        self.pool = pool
+        self.min_turns = min_turns
+        self.downloaded = 0
+        self.failed = 0
+        self._lock = threading.Lock()
+
+    def _fetch(self, key):
+        try:
+            if key.endswith('.pack'):
+                body = self.s3.get_object(Bucket=self.bucket, Key=key)['Body'].read()
+                raws = [raw for _, raw in call_archive.iter_pack(body)]
+            else:
+                raws = [call_archive.read_payload(self.s3, self.bucket, key)]
+        except Exception as e:
+            print(f"✗ Failed to read s3://{self.bucket}/{key}: {e}")
+            with self._lock:
+                self.failed += 1
+            return None
+        with self._lock:
+            self.downloaded += 1
+        return [example for example in (payload_to_example(raw, self.min_turns) for raw in raws) if example]
+
+    def export_range(self, range_id, prefix, start_after=None, stop_at=None):
+        """
+        List one key range page by page; each page is downloaded concurrently,
+        written, then checkpointed. A failed download stops the range just
+        before that key so the next run retries it.
+        """
+        last_exported = self.checkpoint.state['last_keys'].get(range_id)
+        if last_exported and range_id == PACKS_RANGE:
+            last_exported = pack_resume_key(last_exported)
+        start_after = last_exported or start_after
+        paginator = self.s3.get_paginator('list_objects_v2')
+        params = {'Bucket': self.bucket, 'Prefix': prefix}
+        if start_after:
+            params['StartAfter'] = start_after
+        exported = 0
+        for page in paginator.paginate(**params):
+            keys = [obj['Key'] for obj in page.get('Contents', [])]
+            done = stop_at is not None and keys and keys[-1] > stop_at
+            if stop_at is not None:
+                keys = [key for key in keys if key <= stop_at]
+            if not keys:
+                break
+            last_key = keys[-1]
+            if range_id != PACKS_RANGE:
+                seen = self.checkpoint.seen
+                keys = [key for key in keys if conversation_id_from_key(key, prefix) not in seen]
+            results = list(self.pool.map(self._fetch, keys))
+            if None in results:
+                failed_at = results.index(None)
+                keys, results = keys[:failed_at], results[:failed_at]
+                last_key = keys[-1] if keys else None
+                done = True
+            examples = []
+            for found in results:
+                examples.extend(e for e in found if e['conversation_id'] and self.checkpoint.claim(e['conversation_id']))
+            self.writer.write(examples)
+            if last_key:
+                self.checkpoint.commit(range_id, last_key, [e['conversation_id'] for e in examples], len(examples))
+            exported += len(examples)
+            if done:
+                break
+        return exported
+
+def pack_resume_key(last_key, backoff_secs=PACK_RESUME_BACKOFF_SECS):
+    """
+    StartAfter for the pack range: the key prefix backoff_secs before the
+    last exported pack's timestamp (see call_archive.pack_key), so packs
+    uploaded late are still listed. None when the key isn't a dated pack key.
+    """
+    parts = last_key[len(call_archive.BATCH_PREFIX) + 1:].split('/')
+    try:
+        built_at = datetime.strptime('/'.join(parts[:3]) + parts[3][:6], '%Y/%m/%d%H%M%S')
+    except (IndexError, ValueError):
+        return None
+    resume_at = built_at - timedelta(seconds=backoff_secs)
+    return f"{call_archive.BATCH_PREFIX}/{resume_at.strftime('%Y/%m/%d')}/{resume_at.strftime('%H%M%S')}"
+
+def main():
+    parser = argparse.ArgumentParser(description="Export archived calls from S3 as fine-tuning JSONL")
+    parser.add_argument("--bucket", default=S3_BUCKET, help="Archive bucket (default: S3_BUCKET_NAME)")
+    parser.add_argument("--prefix", default=f"{call_archive.ARCHIVE_PREFIX}/", help="Prefix of per-call objects")
+    parser.add_argument("--include-packs", action="store_true",
+                        help=f"Also export batched pack objects under {call_archive.BATCH_PREFIX}/")
+    parser.add_argument("--output-dir", default="exports", help="Directory for JSONL shards")
+    parser.add_argument("--shard-size", type=int, default=50_000, help="Examples per JSONL shard")
+    parser.add_argument("--checkpoint", default=None, help="Checkpoint file (default: <output-dir>/.export_checkpoint.json)")
+    parser.add_argument("--workers", type=int, default=32, help="Concurrent downloads")
+    parser.add_argument("--min-turns", type=int, default=2, help="Minimum messages per exported conversation")
+    parser.add_argument("--reset", action="store_true", help="Ignore the checkpoint and export everything again")
+
+    args = parser.parse_args()
+    if not args.bucket:
+        parser.error("--bucket or S3_BUCKET_NAME is required")
+
+    checkpoint_path = args.checkpoint or os.path.join(args.output_dir, '.export_checkpoint.json')
+    os.makedirs(os.path.dirname(checkpoint_path) or '.', exist_ok=True)
+    if args.reset:
+        for path in (checkpoint_path, checkpoint_path + '.seen'):
+            if os.path.exists(path):
+                os.remove(path)
+
+    s3 = boto3.client('s3', region_name=AWS_REGION,
+                      config=Config(max_pool_connections=args.workers + 32, retries={'mode': 'adaptive'}))
+    checkpoint = Checkpoint(checkpoint_path)
+    writer = ShardWriter(args.output_dir, args.shard_size, checkpoint)
+
+    boundaries = checkpoint.state['boundaries']
+    if boundaries is None:
+        boundaries = checkpoint.state['boundaries'] = split_ranges(s3, args.bucket, args.prefix)
+        checkpoint.save()
+    # (lo, hi] ranges: before the first boundary, between boundaries, after the last
+    ranges = [(str(i), prev, nxt) for i, (prev, nxt) in
+              enumerate(zip([None] + boundaries, boundaries + [None]))] if boundaries else []
+
+    print(f"📦 Exporting s3://{args.bucket}/{args.prefix} in {len(ranges)} listing ranges "
+          f"with {args.workers} download workers")
+    if checkpoint.state['exported']:
+        print(f"   Resuming: {checkpoint.state['exported']} conversations already exported")
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as downloads:
+        exporter = Exporter(s3, args.bucket, writer, checkpoint, downloads, args.min_turns)
+        jobs = [(range_id, args.prefix, lo, hi) for range_id, lo, hi in ranges]
+        if args.include_packs:
+            jobs.append((PACKS_RANGE, f"{call_archive.BATCH_PREFIX}/", None, None))
+        with ThreadPoolExecutor(max_workers=max(1, min(len(jobs), 16))) as listers:
+            exported = sum(listers.map(lambda job: exporter.export_range(job[0], job[1], job[2], job[3]), jobs))
+
+    if not exporter.failed:
+        # Run complete: only the pack position carries over (resumed with a backoff)
+        checkpoint.state['last_keys'] = {k: v for k, v in checkpoint.state['last_keys'].items() if k == PACKS_RANGE}
+        checkpoint.save()
+    writer.close()
+    checkpoint.close()
+    elapsed = time.perf_counter() - started
+    print(f"✅ Exported {exported} new conversations from {exporter.downloaded} objects "
+          f"in {elapsed:.1f}s ({exporter.downloaded / elapsed if elapsed else 0:,.0f} objects/sec)")
+    if exporter.failed:
+        print(f"⚠️  {exporter.failed} objects could not be read; rerun to resume from them")
+    print(f"   Shards in {args.output_dir}/, total exported: {checkpoint.state['exported']}")
+
+if __name__ == "__main__":
+    main()
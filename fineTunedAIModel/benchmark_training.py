@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Full fine-tuning vs LoRA benchmark
+Runs fine_tune_911.py once per mode on the same data and step budget, and reports wall time,
+peak RSS, samples/sec and checkpoint size as JSON
+
+    python benchmark_training.py --data_file calls.jsonl --max_steps 50 --report training_benchmark.json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from lora_adapters import dir_size_mb
+
+MODES = ("full", "lora")
+
+def run_mode(mode, args):
+    output_dir = Path(args.work_dir) / mode
+    command = [
+        sys.executable, str(Path(__file__).with_name("fine_tune_911.py")),
+        "--data_file", *args.data_file,
+        "--model_name", args.model_name,
+        "--output_dir", str(output_dir),
+        "--max_steps", str(args.max_steps),
+        "--batch_size", str(args.batch_size),
+        "--max_length", str(args.max_length),
+        "--seed", str(args.seed),
+    ]
+    if args.profile:
+        command += ["--profile", args.profile]
+    if args.threads:
+        command += ["--threads", str(args.threads)]
+    command.append("--lora" if mode == "lora" else "--no_lora")
+
+    print(f"Running {mode}: {' '.join(command)}")
+    started = time.perf_counter()
+    process = subprocess.Popen(command)
+    # wait4 returns the resource usage of this child alone (RUSAGE_CHILDREN would mix runs)
+    _, status, usage = os.wait4(process.pid, 0)
+    wall_secs = time.perf_counter() - started
+    process.returncode = os.WEXITSTATUS(status) if os.WIFEXITED(status) else -os.WTERMSIG(status)
+    if process.returncode != 0:
+        raise SystemExit(f"{mode} run failed with exit code {process.returncode}")
+
+    stats_path = output_dir / "training_stats.json"
+    stats = json.loads(stats_path.read_text()) if stats_path.exists() else {}
+    return {
+        "mode": mode,
+        "wall_secs": round(wall_secs, 1),
+        "train_secs": stats.get("train_secs"),
+        "samples_per_sec": stats.get("samples_per_sec"),
+        "tokens_per_sec": stats.get("tokens_per_sec"),
+        "peak_rss_mb": round(usage.ru_maxrss / 1024, 1),
+        "checkpoint_mb": dir_size_mb(output_dir),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark full fine-tuning against LoRA")
+    parser.add_argument("--data_file", nargs="+", default=["calls.jsonl"], help="JSONL data file(s) or glob(s)")
+    parser.add_argument("--model_name", default="microsoft/DialoGPT-medium", help="Base model")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES), help="Modes to run")
+    parser.add_argument("--max_steps", type=int, default=50, help="Training steps per run")
+    parser.add_argument("--batch_size", type=int, default=4, help="Training batch size")
+    parser.add_argument("--max_length", type=int, default=512, help="Maximum sequence length")
+    parser.add_argument("--seed", type=int, default=42, help="Seed shared by every run")
+    parser.add_argument("--profile", default=None, help="Training profile applied to every run")
+    parser.add_argument("--threads", type=int, default=None, help="torch intra-op threads")
+    parser.add_argument("--work_dir", default="./benchmark-runs", help="Output directory for the runs")
+    parser.add_argument("--report", default="training_benchmark.json", help="Where to write the JSON report")
+
+    args = parser.parse_args()
+
+    results = [run_mode(mode, args) for mode in args.modes]
+
+    print("\nMode   Wall (s)   Samples/sec   Peak RSS (MB)   Checkpoint (MB)")
+    for r in results:
+        print(f"{r['mode']:<6} {r['wall_secs']:>8}   {r['samples_per_sec'] or 0:>11}   "
+              f"{r['peak_rss_mb']:>13}   {r['checkpoint_mb']:>15}")
+    by_mode = {r["mode"]: r for r in results}
+    if "full" in by_mode and "lora" in by_mode:
+        full, lora = by_mode["full"], by_mode["lora"]
+        print(f"LoRA: {full['wall_secs'] / lora['wall_secs']:.2f}x faster wall time, "
+              f"{lora['peak_rss_mb'] / full['peak_rss_mb']:.0%} of full fine-tuning peak RSS")
+
+    with open(args.report, "w", encoding="utf-8") as f:
+        json.dump({"model_name": args.model_name, "max_steps": args.max_steps, "results": results}, f, indent=2)
+    print(f"Report written to {args.report}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Dataset pipeline for fine-tuning
+Loads JSONL transcripts with `datasets` (Arrow-backed or streaming), tokenizes with multiple
+processes, caches tokenized output on disk and builds deterministic train/eval splits of whole
+conversations (split before packing, so no conversation lands on both sides)
+"""
+
+import glob
+import hashlib
+import json
+import os
+from pathlib import Path
+from datasets import DatasetDict, load_dataset, load_from_disk
+
+BATCHING_MODES = ("pack", "group", "pad")
+PIPELINE_VERSION = 2  # bump when tokenization changes so old caches are ignored
+DEFAULT_CACHE_DIR = ".dataset_cache"
+
+def format_conversation(messages):
+    """Format conversation messages into training text"""
+    formatted_text = ""
+    for message in messages:
+        role = message["role"]
+        content = message["content"]
+
+        if role == "assistant":
+            formatted_text += f"911 Operator: {content}\n"
+        elif role == "user":
+            formatted_text += f"Caller: {content}\n"
+
+    return formatted_text.strip()
+
+def tokenize_function_for(tokenizer, max_length=512, batching="pack"):
+    """
+    Batched map function turning a "text" column into model inputs
+
+    batching:
+      pack  - concatenate conversations separated by EOS into max_length blocks (no padding)
+      group - one conversation per row, unpadded; batches are length-grouped and padded per batch
+      pad   - one conversation per row, padded to the longest in each map batch (original behaviour)
+    """
+    if batching == "pad":
+        def tokenize_function(examples):
+            return tokenizer(
+                examples["text"],
+                truncation=True,
+                padding=True,
+                max_length=max_length,
+                return_tensors="pt"
+            )
+        return tokenize_function
+
+    if batching == "group":
+        def tokenize_function(examples):
+            tokens = tokenizer(examples["text"], truncation=True, max_length=max_length)
+            tokens["labels"] = [ids[:] for ids in tokens["input_ids"]]
+            tokens["length"] = [len(ids) for ids in tokens["input_ids"]]
+            return tokens
+        return tokenize_function
+
+    if batching != "pack":
+        raise ValueError(f"Unknown batching mode: {batching} (expected one of {', '.join(BATCHING_MODES)})")
+
+    # Packing: EOS-separated conversations concatenated and cut into max_length blocks.
+    # Blocks attend across conversation boundaries; the EOS separator marks them.
+    def pack_function(examples):
+        ids = tokenizer(examples["text"])["input_ids"]
+        stream = [token for seq in ids for token in seq + [tokenizer.eos_token_id]]
+        blocks = [stream[i:i + max_length] for i in range(0, len(stream), max_length)]
+        return {
+            "input_ids": blocks,
+            "attention_mask": [[1] * len(block) for block in blocks],
+            "labels": [block[:] for block in blocks],
+        }
+    return pack_function
+
+def resolve_data_files(data_files):
+    """Expand paths and globs into a sorted list of JSONL files"""
+    if isinstance(data_files, str):
+        data_files = [data_files]
+    files = []
+    for pattern in data_files:
+        matches = glob.glob(pattern)
+        files.extend(matches if matches else [pattern])
+    files = sorted(set(files))
+    missing = [f for f in files if not os.path.exists(f)]
+    if missing:
+        raise FileNotFoundError(f"Data file(s) not found: {', '.join(missing)}")
+    return files
+
+def data_fingerprint(files):
+    """Identity of the input files (path, size, mtime) — changes whenever the data does"""
+    digest = hashlib.sha256()
+    for path in files:
+        stat = os.stat(path)
+        digest.update(f"{os.path.abspath(path)}|{stat.st_size}|{stat.st_mtime_ns}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+def tokenizer_fingerprint(tokenizer):
+    digest = hashlib.sha256()
+    digest.update(f"{type(tokenizer).__name__}|{tokenizer.name_or_path}|{len(tokenizer)}|".encode("utf-8"))
+    digest.update(json.dumps(tokenizer.get_vocab(), sort_keys=True).encode("utf-8"))
+    digest.update(f"|{tokenizer.eos_token_id}|{tokenizer.pad_token_id}".encode("utf-8"))
+    return digest.hexdigest()
+
+def cache_key(files, tokenizer, max_length, batching, eval_split, seed):
+    identity = json.dumps({
+        "version": PIPELINE_VERSION,
+        "data": data_fingerprint(files),
+        "tokenizer": tokenizer_fingerprint(tokenizer),
+        "max_length": max_length,
+        "batching": batching,
+        "eval_split": eval_split,
+        "seed": seed,
+    }, sort_keys=True)
+    return hashlib.sha256(identity.encode("utf-8")).hexdigest()[:24]
+
+def _to_text(examples):
+    return {"text": [format_conversation(messages or []) for messages in examples["messages"]]}
+
+def _has_messages(example):
+    return bool(example.get("messages"))
+
+def _in_eval_split(text, eval_split, seed):
+    """Stable per-example split assignment, independent of file order"""
+    bucket = int(hashlib.sha256(f"{seed}|{text}".encode("utf-8")).hexdigest()[:8], 16) / 0xFFFFFFFF
+    return bucket < eval_split
+
+def load_tokenized(data_files, tokenizer, max_length=512, batching="pack", eval_split=0.2, seed=42,
+                   num_proc=None, cache_dir=DEFAULT_CACHE_DIR):
+    """
+    Arrow-backed tokenized DatasetDict with "train" and "eval", loaded from
+    cache_dir when the data files, tokenizer, max_length, batching mode and
+    split are unchanged. Conversations are assigned to a side by the same
+    stable hash as streaming mode and each side is tokenized (and packed)
+    separately.
+    """
+    files = resolve_data_files(data_files)
+    key = cache_key(files, tokenizer, max_length, batching, eval_split, seed)
+    cache_path = Path(cache_dir) / key if cache_dir else None
+    if cache_path is not None and cache_path.exists():
+        print(f"Loading tokenized dataset from cache: {cache_path}")
+        return load_from_disk(str(cache_path))
+
+    raw = load_dataset("json", data_files=files, split="train")
+    if "messages" not in raw.column_names:
+        raise ValueError(f"No 'messages' column in {', '.join(files)}")
+    print(f"Loaded {len(raw)} conversations from {len(files)} file(s)")
+
+    texts = raw.filter(_has_messages, num_proc=num_proc).map(
+        _to_text, batched=True, num_proc=num_proc, remove_columns=raw.column_names
+    )
+    sides = DatasetDict({
+        "train": texts.filter(lambda ex: not _in_eval_split(ex["text"], eval_split, seed), num_proc=num_proc),
+        "eval": texts.filter(lambda ex: _in_eval_split(ex["text"], eval_split, seed), num_proc=num_proc),
+    })
+    print(f"Split {len(sides['train'])} train / {len(sides['eval'])} eval conversations")
+    tokenized = sides.map(
+        tokenize_function_for(tokenizer, max_length, batching),
+        batched=True,
+        batch_size=1000,
+        num_proc=num_proc,
+        remove_columns=["text"],
+        desc="Tokenizing",
+    )
+
+    if cache_path is not None:
+        tokenized.save_to_disk(str(cache_path))
+        print(f"Cached tokenized dataset at {cache_path}")
+    return tokenized
+
+def build_datasets(data_files, tokenizer, max_length=512, batching="pack", eval_split=0.2, seed=42,
+                   num_proc=None, cache_dir=DEFAULT_CACHE_DIR, streaming=False, max_eval_samples=None,
+                   shuffle_buffer=10_000):
+    """
+    Return (train_dataset, eval_dataset)
+
+    Both modes assign each conversation to train or eval by a stable hash
+    before tokenizing, so packed blocks never mix the two sides. Arrow mode
+    tokenizes once (cached) and shuffles the train blocks with `seed`.
+    Streaming mode never materializes the corpus: the train stream is
+    shuffled through a seeded buffer and tokenization runs on the fly.
+    """
+    if not streaming:
+        dataset = load_tokenized(data_files, tokenizer, max_length, batching, eval_split, seed, num_proc, cache_dir)
+        eval_dataset = dataset["eval"]
+        if max_eval_samples:
+            eval_dataset = eval_dataset.select(range(min(max_eval_samples, len(eval_dataset))))
+        return dataset["train"].shuffle(seed=seed), eval_dataset
+
+    files = resolve_data_files(data_files)
+    stream = load_dataset("json", data_files=files, split="train", streaming=True)
+    columns = list(next(iter(stream)).keys())
+    texts = stream.filter(_has_messages).map(_to_text, batched=True, remove_columns=columns)
+    tokenize = tokenize_function_for(tokenizer, max_length, batching)
+
+    train = texts.filter(lambda ex: not _in_eval_split(ex["text"], eval_split, seed))
+    train = train.shuffle(seed=seed, buffer_size=shuffle_buffer)
+    train = train.map(tokenize, batched=True, batch_size=1000, remove_columns=["text"])
+
+    eval_stream = texts.filter(lambda ex: _in_eval_split(ex["text"], eval_split, seed))
+    if max_eval_samples:
+        eval_stream = eval_stream.take(max_eval_samples)
+    eval_dataset = eval_stream.map(tokenize, batched=True, batch_size=1000, remove_columns=["text"])
+    return train, eval_dataset
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Evaluation harness for the fine-tuned 911 model
+Runs a held-out prompt set through one or more checkpoints (optionally int8-quantized) with
+batched generation, and reports latency, tokens/sec, perplexity and operator task metrics as JSON
+
+    python evaluate_model.py --models ./911-fine-tuned-model gpt2 --variants fp32 int8 --report eval_report.json
+"""
+
+import argparse
+import json
+import math
+import re
+import time
+import torch
+
+from dataset_pipeline import format_conversation
+from inference import BatchGenerator, ConversationCache, GenerationRequest, load_model
+
+# What a good first operator reply asks for
+TASK_PATTERNS = {
+    "asks_location": re.compile(
+        r"\b(where|address|location|cross street|what street|which street|nearest intersection|landmark)\b", re.I),
+    "asks_nature": re.compile(
+        r"(what('s| is) (your|the) emergency|what happened|what('s| is) going on|tell me (what|more)|"
+        r"describe|is anyone (hurt|injured)|are you (hurt|injured|safe))", re.I),
+}
+
+DEFAULT_PROMPTS = [
+    {"prompt": "There's a fire in my house!"},
+    {"prompt": "Someone broke into my car"},
+    {"prompt": "I need an ambulance, I'm having chest pain"},
+    {"prompt": "There's a suspicious person outside my window"},
+    {"prompt": "I heard gunshots in my neighborhood"},
+]
+
+def load_prompts(path):
+    """
+    Prompt set from JSONL: {"prompt": "..."} lines, or training-format
+    {"messages": [...]} lines (first caller turn is the prompt, the whole
+    conversation is used for perplexity)
+    """
+    if not path:
+        return DEFAULT_PROMPTS
+    examples = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            if "prompt" in item:
+                examples.append(item)
+            elif "messages" in item:
+                first_user = next((m["content"] for m in item["messages"] if m["role"] == "user"), None)
+                if first_user:
+                    examples.append({"prompt": first_user, "reference": format_conversation(item["messages"])})
+    return examples
+
+def task_metrics(responses):
+    scores = {name: 0 for name in TASK_PATTERNS}
+    both = 0
+    for response in responses:
+        hits = {name: bool(pattern.search(response)) for name, pattern in TASK_PATTERNS.items()}
+        for name, hit in hits.items():
+            scores[name] += hit
+        both += all(hits.values())
+    total = len(responses) or 1
+    metrics = {f"{name}_rate": round(count / total, 3) for name, count in scores.items()}
+    metrics["asks_both_rate"] = round(both / total, 3)
+    return metrics
+
+@torch.inference_mode()
+def perplexity(model, tokenizer, texts, batch_size=8, max_length=512):
+    """Token-weighted perplexity over texts (padding excluded)"""
+    total_loss = 0.0
+    total_tokens = 0
+    for start in range(0, len(texts), batch_size):
+        batch = tokenizer(texts[start:start + batch_size], padding=True, truncation=True,
+                          max_length=max_length, return_tensors="pt")
+        logits = model(input_ids=batch["input_ids"], attention_mask=batch["attention_mask"]).logits
+        targets = batch["input_ids"][:, 1:].masked_fill(batch["attention_mask"][:, 1:] == 0, -100)
+        loss = torch.nn.functional.cross_entropy(
+            logits[:, :-1].reshape(-1, logits.shape[-1]).float(), targets.reshape(-1),
+            ignore_index=-100, reduction="sum")
+        total_loss += float(loss)
+        total_tokens += int((targets != -100).sum())
+    return round(math.exp(total_loss / total_tokens), 3) if total_tokens else None
+
+def evaluate(model_path, variant, examples, batch_size=8, max_new_tokens=60, threads=None, max_length=512):
+    model, tokenizer = load_model(model_path, quantize=variant == "int8", threads=threads)
+    tokenizer.padding_side = "right"
+    generator = BatchGenerator(model, tokenizer, cache=ConversationCache(0))
+
+    # Warm-up so the first batch doesn't carry one-time allocation cost
+    generator.generate([GenerationRequest(examples[0]["prompt"], max_new_tokens=4, temperature=0)])
+
+    batch_latencies = []
+    samples = []
+    generated_tokens = 0
+    decode_secs = 0.0
+    for start in range(0, len(examples), batch_size):
+        chunk = examples[start:start + batch_size]
+        requests = [GenerationRequest(e["prompt"], max_new_tokens=max_new_tokens, temperature=0) for e in chunk]
+        started = time.perf_counter()
+        results = generator.generate(requests)
+        elapsed = time.perf_counter() - started
+        batch_latencies.append(elapsed * 1000)
+        decode_secs += elapsed
+        generated_tokens += sum(r["generated_tokens"] for r in results)
+        samples.extend({"prompt": e["prompt"], "response": r["response"]} for e, r in zip(chunk, results))
+
+    references = [e["reference"] for e in examples if e.get("reference")]
+    ordered = sorted(batch_latencies)
+    return {
+        "model": model_path,
+        "variant": variant,
+        "prompts": len(examples),
+        "batch_size": batch_size,
+        "latency": {
+            "batch_ms_mean": round(sum(batch_latencies) / len(batch_latencies), 1),
+            "batch_ms_p50": round(ordered[len(ordered) // 2], 1),
+            "batch_ms_max": round(ordered[-1], 1),
+            "ms_per_token": round(decode_secs * 1000 / generated_tokens, 2) if generated_tokens else None,
+        },
+        "tokens_per_sec": round(generated_tokens / decode_secs, 1) if decode_secs else 0.0,
+        "generated_tokens": generated_tokens,
+        "perplexity": perplexity(model, tokenizer, references, batch_size, max_length) if references else None,
+        "task_metrics": task_metrics([s["response"] for s in samples]),
+        "samples": samples[:10],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate fine-tuned 911 model checkpoints")
+    parser.add_argument("--models", nargs="+", default=["./911-fine-tuned-model"], help="Checkpoints to evaluate")
+    parser.add_argument("--variants", nargs="+", choices=["fp32", "int8"], default=["fp32"],
+                        help="Precision variants to run for every checkpoint")
+    parser.add_argument("--prompts", default=None,
+                        help="JSONL prompt set ({'prompt': ...} or {'messages': [...]}); default: built-in prompts")
+    parser.add_argument("--batch_size", type=int, default=8, help="Prompts per generation batch")
+    parser.add_argument("--max_new_tokens", type=int, default=60, help="Tokens generated per reply")
+    parser.add_argument("--max_length", type=int, default=512, help="Maximum sequence length for perplexity")
+    parser.add_argument("--threads", type=int, default=None, help="torch intra-op threads")
+    parser.add_argument("--report", default="eval_report.json", help="Where to write the JSON report")
+
+    args = parser.parse_args()
+
+    examples = load_prompts(args.prompts)
+    print(f"Evaluating {len(args.models)} checkpoint(s) x {len(args.variants)} variant(s) on {len(examples)} prompts")
+
+    results = []
+    for model_path in args.models:
+        for variant in args.variants:
+            result = evaluate(model_path, variant, examples, args.batch_size, args.max_new_tokens,
+                              args.threads, args.max_length)
+            results.append(result)
+            tasks = result["task_metrics"]
+            print(f"{model_path} [{variant}]: {result['tokens_per_sec']} tokens/sec, "
+                  f"{result['latency']['ms_per_token']} ms/token, perplexity {result['perplexity']}, "
+                  f"asks location {tasks['asks_location_rate']:.0%}, asks nature {tasks['asks_nature_rate']:.0%}")
+
+    with open(args.report, "w", encoding="utf-8") as f:
+        json.dump({"prompts_file": args.prompts, "results": results}, f, indent=2)
+    print(f"Report written to {args.report}")
+
+if __name__ == "__main__":
+    main()
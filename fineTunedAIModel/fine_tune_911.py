@@ -5,85 +5,79 @@ Fine-tunes a language model on 911 call transcripts for use with ElevenLabs
 """
 
 import json
-import torch
 from transformers import (
     AutoTokenizer, 
     AutoModelForCausalLM, 
     TrainingArguments, 
     Trainer,
-    DataCollatorForLanguageModeling
+    DataCollatorForLanguageModeling,
+    DataCollatorForSeq2Seq
 )
-from datasets import Dataset
 import argparse
 from pathlib import Path
+from dataset_pipeline import (
+    BATCHING_MODES,
+    DEFAULT_CACHE_DIR,
+    build_datasets
+)
+from lora_adapters import apply_lora, dir_size_mb, merge_adapter
+from training_config import DEFAULT_CONFIG, apply_config, apply_threads, load_config, resolve_precision
+from training_metrics import TokenCounter, ThroughputCallback
 
-def load_jsonl_data(file_path):
-    """Load and parse JSONL data"""
-    data = []
-    with open(file_path, 'r', encoding='utf-8') as f:
-        for line in f:
-            if line.strip():
-                data.append(json.loads(line))
-    return data
-
-def format_conversation(messages):
-    """Format conversation messages into training text"""
-    formatted_text = ""
-    for message in messages:
-        role = message["role"]
-        content = message["content"]
-        
-        if role == "assistant":
-            formatted_text += f"911 Operator: {content}\n"
-        elif role == "user":
-            formatted_text += f"Caller: {content}\n"
-    
-    return formatted_text.strip()
-
-def prepare_dataset(jsonl_data, tokenizer, max_length=512):
-    """Prepare dataset for training"""
-    texts = []
-    
-    for item in jsonl_data:
-        if "messages" in item:
-            formatted_text = format_conversation(item["messages"])
-            texts.append(formatted_text)
-    
-    # Tokenize the texts
-    def tokenize_function(examples):
-        return tokenizer(
-            examples["text"],
-            truncation=True,
-            padding=True,
-            max_length=max_length,
-            return_tensors="pt"
+def build_data_collator(tokenizer, batching):
+    """Collator for a batching mode"""
+    if batching == "pad":
+        return DataCollatorForLanguageModeling(
+            tokenizer=tokenizer,
+            mlm=False,  # We're doing causal language modeling, not masked
         )
-    
-    # Create dataset
-    dataset = Dataset.from_dict({"text": texts})
-    tokenized_dataset = dataset.map(
-        tokenize_function,
-        batched=True,
-        remove_columns=dataset.column_names
-    )
-    
-    return tokenized_dataset
+    # Pads input_ids per batch and labels with -100, so EOS separators keep their labels
+    return DataCollatorForSeq2Seq(tokenizer=tokenizer, label_pad_token_id=-100)
 
 def main():
     parser = argparse.ArgumentParser(description="Fine-tune LLM on 911 call transcripts")
-    parser.add_argument("--data_file", default="calls.jsonl", help="Path to JSONL data file")
+    parser.add_argument("--config", default=DEFAULT_CONFIG, help="YAML config; its settings become the defaults")
+    parser.add_argument("--profile", default=None, help="Training profile from the config (e.g. cpu-fast, cpu-quality)")
+    parser.add_argument("--data_file", nargs="+", default=["calls.jsonl"], help="JSONL data file(s) or glob(s)")
     parser.add_argument("--model_name", default="microsoft/DialoGPT-medium", help="Base model to fine-tune")
     parser.add_argument("--output_dir", default="./911-fine-tuned-model", help="Output directory for fine-tuned model")
     parser.add_argument("--epochs", type=int, default=3, help="Number of training epochs")
     parser.add_argument("--batch_size", type=int, default=4, help="Training batch size")
     parser.add_argument("--learning_rate", type=float, default=5e-5, help="Learning rate")
     parser.add_argument("--max_length", type=int, default=512, help="Maximum sequence length")
-    
+    parser.add_argument("--batching", choices=BATCHING_MODES, default="pack",
+                        help="pack: EOS-separated fixed-length blocks; group: length-grouped dynamic padding; pad: pad each map batch")
+    parser.add_argument("--eval_split", type=float, default=0.2, help="Fraction of conversations held out for evaluation")
+    parser.add_argument("--seed", type=int, default=42, help="Seed for the train/eval split, shuffling and training")
+    parser.add_argument("--num_proc", type=int, default=None, help="Processes used for tokenization")
+    parser.add_argument("--cache_dir", default=DEFAULT_CACHE_DIR, help="Tokenized dataset cache ('' disables)")
+    parser.add_argument("--streaming", action="store_true", help="Stream the JSONL instead of loading it (requires --max_steps)")
+    parser.add_argument("--max_steps", type=int, default=-1, help="Total training steps (overrides --epochs)")
+    parser.add_argument("--max_eval_samples", type=int, default=None, help="Cap on evaluation samples")
+    parser.add_argument("--threads", type=int, default=None, help="torch intra-op threads (default: one per core)")
+    parser.add_argument("--dataloader_num_workers", type=int, default=0, help="Dataloader worker processes")
+    parser.add_argument("--gradient_accumulation_steps", type=int, default=1, help="Batches per optimizer step")
+    parser.add_argument("--bf16", choices=["auto", "on", "off"], default="auto",
+                        help="bf16 mixed precision; auto enables it on GPUs and CPUs with native bf16")
+    parser.add_argument("--gradient_checkpointing", action="store_true", help="Recompute activations to save memory")
+    parser.add_argument("--lora", action="store_true", help="Train LoRA adapters instead of all weights")
+    parser.add_argument("--no_lora", dest="lora", action="store_false", help="Train all weights even if the profile enables LoRA")
+    parser.add_argument("--merge_dir", default=None,
+                        help="With --lora: also merge the trained adapter into the base model here for serving")
+    
+    # config.yaml (and the selected profile) provide defaults; explicit flags override them
+    config_args, _ = parser.parse_known_args()
+    apply_config(parser, load_config(config_args.config, config_args.profile))
     args = parser.parse_args()
     
-    print("Loading data...")
-    data = load_jsonl_data(args.data_file)
-    print(f"Loaded {len(data)} conversations")
+    if args.streaming and args.max_steps <= 0:
+        parser.error("--streaming needs --max_steps (a streamed dataset has no length)")
+    
+    threads = apply_threads(args.threads)
+    bf16, fp16 = resolve_precision(args.bf16, args.use_fp16)
+    print(f"Profile: {args.profile or 'default'} | threads {threads} | workers {args.dataloader_num_workers} | "
+          f"grad accumulation {args.gradient_accumulation_steps} | bf16 {bf16} | "
+          f"gradient checkpointing {args.gradient_checkpointing} | LoRA {args.lora}")
     
     print("Loading tokenizer and model...")
     tokenizer = AutoTokenizer.from_pretrained(args.model_name)
@@ -93,44 +87,69 @@ def main():
     if tokenizer.pad_token is None:
         tokenizer.pad_token = tokenizer.eos_token
     
-    print("Preparing dataset...")
-    dataset = prepare_dataset(data, tokenizer, args.max_length)
+    # Count tokens on the base model's forward, so it also sees batches built in dataloader workers
+    token_counter = TokenCounter(model)
+    if args.gradient_checkpointing:
+        model.config.use_cache = False
+    if args.lora:
+        model = apply_lora(
+            model,
+            r=args.lora_r,
+            alpha=args.lora_alpha,
+            dropout=args.lora_dropout,
+            target_modules=args.lora_target_modules,
+            gradient_checkpointing=args.gradient_checkpointing,
+        )
     
-    # Split dataset
-    train_size = int(0.8 * len(dataset))
-    train_dataset = dataset.select(range(train_size))
-    eval_dataset = dataset.select(range(train_size, len(dataset)))
+    print("Preparing dataset...")
+    train_dataset, eval_dataset = build_datasets(
+        args.data_file,
+        tokenizer,
+        max_length=args.max_length,
+        batching=args.batching,
+        eval_split=args.eval_split,
+        seed=args.seed,
+        num_proc=args.num_proc,
+        cache_dir=args.cache_dir,
+        streaming=args.streaming,
+        max_eval_samples=args.max_eval_samples,
+    )
     
-    print(f"Training samples: {len(train_dataset)}")
-    print(f"Evaluation samples: {len(eval_dataset)}")
+    if not args.streaming:
+        print(f"Training samples: {len(train_dataset)}")
+        print(f"Evaluation samples: {len(eval_dataset)}")
     
     # Data collator
-    data_collator = DataCollatorForLanguageModeling(
-        tokenizer=tokenizer,
-        mlm=False,  # We're doing causal language modeling, not masked
-    )
+    data_collator = build_data_collator(tokenizer, args.batching)
+    throughput = ThroughputCallback(token_counter)
     
     # Training arguments
     training_args = TrainingArguments(
         output_dir=args.output_dir,
         overwrite_output_dir=True,
         num_train_epochs=args.epochs,
+        max_steps=args.max_steps,
+        seed=args.seed,
         per_device_train_batch_size=args.batch_size,
         per_device_eval_batch_size=args.batch_size,
-        warmup_steps=100,
-        weight_decay=0.01,
+        gradient_accumulation_steps=args.gradient_accumulation_steps,
+        gradient_checkpointing=args.gradient_checkpointing,
+        warmup_steps=args.warmup_steps,
+        weight_decay=args.weight_decay,
         logging_dir=f"{args.output_dir}/logs",
-        logging_steps=10,
+        logging_steps=args.logging_steps,
         eval_strategy="steps",
-        eval_steps=100,
-        save_steps=500,
-        save_total_limit=2,
+        eval_steps=args.eval_steps,
+        save_steps=args.save_steps,
+        save_total_limit=args.save_total_limit,
         load_best_model_at_end=True,
         metric_for_best_model="eval_loss",
         greater_is_better=False,
         learning_rate=args.learning_rate,
-        fp16=torch.cuda.is_available(),  # Use fp16 if GPU available
-        dataloader_num_workers=0,
+        fp16=fp16,  # GPU only, and only when bf16 is off
+        bf16=bf16,
+        dataloader_num_workers=args.dataloader_num_workers,
+        group_by_length=args.batching == "group" and not args.streaming,
     )
     
     # Initialize trainer
@@ -141,6 +160,7 @@ def main():
         eval_dataset=eval_dataset,
         data_collator=data_collator,
         tokenizer=tokenizer,
+        callbacks=[throughput],
     )
     
     print("Starting training...")
@@ -150,7 +170,18 @@ def main():
     trainer.save_model()
     tokenizer.save_pretrained(args.output_dir)
     
-    print(f"Fine-tuned model saved to {args.output_dir}")
+    stats = dict(throughput.summary(), profile=args.profile, lora=args.lora)
+    with open(Path(args.output_dir) / "training_stats.json", "w", encoding="utf-8") as f:
+        json.dump(stats, f, indent=2)
+    
+    if args.lora:
+        print(f"LoRA adapter saved to {args.output_dir} ({dir_size_mb(args.output_dir)} MB)")
+        if args.merge_dir:
+            merge_adapter(args.output_dir, args.merge_dir)
+        else:
+            print(f"Merge it for serving: python lora_adapters.py --adapter_dir {args.output_dir} --output_dir <dir>")
+    else:
+        print(f"Fine-tuned model saved to {args.output_dir}")
     print("You can now use this model with ElevenLabs or other applications!")
 
 if __name__ == "__main__":
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+CPU inference engine for the fine-tuned 911 model
+Loads the model once (optionally int8 dynamic-quantized), decodes batches of prompts in one
+forward pass per token and keeps per-conversation KV caches so follow-up turns only run new tokens
+"""
+
+import os
+import time
+import threading
+from collections import OrderedDict
+import torch
+from transformers import AutoTokenizer, AutoModelForCausalLM
+
+from lora_adapters import is_adapter_dir, load_merged
+
+try:
+    from transformers import DynamicCache
+except ImportError:  # older transformers: legacy tuple caches only
+    DynamicCache = None
+
+MAX_CONVERSATIONS = int(os.environ.get("MAX_CONVERSATIONS", "256"))
+
+def conv1d_to_linear(model):
+    """
+    Replace GPT-2 style Conv1D layers with equivalent nn.Linear layers so
+    torch dynamic quantization (which only targets nn.Linear) covers them
+    """
+    from transformers.pytorch_utils import Conv1D
+
+    for module in list(model.modules()):
+        for name, child in list(module.named_children()):
+            if isinstance(child, Conv1D):
+                nx, nf = child.weight.shape
+                linear = torch.nn.Linear(nx, nf)
+                linear.weight.data = child.weight.data.t().contiguous()
+                linear.bias.data = child.bias.data.clone()
+                setattr(module, name, linear)
+    return model
+
+def load_model(model_path, quantize=False, threads=None):
+    """Load tokenizer + model for CPU inference; quantize=True applies int8 dynamic quantization"""
+    if threads:
+        torch.set_num_threads(threads)
+
+    print(f"Loading model from {model_path}...")
+    tokenizer = AutoTokenizer.from_pretrained(model_path)
+    if is_adapter_dir(model_path):
+        # LoRA adapter checkpoint: merge into the base weights so decoding pays no adapter overhead
+        model = load_merged(model_path)
+    else:
+        model = AutoModelForCausalLM.from_pretrained(model_path)
+    if tokenizer.pad_token is None:
+        tokenizer.pad_token = tokenizer.eos_token
+
+    model.eval()
+    if quantize:
+        model = conv1d_to_linear(model)
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        print("Applied int8 dynamic quantization")
+    return model, tokenizer
+
+def format_prompt(message):
+    return f"Caller: {message}\n911 Operator:"
+
+def format_follow_up(message):
+    return f"\nCaller: {message}\n911 Operator:"
+
+def _to_legacy(past):
+    return past.to_legacy_cache() if hasattr(past, "to_legacy_cache") else past
+
+def _from_legacy(past):
+    if DynamicCache is not None and isinstance(past, tuple):
+        return DynamicCache.from_legacy_cache(past)
+    return past
+
+class ConversationCache:
+    """LRU of conversation_id -> (token ids so far, legacy KV cache covering a prefix of them)"""
+
+    def __init__(self, max_conversations=MAX_CONVERSATIONS):
+        self.max_conversations = max_conversations
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, conversation_id):
+        with self._lock:
+            entry = self._entries.get(conversation_id)
+            if entry is not None:
+                self._entries.move_to_end(conversation_id)
+            return entry
+
+    def put(self, conversation_id, ids, past):
+        with self._lock:
+            self._entries[conversation_id] = (ids, past)
+            self._entries.move_to_end(conversation_id)
+            while len(self._entries) > self.max_conversations:
+                self._entries.popitem(last=False)
+
+    def drop(self, conversation_id):
+        with self._lock:
+            return self._entries.pop(conversation_id, None) is not None
+
+    def __len__(self):
+        return len(self._entries)
+
+class GenerationRequest:
+    def __init__(self, message, conversation_id=None, max_new_tokens=60, temperature=0.7):
+        self.message = message
+        self.conversation_id = conversation_id
+        self.max_new_tokens = max_new_tokens
+        self.temperature = temperature
+
+class BatchGenerator:
+    """
+    Decodes a batch of requests together. Each row is laid out as
+
+        [KV padding][cached prefix][input padding][new tokens]
+
+    with padding masked out and position ids counted over real tokens only,
+    so rows with different cached prefixes and prompt lengths share every
+    forward pass. A turn ends at EOS or at the first token containing a
+    newline (the end of the operator's line).
+    """
+
+    def __init__(self, model, tokenizer, cache=None, top_k=50):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.cache = cache if cache is not None else ConversationCache()
+        self.top_k = top_k
+        self.max_positions = getattr(model.config, "n_positions", None) or getattr(model.config, "max_position_embeddings", 1024)
+        self.stop_set = self._stop_token_ids()
+        self.stop_ids = torch.tensor(sorted(self.stop_set))
+        self.stats = {"requests": 0, "batches": 0, "generated_tokens": 0, "prompt_tokens": 0,
+                      "cached_tokens": 0, "decode_secs": 0.0}
+        self._stats_lock = threading.Lock()
+
+    def _stop_token_ids(self):
+        ids = {self.tokenizer.eos_token_id}
+        for token, index in self.tokenizer.get_vocab().items():
+            if "\n" in self.tokenizer.convert_tokens_to_string([token]):
+                ids.add(index)
+        return ids
+
+    def _prepare(self, request):
+        """(history ids, cached KV, number of ids the KV covers, ids to run now)"""
+        budget = self.max_positions - request.max_new_tokens
+        entry = self.cache.get(request.conversation_id) if request.conversation_id else None
+        if entry is None:
+            ids = self.tokenizer.encode(format_prompt(request.message))[-budget:]
+            return ids, None, 0, ids
+        history, past = entry
+        ids = history + self.tokenizer.encode(format_follow_up(request.message))
+        if len(ids) > budget:
+            # Context full: restart from the most recent tokens without the cache
+            ids = ids[-budget:]
+            return ids, None, 0, ids
+        cached = past[0][0].shape[2]
+        return ids, past, cached, ids[cached:]
+
+    def _batched_past(self, pasts, lengths, target):
+        """Left-pad each row's legacy KV cache to `target` positions and stack them"""
+        layers = []
+        reference = next(p for p in pasts if p is not None)
+        for layer in range(len(reference)):
+            keys, values = [], []
+            for past, length in zip(pasts, lengths):
+                k_ref, v_ref = reference[layer]
+                shape_k = (1, k_ref.shape[1], target - length, k_ref.shape[3])
+                shape_v = (1, v_ref.shape[1], target - length, v_ref.shape[3])
+                k = past[layer][0] if past is not None else k_ref.new_zeros((1, k_ref.shape[1], 0, k_ref.shape[3]))
+                v = past[layer][1] if past is not None else v_ref.new_zeros((1, v_ref.shape[1], 0, v_ref.shape[3]))
+                keys.append(torch.cat([k_ref.new_zeros(shape_k), k], dim=2))
+                values.append(torch.cat([v_ref.new_zeros(shape_v), v], dim=2))
+            layers.append((torch.cat(keys), torch.cat(values)))
+        return tuple(layers)
+
+    def _sample(self, logits, temperatures):
+        greedy = logits.argmax(dim=-1)
+        if not (temperatures > 0).any():
+            return greedy
+        scaled = logits / temperatures.clamp(min=1e-5).unsqueeze(-1)
+        if self.top_k:
+            kth = torch.topk(scaled, min(self.top_k, scaled.shape[-1]), dim=-1).values[:, -1:]
+            scaled = scaled.masked_fill(scaled < kth, float("-inf"))
+        sampled = torch.multinomial(torch.softmax(scaled, dim=-1), 1).squeeze(-1)
+        return torch.where(temperatures > 0, sampled, greedy)
+
+    @torch.inference_mode()
+    def generate(self, requests):
+        """Generate one reply per request; returns dicts with text and timing"""
+        started = time.perf_counter()
+        prepared = [self._prepare(r) for r in requests]
+        batch = len(requests)
+        pad_id = self.tokenizer.pad_token_id
+
+        cached = [p[2] for p in prepared]
+        pasts = [p[1] for p in prepared]
+        new = [p[3] for p in prepared]
+        past_len = max(cached)
+        new_len = max(len(n) for n in new)
+
+        input_ids = torch.full((batch, new_len), pad_id, dtype=torch.long)
+        mask = torch.zeros((batch, past_len + new_len), dtype=torch.long)
+        for i, (tokens, length) in enumerate(zip(new, cached)):
+            input_ids[i, new_len - len(tokens):] = torch.tensor(tokens)
+            mask[i, past_len - length:past_len] = 1
+            mask[i, past_len + new_len - len(tokens):] = 1
+        positions = (mask.cumsum(-1) - 1).clamp(min=0)
+
+        past = self._batched_past(pasts, cached, past_len) if past_len else None
+        outputs = self.model(
+            input_ids=input_ids,
+            attention_mask=mask,
+            position_ids=positions[:, past_len:],
+            past_key_values=_from_legacy(past) if past is not None else None,
+            use_cache=True,
+        )
+
+        temperatures = torch.tensor([float(r.temperature) for r in requests])
+        limits = torch.tensor([r.max_new_tokens for r in requests])
+        finished = torch.zeros(batch, dtype=torch.bool)
+        generated = [[] for _ in requests]
+        next_positions = positions[:, -1] + 1
+        steps = 0
+
+        while True:
+            tokens = self._sample(outputs.logits[:, -1, :].float(), temperatures)
+            steps += 1
+            for i in range(batch):
+                if not finished[i]:
+                    generated[i].append(int(tokens[i]))
+            finished |= torch.isin(tokens, self.stop_ids) | (steps >= limits)
+            if finished.all():
+                break
+            # Finished rows keep stepping with a masked pad token
+            feed = torch.where(finished, torch.full_like(tokens, pad_id), tokens)
+            mask = torch.cat([mask, (~finished).long().unsqueeze(-1)], dim=-1)
+            outputs = self.model(
+                input_ids=feed.unsqueeze(-1),
+                attention_mask=mask,
+                position_ids=next_positions.unsqueeze(-1),
+                past_key_values=outputs.past_key_values,
+                use_cache=True,
+            )
+            next_positions = next_positions + (~finished).long()
+
+        final_past = _to_legacy(outputs.past_key_values)
+        elapsed = time.perf_counter() - started
+        results = []
+        for i, (request, (ids, _, cached_len, _)) in enumerate(zip(requests, prepared)):
+            reply = generated[i]
+            text_ids = [t for t in reply if t not in self.stop_set]
+            if request.conversation_id:
+                # Keep only this row's real positions. The last sampled token has no KV yet:
+                # a stop token is dropped from the history, any other token is run next turn.
+                keep = mask[i, :final_past[0][0].shape[2]].nonzero().squeeze(-1)
+                row_past = tuple((k[i:i + 1, :, keep], v[i:i + 1, :, keep]) for k, v in final_past)
+                history = ids + (reply[:-1] if reply and reply[-1] in self.stop_set else reply)
+                self.cache.put(request.conversation_id, history, row_past)
+            results.append({
+                "response": self.tokenizer.decode(text_ids, skip_special_tokens=True).strip(),
+                "conversation_id": request.conversation_id,
+                "prompt_tokens": len(ids) - cached_len,
+                "cached_tokens": cached_len,
+                "generated_tokens": len(reply),
+                "latency_ms": round(elapsed * 1000, 1),
+                "tokens_per_sec": round(len(reply) / elapsed, 1) if elapsed else 0.0,
+            })
+
+        with self._stats_lock:
+            self.stats["requests"] += batch
+            self.stats["batches"] += 1
+            self.stats["generated_tokens"] += sum(len(g) for g in generated)
+            self.stats["prompt_tokens"] += sum(r["prompt_tokens"] for r in results)
+            self.stats["cached_tokens"] += sum(cached)
+            self.stats["decode_secs"] += elapsed
+        return results
+
+    def summary(self):
+        with self._stats_lock:
+            stats = dict(self.stats)
+        stats["tokens_per_sec"] = round(stats["generated_tokens"] / stats["decode_secs"], 1) if stats["decode_secs"] else 0.0
+        stats["avg_batch_size"] = round(stats["requests"] / stats["batches"], 2) if stats["batches"] else 0.0
+        stats["conversations_cached"] = len(self.cache)
+        stats["decode_secs"] = round(stats["decode_secs"], 2)
+        return stats
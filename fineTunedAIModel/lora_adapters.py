@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+LoRA adapters for parameter-efficient fine-tuning
+Wraps the base model with low-rank adapters on the attention projections (base weights frozen,
+checkpoints hold only the adapters) and merges trained adapters back into a plain model for serving
+
+    python lora_adapters.py --adapter_dir ./911-lora-adapter --output_dir ./911-fine-tuned-model
+"""
+
+import argparse
+import os
+
+ADAPTER_CONFIG = "adapter_config.json"
+
+def _peft():
+    try:
+        import peft
+    except ImportError:
+        raise SystemExit("LoRA needs peft: pip install peft")
+    return peft
+
+def is_adapter_dir(path):
+    return os.path.isfile(os.path.join(path, ADAPTER_CONFIG))
+
+def apply_lora(model, r=8, alpha=16, dropout=0.05, target_modules=("attn.c_attn", "attn.c_proj"),
+               gradient_checkpointing=False):
+    """Wrap the model with LoRA adapters; only adapter weights are trainable"""
+    peft = _peft()
+    if gradient_checkpointing:
+        # Checkpointed blocks need an input that requires grad when the embeddings are frozen
+        model.enable_input_require_grads()
+    lora_config = peft.LoraConfig(
+        task_type=peft.TaskType.CAUSAL_LM,
+        r=r,
+        lora_alpha=alpha,
+        lora_dropout=dropout,
+        target_modules=list(target_modules),
+        fan_in_fan_out=True,  # GPT-2 style Conv1D layers store weights transposed
+    )
+    model = peft.get_peft_model(model, lora_config)
+    model.print_trainable_parameters()
+    return model
+
+def load_merged(adapter_dir):
+    """Base model from the adapter's config with the adapter merged in (a plain transformers model)"""
+    peft = _peft()
+    model = peft.AutoPeftModelForCausalLM.from_pretrained(adapter_dir)
+    return model.merge_and_unload()
+
+def merge_adapter(adapter_dir, output_dir):
+    """Merge a trained adapter into its base model and save model + tokenizer for serving"""
+    from transformers import AutoTokenizer
+
+    print(f"Merging adapter {adapter_dir}...")
+    model = load_merged(adapter_dir)
+    model.save_pretrained(output_dir)
+    AutoTokenizer.from_pretrained(adapter_dir).save_pretrained(output_dir)
+    print(f"Merged model saved to {output_dir}")
+    return output_dir
+
+def dir_size_mb(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+    return round(total / (1024 * 1024), 1)
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge a LoRA adapter into its base model for serving")
+    parser.add_argument("--adapter_dir", required=True, help="Adapter saved by fine_tune_911.py --lora")
+    parser.add_argument("--output_dir", required=True, help="Where to save the merged model")
+
+    args = parser.parse_args()
+
+    if not is_adapter_dir(args.adapter_dir):
+        parser.error(f"No {ADAPTER_CONFIG} in {args.adapter_dir}")
+    merge_adapter(args.adapter_dir, args.output_dir)
+    print(f"Adapter: {dir_size_mb(args.adapter_dir)} MB, merged model: {dir_size_mb(args.output_dir)} MB")
+
+if __name__ == "__main__":
+    main()
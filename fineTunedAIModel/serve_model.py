@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Inference server for the fine-tuned 911 model
+Loads the model once and serves operator replies over HTTP. Concurrent requests are grouped
+into micro-batches, and follow-up turns of a conversation reuse its KV cache.
+
+    python serve_model.py --model_path ./911-fine-tuned-model --quantize
+    curl -X POST localhost:8100/generate -H 'Content-Type: application/json' \
+         -d '{"message": "There is a fire in my kitchen", "conversation_id": "demo"}'
+"""
+
+import argparse
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Optional
+from fastapi import FastAPI, HTTPException
+from pydantic import BaseModel
+import uvicorn
+
+from inference import BatchGenerator, ConversationCache, GenerationRequest, load_model
+
+class GenerateBody(BaseModel):
+    message: str
+    conversation_id: Optional[str] = None
+    max_new_tokens: int = 60
+    temperature: float = 0.7
+
+class MicroBatcher:
+    """
+    Collects concurrent requests for up to max_wait_ms (or max_batch_size
+    requests) and runs them as one batch on a single worker thread. Two turns
+    of the same conversation never share a batch; the later one waits for the
+    next batch so it sees the earlier turn's cache.
+    """
+
+    def __init__(self, generator, max_batch_size=8, max_wait_ms=10):
+        self.generator = generator
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self._deferred = []
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, request):
+        future = Future()
+        self._queue.put((request, future))
+        return future
+
+    def _collect(self):
+        batch = self._deferred
+        self._deferred = []
+        if not batch:
+            batch.append(self._queue.get())
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        runnable, conversations = [], set()
+        for item in batch:
+            conversation_id = item[0].conversation_id
+            if conversation_id and conversation_id in conversations:
+                self._deferred.append(item)
+                continue
+            conversations.add(conversation_id)
+            runnable.append(item)
+        return runnable
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                results = self.generator.generate([request for request, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                result["batch_size"] = len(batch)
+                future.set_result(result)
+
+def create_app(generator, batcher):
+    app = FastAPI(title="911 Operator Model")
+
+    @app.post("/generate")
+    async def generate(body: GenerateBody):
+        if not body.message.strip():
+            raise HTTPException(status_code=400, detail="message is required")
+        request = GenerationRequest(
+            body.message,
+            conversation_id=body.conversation_id,
+            max_new_tokens=max(1, min(body.max_new_tokens, 256)),
+            temperature=max(0.0, body.temperature),
+        )
+        return await asyncio.wrap_future(batcher.submit(request))
+
+    @app.delete("/conversations/{conversation_id}")
+    async def end_conversation(conversation_id: str):
+        return {"dropped": generator.cache.drop(conversation_id)}
+
+    @app.get("/stats")
+    async def stats():
+        return generator.summary()
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok"}
+
+    return app
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the fine-tuned 911 model")
+    parser.add_argument("--model_path", default="./911-fine-tuned-model", help="Path to fine-tuned model")
+    parser.add_argument("--host", default="0.0.0.0", help="Bind address")
+    parser.add_argument("--port", type=int, default=8100, help="Port")
+    parser.add_argument("--quantize", action="store_true", help="Apply int8 dynamic quantization (CPU)")
+    parser.add_argument("--threads", type=int, default=None, help="torch intra-op threads")
+    parser.add_argument("--max_batch_size", type=int, default=8, help="Requests per micro-batch")
+    parser.add_argument("--max_wait_ms", type=float, default=10, help="How long to gather a micro-batch")
+    parser.add_argument("--max_conversations", type=int, default=256, help="Conversation KV caches kept (LRU)")
+
+    args = parser.parse_args()
+
+    model, tokenizer = load_model(args.model_path, quantize=args.quantize, threads=args.threads)
+    generator = BatchGenerator(model, tokenizer, cache=ConversationCache(args.max_conversations))
+    batcher = MicroBatcher(generator, args.max_batch_size, args.max_wait_ms)
+
+    print(f"Serving on http://{args.host}:{args.port} (batch ≤{args.max_batch_size}, wait {args.max_wait_ms}ms)")
+    uvicorn.run(create_app(generator, batcher), host=args.host, port=args.port)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Training configuration
+Loads config.yaml and an optional named profile ("cpu-fast", "cpu-quality", ...) into argparse
+defaults, and resolves hardware settings (threads, bf16) for the current machine
+"""
+
+import os
+from pathlib import Path
+import torch
+import yaml
+
+# Next to this file, so the profiles load whatever directory the scripts are run from
+DEFAULT_CONFIG = str(Path(__file__).resolve().parent / "config.yaml")
+
+# Settings that have no command-line flag but can be set from config.yaml or a profile
+TRAINING_DEFAULTS = {
+    "warmup_steps": 100,
+    "weight_decay": 0.01,
+    "logging_steps": 10,
+    "eval_steps": 100,
+    "save_steps": 500,
+    "save_total_limit": 2,
+    "use_fp16": True,
+    "lora_r": 8,
+    "lora_alpha": 16,
+    "lora_dropout": 0.05,
+    "lora_target_modules": ["attn.c_attn", "attn.c_proj"],
+}
+
+# config.yaml names that differ from the argparse destinations
+CONFIG_ALIASES = {
+    "validation_split": "eval_split",
+}
+IGNORED_KEYS = {"train_split"}  # implied by validation_split
+
+def load_config(path=DEFAULT_CONFIG, profile=None):
+    """
+    Flat settings dict from config.yaml with `profiles[profile]` applied on top.
+    A missing default config file is not an error; a missing profile is.
+    """
+    config = {}
+    if path and os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            config = yaml.safe_load(f) or {}
+    elif path != DEFAULT_CONFIG:
+        raise FileNotFoundError(f"Config file not found: {path}")
+
+    profiles = config.pop("profiles", None) or {}
+    if profile:
+        if profile not in profiles:
+            available = ", ".join(profiles) or "none"
+            raise ValueError(f"Unknown profile '{profile}' in {path} (available: {available})")
+        config.update(profiles[profile])
+
+    settings = {}
+    for key, value in config.items():
+        if key in IGNORED_KEYS:
+            continue
+        if key == "data_file" and isinstance(value, str):
+            value = [value]
+        settings[CONFIG_ALIASES.get(key, key)] = value
+    return settings
+
+def apply_config(parser, settings):
+    """Use config settings as parser defaults, so explicit command-line flags still win"""
+    known = {action.dest for action in parser._actions} | set(TRAINING_DEFAULTS)
+    unknown = sorted(set(settings) - known)
+    if unknown:
+        print(f"Ignoring unknown config settings: {', '.join(unknown)}")
+    parser.set_defaults(**TRAINING_DEFAULTS)
+    parser.set_defaults(**{k: v for k, v in settings.items() if k in known})
+
+def cpu_supports_bf16():
+    """True when the CPU has native bf16 matmul (AVX512-BF16 or AMX)"""
+    try:
+        with open("/proc/cpuinfo", "r") as f:
+            flags = f.read()
+    except OSError:
+        return False
+    return "avx512_bf16" in flags or "amx_bf16" in flags
+
+def resolve_precision(bf16="auto", use_fp16=True):
+    """(bf16, fp16) flags for TrainingArguments; bf16 is auto/on/off (or a YAML bool)"""
+    if isinstance(bf16, bool):
+        bf16 = "on" if bf16 else "off"
+    if torch.cuda.is_available():
+        supported = torch.cuda.is_bf16_supported()
+    else:
+        supported = cpu_supports_bf16()
+    use_bf16 = bf16 == "on" or (bf16 == "auto" and supported)
+    if bf16 == "on" and not supported:
+        print("Warning: bf16 forced on without native hardware support; training may be slower")
+    use_fp16 = bool(use_fp16) and torch.cuda.is_available() and not use_bf16
+    return use_bf16, use_fp16
+
+def apply_threads(threads):
+    """Set torch intra-op threads (None or 0 keeps torch's default of one per physical core)"""
+    if threads:
+        torch.set_num_threads(int(threads))
+    return torch.get_num_threads()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Training throughput metrics
+Counts samples and real vs padded tokens per batch and logs samples/sec, tokens/sec, padding ratio
+and peak memory during training
+"""
+
+import resource
+import sys
+import time
+import torch
+from transformers import TrainerCallback
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+class TokenCounter:
+    """
+    Counts samples, real (attention_mask) and total tokens the model is fed.
+    Hooks the model's forward instead of the collator so batches collated in
+    dataloader worker processes are counted too.
+    """
+
+    def __init__(self, model):
+        self.samples = 0
+        self.real_tokens = 0
+        self.total_tokens = 0
+        self._handle = model.register_forward_pre_hook(self._count, with_kwargs=True)
+
+    def _count(self, module, args, kwargs):
+        input_ids = kwargs.get("input_ids", args[0] if args else None)
+        if input_ids is None:
+            return
+        mask = kwargs.get("attention_mask")
+        self.samples += input_ids.shape[0]
+        self.total_tokens += input_ids.numel()
+        self.real_tokens += int(mask.sum()) if mask is not None else input_ids.numel()
+
+    def remove(self):
+        self._handle.remove()
+
+class ThroughputCallback(TrainerCallback):
+    """
+    Logs training samples/sec, tokens/sec, padding ratio and peak memory at
+    every logging step.
+    Only time spent inside training steps is counted, and tokens seen
+    during evaluation are discarded.
+    """
+
+    def __init__(self, counter):
+        self.counter = counter
+        self.samples = 0
+        self.real_tokens = 0
+        self.total_tokens = 0
+        self.train_secs = 0.0
+        self._baseline = (0, 0, 0)
+        self._step_started = None
+
+    def _take(self):
+        current = (self.counter.samples, self.counter.real_tokens, self.counter.total_tokens)
+        delta = tuple(now - before for now, before in zip(current, self._baseline))
+        self._baseline = current
+        return delta
+
+    def on_train_begin(self, args, state, control, **kwargs):
+        self._baseline = (self.counter.samples, self.counter.real_tokens, self.counter.total_tokens)
+
+    def on_step_begin(self, args, state, control, **kwargs):
+        self._step_started = time.perf_counter()
+
+    def on_step_end(self, args, state, control, **kwargs):
+        if self._step_started is not None:
+            self.train_secs += time.perf_counter() - self._step_started
+            self._step_started = None
+        samples, real, total = self._take()
+        self.samples += samples
+        self.real_tokens += real
+        self.total_tokens += total
+
+    def on_evaluate(self, args, state, control, **kwargs):
+        self._take()
+
+    def summary(self):
+        stats = {
+            "samples_per_sec": round(self.samples / self.train_secs, 2) if self.train_secs else 0.0,
+            "tokens_per_sec": round(self.real_tokens / self.train_secs, 1) if self.train_secs else 0.0,
+            "padding_ratio": round(1 - self.real_tokens / self.total_tokens, 4) if self.total_tokens else 0.0,
+            "train_samples": self.samples,
+            "train_tokens": self.real_tokens,
+            "train_secs": round(self.train_secs, 1),
+            "peak_rss_mb": peak_rss_mb(),
+        }
+        if torch.cuda.is_available():
+            stats["peak_cuda_mb"] = round(torch.cuda.max_memory_allocated() / (1024 * 1024), 1)
+        return stats
+
+    def on_log(self, args, state, control, logs=None, **kwargs):
+        if state.is_world_process_zero and self.total_tokens:
+            stats = self.summary()
+            print(f"Step {state.global_step}: {stats['samples_per_sec']:,.2f} samples/sec, "
+                  f"{stats['tokens_per_sec']:,.0f} tokens/sec, padding ratio {stats['padding_ratio']:.1%}, "
+                  f"peak RSS {stats['peak_rss_mb']:,.0f} MB")
+
+    def on_train_end(self, args, state, control, **kwargs):
+        stats = self.summary()
+        print(f"Training throughput: {stats['samples_per_sec']:,.2f} samples/sec, "
+              f"{stats['tokens_per_sec']:,.0f} tokens/sec over {stats['train_tokens']:,} tokens, "
+              f"padding ratio {stats['padding_ratio']:.1%}, peak RSS {stats['peak_rss_mb']:,.0f} MB")
@@ -0,0 +1,450 @@
+"""
+Coalescing, cached geocoding for emergency call locations
+
+Calls about one incident tend to arrive together and name the same address.
+GeocodingService normalizes each address and keeps one in-flight lookup per
+normalized address: concurrent callers share its Future instead of each
+blocking on their own request. Results are cached with a TTL; an expired
+entry is still served for GEOCODE_STALE_SECS while a single background
+refresh runs. Every caller waits at most its own deadline and then falls back
+to (0.0, 0.0), while the lookup keeps going and fills the cache for the next
+caller. Lookups go through pooled keep-alive HTTPS connections, so a warm
+process skips the TCP and TLS handshakes.
+
+Lookups come from a pluggable backend (GEOCODER_BACKEND): `aws` searches the
+AWS Location place index created by setup_geocoding.py (the default when
+LOCATION_INDEX is set), `openai` asks gpt-4o, and `stub` returns deterministic
+Nashville coordinates without any network for local runs and tests.
+
+    python geocoding.py --backend stub "100 Broadway" "1 Titans Way"
+    python geocoding.py --file addresses.txt --repeat 2
+"""
+import argparse
+import asyncio
+import hashlib
+import http.client
+import json
+import os
+import re
+import threading
+import time
+import traceback
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from concurrent.futures import wait
+
+GEOCODE_TIMEOUT_SECS = float(os.environ.get('GEOCODE_TIMEOUT_SECS', '10'))
+GEOCODE_CACHE_TTL_SECS = int(os.environ.get('GEOCODE_CACHE_TTL_SECS', str(24 * 3600)))
+GEOCODE_STALE_SECS = int(os.environ.get('GEOCODE_STALE_SECS', str(7 * 24 * 3600)))
+GEOCODE_CACHE_SIZE = int(os.environ.get('GEOCODE_CACHE_SIZE', '10000'))
+GEOCODE_WORKERS = int(os.environ.get('GEOCODE_WORKERS', '8'))
+GEOCODE_CITY = 'Nashville, TN'
+LOCATION_INDEX = os.environ.get('LOCATION_INDEX', '')
+GEOCODER_BACKEND = os.environ.get('GEOCODER_BACKEND', '') or ('aws' if LOCATION_INDEX else 'openai')
+# 'bbox' keeps AWS results inside Davidson County; 'bias' only prefers results near downtown
+LOCATION_AREA = os.environ.get('LOCATION_AREA', 'bbox')
+
+# [min lon, min lat, max lon, max lat] and [lon, lat], as AWS Location expects them
+NASHVILLE_BBOX = [-87.055, 35.965, -86.515, 36.405]
+NASHVILLE_CENTER = [-86.7816, 36.1627]
+
+NOT_FOUND = (0.0, 0.0)
+
+def normalize_address(text):
+    """Cache/coalescing key: case, punctuation and spacing differences don't matter"""
+    text = re.sub(r'[^\w\s#-]', ' ', str(text).lower())
+    return ' '.join(text.split())
+
+class ConnectionPool:
+    """
+    Keep-alive HTTPS connections to one host. request() borrows an idle
+    connection (or opens one), bounds the socket by the caller's deadline and
+    returns the connection for reuse; a connection the server closed while
+    idle is replaced once.
+    """
+
+    def __init__(self, host, max_idle=GEOCODE_WORKERS):
+        self.host = host
+        self.max_idle = max_idle
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def _acquire(self, timeout):
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+        if conn is None:
+            return http.client.HTTPSConnection(self.host, timeout=timeout), False
+        if conn.sock is not None:
+            conn.sock.settimeout(timeout)
+        conn.timeout = timeout
+        return conn, True
+
+    def _release(self, conn):
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def request(self, method, path, body=None, headers=None, deadline=None):
+        """(status, body bytes); raises TimeoutError once the deadline has passed"""
+        while True:
+            remaining = GEOCODE_TIMEOUT_SECS if deadline is None else deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"Deadline passed before {method} {self.host}{path}")
+            conn, reused = self._acquire(remaining)
+            try:
+                conn.request(method, path, body=body, headers=headers or {})
+                response = conn.getresponse()
+                data = response.read()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                conn.close()
+                if reused:
+                    continue  # idle connection closed by the server; retry on a fresh one
+                raise
+            except Exception:
+                conn.close()
+                raise
+            if response.will_close:
+                conn.close()
+            else:
+                self._release(conn)
+            return response.status, data
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+class Geocoder:
+    """
+    Backend interface: lookup(address, deadline) -> (lat, lon), NOT_FOUND
+    when the address has no match; raises on errors. `deadline` is a
+    time.monotonic() value. `enabled` is False when the backend is missing
+    its configuration.
+    """
+    name = None
+    enabled = True
+
+    def lookup(self, address, deadline=None):
+        raise NotImplementedError
+
+class OpenAIGeocoder(Geocoder):
+    """Coordinates from a gpt-4o chat completion"""
+    name = 'openai'
+
+    def __init__(self, api_key=None, model='gpt-4o', pool=None):
+        self.api_key = os.environ.get('OPENAI_API_KEY', '') if api_key is None else api_key
+        self.model = model
+        self.pool = pool or ConnectionPool('api.openai.com')
+
+    @property
+    def enabled(self):
+        return bool(self.api_key)
+
+    def lookup(self, address, deadline=None):
+        search_text = f"{address}, {GEOCODE_CITY}"
+        print(f"🤖 Using GPT to geocode: '{search_text}'")
+
+        prompt = f"""You are a precise geocoding system. Given an address, return ONLY the exact latitude and longitude coordinates in JSON format.
+
+Address: {search_text}
+
+Return the coordinates as a JSON object with this exact format:
+{{"latitude": <number>, "longitude": <number>}}
+
+Be as precise as possible. For Nashville, TN addresses, use your knowledge of the city's geography to determine the most accurate coordinates. Do not include any explanation, only the JSON."""
+
+        payload = {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": "You are a precise geocoding API that returns coordinates in JSON format only."},
+                {"role": "user", "content": prompt}
+            ],
+            "response_format": {"type": "json_object"},
+            "temperature": 0
+        }
+        status, data = self.pool.request(
+            'POST', '/v1/chat/completions',
+            body=json.dumps(payload).encode('utf-8'),
+            headers={
+                'Content-Type': 'application/json',
+                'Authorization': f'Bearer {self.api_key}'
+            },
+            deadline=deadline
+        )
+        if status != 200:
+            raise RuntimeError(f"OpenAI returned HTTP {status}: {data[:200]!r}")
+
+        result = json.loads(data)
+        coords_json = json.loads(result['choices'][0]['message']['content'])
+        latitude = float(coords_json['latitude'])
+        longitude = float(coords_json['longitude'])
+        print(f"✅ GPT geocoded '{search_text}' → lat: {latitude}, lon: {longitude}")
+        return latitude, longitude
+
+class AWSLocationGeocoder(Geocoder):
+    """
+    Coordinates from AWS Location Service (search_place_index_for_text) on
+    `index_name`, restricted to Nashville by FilterBBox or biased towards it
+    by BiasPosition (the API accepts only one of the two).
+
+    `client` is a low-level `location` client or a zero-argument callable
+    that returns one; by default one is created on first use with the
+    timeouts and connection pool sized for the lookup threads.
+    """
+    name = 'aws'
+
+    def __init__(self, index_name=None, client=None, area=LOCATION_AREA):
+        self.index_name = LOCATION_INDEX if index_name is None else index_name
+        self.area = area
+        self._client = client
+
+    @property
+    def enabled(self):
+        return bool(self.index_name)
+
+    def client(self):
+        if self._client is None:
+            import boto3
+            from botocore.config import Config
+            self._client = boto3.client('location', config=Config(
+                connect_timeout=GEOCODE_TIMEOUT_SECS,
+                read_timeout=GEOCODE_TIMEOUT_SECS,
+                retries={'max_attempts': 2},
+                max_pool_connections=GEOCODE_WORKERS,
+            ))
+        client = self._client
+        return client() if callable(client) else client
+
+    def lookup(self, address, deadline=None):
+        if deadline is not None and deadline <= time.monotonic():
+            raise TimeoutError(f"Deadline passed before geocoding '{address}'")
+        search_text = f"{address}, {GEOCODE_CITY}"
+        params = {'IndexName': self.index_name, 'Text': search_text, 'MaxResults': 1}
+        if self.area == 'bias':
+            params['BiasPosition'] = NASHVILLE_CENTER
+        else:
+            params['FilterBBox'] = NASHVILLE_BBOX
+
+        results = self.client().search_place_index_for_text(**params).get('Results', [])
+        if not results:
+            print(f"⚠️  No AWS Location match for '{search_text}'")
+            return NOT_FOUND
+        place = results[0]['Place']
+        longitude, latitude = place['Geometry']['Point']
+        print(f"📍 AWS Location geocoded '{search_text}' → {place.get('Label')} (lat: {latitude}, lon: {longitude})")
+        return float(latitude), float(longitude)
+
+class StubGeocoder(Geocoder):
+    """
+    Offline backend: `known` maps addresses to (lat, lon); anything else
+    gets a stable point inside the Nashville box derived from its normalized
+    text. `latency_secs` simulates a slow API.
+    """
+    name = 'stub'
+
+    def __init__(self, known=None, latency_secs=0.0):
+        self.known = {normalize_address(address): coords for address, coords in (known or {}).items()}
+        self.latency_secs = latency_secs
+        self.calls = 0
+
+    def lookup(self, address, deadline=None):
+        self.calls += 1
+        if self.latency_secs:
+            time.sleep(self.latency_secs)
+        key = normalize_address(address)
+        if key in self.known:
+            return self.known[key]
+        digest = hashlib.sha256(key.encode('utf-8')).digest()
+        min_lon, min_lat, max_lon, max_lat = NASHVILLE_BBOX
+        latitude = min_lat + (max_lat - min_lat) * int.from_bytes(digest[:4], 'big') / 2**32
+        longitude = min_lon + (max_lon - min_lon) * int.from_bytes(digest[4:8], 'big') / 2**32
+        return round(latitude, 6), round(longitude, 6)
+
+BACKENDS = {
+    'aws': AWSLocationGeocoder,
+    'openai': OpenAIGeocoder,
+    'stub': StubGeocoder,
+}
+
+def make_geocoder(backend=None, **kwargs):
+    """Backend instance by name (default GEOCODER_BACKEND); kwargs go to its constructor"""
+    backend = backend or GEOCODER_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown geocoder backend '{backend}' (expected one of {', '.join(BACKENDS)})")
+    return BACKENDS[backend](**kwargs)
+
+class GeocodingService:
+    """
+    geocode(address, timeout) -> (lat, lon), or NOT_FOUND when the lookup
+    fails or misses the caller's deadline. submit() returns the shared Future
+    and geocode_async() awaits it from an event loop.
+
+    `backend` is a Geocoder (or a bare lookup(address, deadline) callable);
+    lookups run on a pool of `workers` threads and get `timeout` seconds
+    per request.
+    """
+
+    def __init__(self, backend, timeout=GEOCODE_TIMEOUT_SECS, ttl_secs=GEOCODE_CACHE_TTL_SECS,
+                 stale_secs=GEOCODE_STALE_SECS, max_entries=GEOCODE_CACHE_SIZE, workers=GEOCODE_WORKERS):
+        self.backend = backend
+        self.lookup = backend.lookup if isinstance(backend, Geocoder) else backend
+        self.timeout = timeout
+        self.ttl_secs = ttl_secs
+        self.stale_secs = stale_secs
+        self.max_entries = max_entries
+        self.workers = workers
+        self._cache = OrderedDict()  # key -> (coords, fetched_at)
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._executor = None
+        self.counts = {'hits': 0, 'stale_hits': 0, 'misses': 0, 'coalesced': 0, 'errors': 0, 'timeouts': 0}
+
+    def _pool(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='geocode')
+        return self._executor
+
+    def _fetch(self, key, address):
+        """Start the single lookup for key (caller holds the lock)"""
+        future = Future()
+        self._inflight[key] = future
+        deadline = time.monotonic() + self.timeout
+
+        def run():
+            try:
+                coords = self.lookup(address, deadline)
+            except Exception as e:
+                with self._lock:
+                    self._inflight.pop(key, None)
+                    self.counts['errors'] += 1
+                print(f"❌ Geocoding error for '{address}': {e}")
+                traceback.print_exc()
+                future.set_exception(e)
+                return
+            with self._lock:
+                self._inflight.pop(key, None)
+                if coords and coords != NOT_FOUND:
+                    self._cache[key] = (coords, time.time())
+                    self._cache.move_to_end(key)
+                    while len(self._cache) > self.max_entries:
+                        self._cache.popitem(last=False)
+            future.set_result(coords)
+
+        self._pool().submit(run)
+        return future
+
+    def submit(self, address):
+        """Future for address's coordinates: cached, shared with an in-flight lookup, or new"""
+        key = normalize_address(address)
+        now = time.time()
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                coords, fetched_at = entry
+                age = now - fetched_at
+                if age <= self.ttl_secs + self.stale_secs:
+                    self._cache.move_to_end(key)
+                    if age <= self.ttl_secs:
+                        self.counts['hits'] += 1
+                    else:
+                        # Serve the stale value now; one background refresh per key
+                        self.counts['stale_hits'] += 1
+                        if key not in self._inflight:
+                            self._fetch(key, address)
+                    future = Future()
+                    future.set_result(coords)
+                    return future
+                del self._cache[key]
+
+            future = self._inflight.get(key)
+            if future is not None:
+                self.counts['coalesced'] += 1
+                return future
+            self.counts['misses'] += 1
+            return self._fetch(key, address)
+
+    def geocode(self, address, timeout=None):
+        future = self.submit(address)
+        try:
+            return future.result(self.timeout if timeout is None else timeout)
+        except FutureTimeout:
+            with self._lock:
+                self.counts['timeouts'] += 1
+            print(f"⏱️  Geocoding '{address}' missed its deadline; the lookup continues for the cache")
+            return NOT_FOUND
+        except Exception:
+            return NOT_FOUND
+
+    def geocode_many(self, addresses, timeout=None):
+        """
+        Coordinates for every address, in order. Lookups run concurrently on
+        the pool (duplicates and cached addresses cost nothing) and share one
+        deadline; addresses that miss it come back as NOT_FOUND.
+        """
+        futures = [self.submit(address) for address in addresses]
+        done, pending = wait(futures, self.timeout if timeout is None else timeout)
+        if pending:
+            with self._lock:
+                self.counts['timeouts'] += len(pending)
+        results = []
+        for future in futures:
+            if future in done and future.exception() is None:
+                results.append(future.result())
+            else:
+                results.append(NOT_FOUND)
+        return results
+
+    async def geocode_async(self, address, timeout=None):
+        try:
+            return await asyncio.wait_for(
+                asyncio.shield(asyncio.wrap_future(self.submit(address))),
+                self.timeout if timeout is None else timeout
+            )
+        except asyncio.TimeoutError:
+            with self._lock:
+                self.counts['timeouts'] += 1
+            return NOT_FOUND
+        except Exception:
+            return NOT_FOUND
+
+    def stats(self):
+        with self._lock:
+            return {**self.counts, 'entries': len(self._cache), 'inflight': len(self._inflight)}
+
+def main():
+    parser = argparse.ArgumentParser(description="Geocode Nashville addresses with the configured backend")
+    parser.add_argument("addresses", nargs="*", help="Addresses to geocode")
+    parser.add_argument("--file", help="File with one address per line")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default=GEOCODER_BACKEND, help="Geocoder backend")
+    parser.add_argument("--repeat", type=int, default=1, help="Geocode the batch this many times (later rounds hit the cache)")
+    parser.add_argument("--timeout", type=float, default=GEOCODE_TIMEOUT_SECS, help="Deadline per batch in seconds")
+    args = parser.parse_args()
+
+    addresses = list(args.addresses)
+    if args.file:
+        with open(args.file) as f:
+            addresses += [line.strip() for line in f if line.strip()]
+    if not addresses:
+        parser.error("no addresses given")
+
+    backend = make_geocoder(args.backend)
+    if not backend.enabled:
+        parser.error(f"backend '{args.backend}' is not configured (set LOCATION_INDEX or OPENAI_API_KEY)")
+    service = GeocodingService(backend, timeout=args.timeout)
+
+    for round_number in range(1, args.repeat + 1):
+        started = time.perf_counter()
+        results = service.geocode_many(addresses, timeout=args.timeout)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        print(f"\n🌍 Round {round_number}: {len(addresses)} addresses in {elapsed_ms:.1f} ms ({args.backend})")
+        for address, (latitude, longitude) in zip(addresses, results):
+            print(f"   {address} → {latitude:.6f}, {longitude:.6f}")
+
+    print(f"\n📊 {json.dumps(service.stats())}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Idempotent ingest for ElevenLabs webhooks
+
+ElevenLabs retries deliveries, so the same call can arrive several times.
+IdempotencyGuard.claim() lets exactly one delivery through: an in-process LRU
+answers repeat deliveries to the same container/worker for free, and an
+optional DynamoDB table (conditional put) catches the ones that land elsewhere.
+When the call is persisted after the response (webhook_server.py's ingest
+queue), claim it with a short in-flight TTL and commit() it once stored, so a
+call lost in a crash or redeploy lets the sender's retry through.
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+IDEMPOTENCY_TABLE = os.environ.get('IDEMPOTENCY_TABLE', '')
+IDEMPOTENCY_TTL_SECS = int(os.environ.get('IDEMPOTENCY_TTL_SECS', str(24 * 60 * 60)))
+IDEMPOTENCY_CACHE_SIZE = int(os.environ.get('IDEMPOTENCY_CACHE_SIZE', '10000'))
+IDEMPOTENCY_INFLIGHT_SECS = int(os.environ.get('IDEMPOTENCY_INFLIGHT_SECS', '300'))
+
+def idempotency_key(conversation_id, event_timestamp, signature=None):
+    """
+    Key a delivery on conversation_id + event_timestamp.
+
+    Retries are re-signed, so the signature only takes part when the call
+    itself can't be identified (missing conversation_id); in that case it is
+    the best stand-in for the delivery. Returns None when nothing identifies
+    the delivery.
+    """
+    if conversation_id and conversation_id != 'unknown':
+        identity = f"{conversation_id}|{event_timestamp}"
+    elif signature:
+        identity = f"sig|{signature}"
+    else:
+        return None
+    return hashlib.sha256(identity.encode('utf-8')).hexdigest()
+
+def _is_conditional_check_failure(error):
+    response = getattr(error, 'response', None) or {}
+    return response.get('Error', {}).get('Code') == 'ConditionalCheckFailedException'
+
+class IdempotencyGuard:
+    """
+    claim(key) -> True for the first delivery of a key, False for duplicates.
+    release(key) forgets a claim so a retry can run again after a failure.
+    claim(key, ttl_secs=...) holds the key only that long; commit(key)
+    extends it to the full TTL once the call is stored.
+
+    `client` is a low-level DynamoDB client or a zero-argument callable that
+    returns one (so callers can keep client creation lazy). Without a table
+    name only the in-memory LRU is used.
+    """
+
+    def __init__(self, client=None, table_name=IDEMPOTENCY_TABLE, ttl_secs=IDEMPOTENCY_TTL_SECS,
+                 max_entries=IDEMPOTENCY_CACHE_SIZE):
+        self._client = client
+        self.table_name = table_name
+        self.ttl_secs = ttl_secs
+        self.max_entries = max_entries
+        self._seen = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _dynamodb(self):
+        client = self._client
+        return client() if callable(client) else client
+
+    def _remember(self, key, expires_at):
+        with self._lock:
+            self._seen[key] = expires_at
+            self._seen.move_to_end(key)
+            while len(self._seen) > self.max_entries:
+                self._seen.popitem(last=False)
+
+    def _seen_recently(self, key, now):
+        with self._lock:
+            expires_at = self._seen.get(key)
+            if expires_at is None:
+                return False
+            if expires_at <= now:
+                del self._seen[key]
+                return False
+            self._seen.move_to_end(key)
+            return True
+
+    def claim(self, key, ttl_secs=None):
+        if key is None:
+            return True
+        now = time.time()
+        if self._seen_recently(key, now):
+            return False
+
+        expires_at = int(now) + (self.ttl_secs if ttl_secs is None else ttl_secs)
+        if self.table_name and self._client is not None:
+            try:
+                self._dynamodb().put_item(
+                    TableName=self.table_name,
+                    Item={
+                        'idempotency_key': {'S': key},
+                        'expires_at': {'N': str(expires_at)},
+                    },
+                    ConditionExpression='attribute_not_exists(idempotency_key) OR expires_at < :now',
+                    ExpressionAttributeValues={':now': {'N': str(int(now))}}
+                )
+            except Exception as e:
+                if _is_conditional_check_failure(e):
+                    self._remember(key, expires_at)
+                    return False
+                # Fail open: a DynamoDB hiccup must not drop a real call
+                print(f"⚠️  Idempotency check unavailable, processing anyway: {e}")
+
+        self._remember(key, expires_at)
+        return True
+
+    def commit(self, key):
+        """Hold a claimed key for the full TTL"""
+        if key is None:
+            return
+        expires_at = int(time.time()) + self.ttl_secs
+        self._remember(key, expires_at)
+        if self.table_name and self._client is not None:
+            try:
+                self._dynamodb().put_item(
+                    TableName=self.table_name,
+                    Item={
+                        'idempotency_key': {'S': key},
+                        'expires_at': {'N': str(expires_at)},
+                    }
+                )
+            except Exception as e:
+                # The in-flight claim still covers retries until it expires
+                print(f"⚠️  Failed to commit idempotency key: {e}")
+
+    def release(self, key):
+        if key is None:
+            return
+        with self._lock:
+            self._seen.pop(key, None)
+        if self.table_name and self._client is not None:
+            try:
+                self._dynamodb().delete_item(
+                    TableName=self.table_name,
+                    Key={'idempotency_key': {'S': key}}
+                )
+            except Exception as e:
+                print(f"⚠️  Failed to release idempotency key: {e}")
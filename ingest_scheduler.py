@@ -0,0 +1,192 @@
+"""
+Priority-aware ingest scheduling for webhook_server.py
+
+Calls are classified from the severity (and emergency type) the ElevenLabs
+agent extracted, queued per priority, and drained by a pool of worker
+threads with smooth weighted round robin: with the default weights a
+critical call is picked 8 times as often as a low one, so critical calls
+skip the backlog during a surge while lower priorities still make progress.
+Per-priority depth, queue wait and processing latency are tracked for
+metrics().
+"""
+import os
+import threading
+import time
+import traceback
+from collections import deque
+
+PRIORITIES = ('critical', 'high', 'normal', 'low')
+DEFAULT_WEIGHTS = {'critical': 8, 'high': 4, 'normal': 2, 'low': 1}
+
+INGEST_WORKERS = int(os.getenv('INGEST_WORKERS', '0'))
+INGEST_MAX_PENDING = int(os.getenv('INGEST_MAX_PENDING', '10000'))
+LATENCY_SAMPLES = 1000
+
+SEVERITY_PRIORITY = {
+    'critical': 'critical',
+    'high': 'high',
+    'moderate': 'normal',
+    'medium': 'normal',
+    'low': 'low',
+}
+# Emergency types that decide priority regardless of the severity the agent picked
+TYPE_PRIORITY = {
+    'trapped_person': 'critical',
+    'building_collapse': 'critical',
+    'structure_fire': 'critical',
+    'gas_leak': 'critical',
+    'shelter_information': 'low',
+}
+
+class QueueFull(Exception):
+    """The scheduler already holds max_pending calls"""
+
+def classify(severity=None, emergency_type=None):
+    """Priority for a call from its extracted severity and emergency type (unknown -> normal)"""
+    if isinstance(emergency_type, str):
+        priority = TYPE_PRIORITY.get(emergency_type.strip().lower())
+        if priority:
+            return priority
+    if isinstance(severity, str):
+        return SEVERITY_PRIORITY.get(severity.strip().lower(), 'normal')
+    return 'normal'
+
+def _percentile(ordered, pct):
+    if not ordered:
+        return None
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))], 2)
+
+class IngestScheduler:
+    """
+    submit(priority, job) queues a job for handler(job) on one of `workers`
+    threads; raises QueueFull beyond max_pending so callers can shed load
+    (e.g. answer 503 and let the sender retry).
+    """
+
+    def __init__(self, handler, workers=INGEST_WORKERS, weights=None, max_pending=INGEST_MAX_PENDING,
+                 on_error=None):
+        self.handler = handler
+        self.on_error = on_error
+        self.weights = dict(DEFAULT_WEIGHTS, **(weights or {}))
+        self.max_pending = max_pending
+        self._queues = {priority: deque() for priority in PRIORITIES}
+        self._current = {priority: 0 for priority in PRIORITIES}
+        self._pending = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._stats = {
+            priority: {
+                'submitted': 0, 'completed': 0, 'failed': 0,
+                'wait_ms': deque(maxlen=LATENCY_SAMPLES),
+                'total_ms': deque(maxlen=LATENCY_SAMPLES),
+            }
+            for priority in PRIORITIES
+        }
+        self._threads = [
+            threading.Thread(target=self._run, name=f"ingest-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, priority, job):
+        if priority not in self._queues:
+            priority = 'normal'
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Scheduler is closed")
+            if self._pending >= self.max_pending:
+                raise QueueFull(f"{self._pending} calls already queued")
+            self._queues[priority].append((time.monotonic(), job))
+            self._pending += 1
+            self._stats[priority]['submitted'] += 1
+            self._cond.notify()
+        return priority
+
+    def _next(self):
+        """Smooth weighted round robin over non-empty queues (caller holds the lock)"""
+        ready = [p for p in PRIORITIES if self._queues[p]]
+        total = 0
+        for priority in PRIORITIES:
+            if not self._queues[priority]:
+                self._current[priority] = 0  # idle queues don't bank credit
+                continue
+            self._current[priority] += self.weights[priority]
+            total += self.weights[priority]
+        chosen = max(ready, key=lambda p: self._current[p])
+        self._current[chosen] -= total
+        self._pending -= 1
+        return chosen, self._queues[chosen].popleft()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending:
+                    return  # closed and drained
+                priority, (queued_at, job) = self._next()
+
+            started = time.monotonic()
+            failed = False
+            try:
+                self.handler(job)
+            except Exception as e:
+                failed = True
+                print(f"❌ Ingest worker error ({priority}): {e}")
+                traceback.print_exc()
+                if self.on_error:
+                    self.on_error(job, e)
+            finished = time.monotonic()
+
+            with self._cond:
+                stats = self._stats[priority]
+                stats['failed' if failed else 'completed'] += 1
+                stats['wait_ms'].append((started - queued_at) * 1000)
+                stats['total_ms'].append((finished - queued_at) * 1000)
+
+    def depth(self, priority=None):
+        with self._cond:
+            if priority:
+                return len(self._queues[priority])
+            return self._pending
+
+    def metrics(self):
+        """Per-priority depth, counts and queue-wait / time-to-done percentiles (ms)"""
+        with self._cond:
+            snapshot = {}
+            for priority in PRIORITIES:
+                stats = self._stats[priority]
+                wait = sorted(stats['wait_ms'])
+                total = sorted(stats['total_ms'])
+                snapshot[priority] = {
+                    'depth': len(self._queues[priority]),
+                    'weight': self.weights[priority],
+                    'submitted': stats['submitted'],
+                    'completed': stats['completed'],
+                    'failed': stats['failed'],
+                    'wait_ms_p50': _percentile(wait, 50),
+                    'wait_ms_p95': _percentile(wait, 95),
+                    'total_ms_p50': _percentile(total, 50),
+                    'total_ms_p95': _percentile(total, 95),
+                }
+            return {'pending': self._pending, 'workers': len(self._threads), 'priorities': snapshot}
+
+    def close(self, timeout=None):
+        """
+        Stop accepting work and give the workers up to `timeout` seconds to
+        drain the queues. Returns the jobs still queued after that, which
+        will not run.
+        """
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(None if deadline is None else max(0, deadline - time.monotonic()))
+        with self._cond:
+            leftover = [job for priority in PRIORITIES for _, job in self._queues[priority]]
+            for queue in self._queues.values():
+                queue.clear()
+            self._pending = 0
+        return leftover
@@ -0,0 +1,124 @@
+"""
+Replay protection for signed ElevenLabs webhooks
+
+A correctly signed request stays valid for the whole signature window, so a
+captured delivery could be replayed through geocoding, DynamoDB and S3 again.
+ReplayGuard remembers every accepted (timestamp, signature) nonce until its
+timestamp leaves the window. The nonce uses only the signature that verified,
+so padding or reordering the header's other v0= entries doesn't make a new
+one. Nonces sit in per-minute buckets, so expiry drops whole buckets as the
+window slides and lookups stay O(1). An optional
+DynamoDB table (conditional put) shares the nonces across Lambda containers.
+"""
+import hashlib
+import os
+import threading
+import time
+
+import webhook_signature
+
+REPLAY_TABLE = os.environ.get('REPLAY_TABLE', os.environ.get('IDEMPOTENCY_TABLE', ''))
+REPLAY_CACHE_SIZE = int(os.environ.get('REPLAY_CACHE_SIZE', '100000'))
+REPLAY_BUCKET_SECS = 60
+
+def nonce_key(timestamp, signature):
+    """Nonce for a signed request: its timestamp plus the signature that verified"""
+    return f"{timestamp}.{signature.decode('ascii', 'replace')}"
+
+class ReplayGuard:
+    """
+    seen(timestamp, signatures) -> True if any of the header's signatures
+    was already accepted at that timestamp (memory only, for rejecting
+    replays before any hashing).
+    claim(timestamp, signature) -> True for the first acceptance of a nonce;
+    call it with the signature that verified (PendingSignature.matches()).
+    release(timestamp, signature) -> forget a claimed nonce so the sender's
+    retry of a delivery that was not stored is accepted.
+
+    `client` is a low-level DynamoDB client or a zero-argument callable that
+    returns one. Without a table name only the in-memory buckets are used.
+    When more than max_entries nonces are live the oldest bucket is dropped
+    early, trading a little replay coverage for bounded memory.
+    """
+
+    def __init__(self, window_secs=webhook_signature.SIGNATURE_TOLERANCE_SECS, bucket_secs=REPLAY_BUCKET_SECS,
+                 max_entries=REPLAY_CACHE_SIZE, client=None, table_name=REPLAY_TABLE):
+        self.window_secs = window_secs
+        self.bucket_secs = bucket_secs
+        self.max_entries = max_entries
+        self._client = client
+        self.table_name = table_name
+        self._buckets = {}
+        self._size = 0
+        self._swept_at = None
+        self._lock = threading.Lock()
+
+    def _dynamodb(self):
+        client = self._client
+        return client() if callable(client) else client
+
+    def _item_key(self, key):
+        return {'idempotency_key': {'S': 'replay|' + hashlib.sha256(key.encode('utf-8')).hexdigest()}}
+
+    def _sweep(self, now):
+        """Drop buckets whose newest timestamp is outside the window (caller holds the lock)"""
+        cutoff = int(now - self.window_secs) // self.bucket_secs
+        if self._swept_at == cutoff and self._size <= self.max_entries:
+            return
+        self._swept_at = cutoff
+        for bucket in sorted(self._buckets):
+            if bucket >= cutoff and self._size <= self.max_entries:
+                break
+            self._size -= len(self._buckets.pop(bucket))
+
+    def seen(self, timestamp, signatures, now=None):
+        with self._lock:
+            self._sweep(time.time() if now is None else now)
+            bucket = self._buckets.get(int(timestamp) // self.bucket_secs)
+            return bucket is not None and any(nonce_key(timestamp, signature) in bucket for signature in signatures)
+
+    def claim(self, timestamp, signature, now=None):
+        key = nonce_key(timestamp, signature)
+        now = time.time() if now is None else now
+        with self._lock:
+            self._sweep(now)
+            bucket = self._buckets.setdefault(int(timestamp) // self.bucket_secs, set())
+            if key in bucket:
+                return False
+            bucket.add(key)
+            self._size += 1
+
+        if self.table_name and self._client is not None:
+            try:
+                self._dynamodb().put_item(
+                    TableName=self.table_name,
+                    Item={
+                        **self._item_key(key),
+                        'expires_at': {'N': str(int(timestamp) + self.window_secs)},
+                    },
+                    ConditionExpression='attribute_not_exists(idempotency_key)'
+                )
+            except Exception as e:
+                response = getattr(e, 'response', None) or {}
+                if response.get('Error', {}).get('Code') == 'ConditionalCheckFailedException':
+                    return False
+                # Fail open: a DynamoDB hiccup must not drop a real call
+                print(f"⚠️  Replay check unavailable, processing anyway: {e}")
+        return True
+
+    def release(self, timestamp, signature):
+        key = nonce_key(timestamp, signature)
+        with self._lock:
+            bucket = self._buckets.get(int(timestamp) // self.bucket_secs)
+            if bucket is not None and key in bucket:
+                bucket.discard(key)
+                self._size -= 1
+
+        if self.table_name and self._client is not None:
+            try:
+                self._dynamodb().delete_item(TableName=self.table_name, Key=self._item_key(key))
+            except Exception as e:
+                print(f"⚠️  Could not release replay nonce, the retry will be ignored: {e}")
+
+    def __len__(self):
+        return self._size
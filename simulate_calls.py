@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Offline emergency call simulator
+Streams seeded, reproducible synthetic calls to JSONL, Parquet, DynamoDB or a webhook endpoint
+"""
+import argparse
+import os
+import sys
+import time
+
+import simulation_shards
+import simulation_sinks
+from simulation_scenarios import SCENARIOS
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic 911 calls to one or more sinks")
+    parser.add_argument("--scenario", default="nashville_tornado", choices=sorted(SCENARIOS), help="Scenario name")
+    parser.add_argument("--num-calls", type=int, default=1000, help="Number of calls to generate")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for reproducible output")
+    parser.add_argument("--start-ts", type=int, default=None,
+                        help="Timestamp of the first call (default: fixed epoch when seeded, otherwise now)")
+    parser.add_argument("--batch-size", type=int, default=10_000, help="Calls generated per columnar batch")
+    parser.add_argument("--shards", type=int, default=1,
+                        help="Split the run across this many processes (file sinks get one file per shard)")
+    parser.add_argument("--sink", action="append", default=[],
+                        help="Output sink as kind:target (jsonl:, parquet:, dynamodb:, webhook:); repeatable")
+    parser.add_argument("--webhook-secret", default=os.getenv("ELEVENLABS_WEBHOOK_SECRET", ""),
+                        help="Secret used to sign webhook replays")
+    parser.add_argument("--list-scenarios", action="store_true", help="List scenarios and exit")
+
+    args = parser.parse_args()
+
+    if args.list_scenarios:
+        for name, scenario in SCENARIOS.items():
+            print(f"{name}: {scenario['name']}")
+        return
+
+    sink_specs = args.sink or [f"jsonl:{args.scenario}_calls.jsonl"]
+
+    if args.shards > 1:
+        run_sharded(args, sink_specs)
+        return
+
+    try:
+        sinks = [simulation_sinks.open_sink(spec, webhook_secret=args.webhook_secret) for spec in sink_specs]
+    except (ValueError, RuntimeError) as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    print(f"🚨 Simulating {args.num_calls} calls for {SCENARIOS[args.scenario]['name']}")
+    print(f"   Seed: {args.seed if args.seed is not None else 'random'}")
+    print(f"   Sinks: {', '.join(sink_specs)}")
+
+    started = time.perf_counter()
+
+    def progress(written):
+        elapsed = time.perf_counter() - started
+        print(f"✓ Progress: {written}/{args.num_calls} ({written / elapsed:,.0f} calls/sec)")
+
+    try:
+        written = simulation_sinks.stream_to_sinks(
+            args.scenario, args.num_calls, sinks,
+            seed=args.seed, start_ts=args.start_ts, batch_size=args.batch_size, progress=progress
+        )
+    finally:
+        for sink in sinks:
+            sink.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"✅ Wrote {written} calls in {elapsed:.2f}s")
+
+def run_sharded(args, sink_specs):
+    """Run the simulation as independent shards in a local process pool"""
+    seed, plan = simulation_shards.plan_shards(args.scenario, args.num_calls, args.shards, args.seed, args.start_ts)
+    print(f"🚨 Simulating {args.num_calls} calls for {SCENARIOS[args.scenario]['name']} in {len(plan)} shards")
+    print(f"   Root seed: {seed}")
+    print(f"   Sinks: {', '.join(simulation_shards.shard_sink_spec(spec, 'N') for spec in sink_specs)}")
+
+    started = time.perf_counter()
+    results = simulation_shards.run_local(plan, sink_specs, webhook_secret=args.webhook_secret,
+                                          batch_size=args.batch_size)
+    written, _, errors = simulation_shards.aggregate(results)
+
+    elapsed = time.perf_counter() - started
+    print(f"✅ Wrote {written} calls in {elapsed:.2f}s ({written / elapsed:,.0f} calls/sec)")
+    if errors:
+        print(f"❌ {len(errors)} batch errors, first: {errors[0]}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
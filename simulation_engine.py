@@ -0,0 +1,258 @@
+"""
+Vectorized synthetic call generation for the emergency simulator
+
+Every per-call attribute (area, coordinate jitter, street, street number,
+emergency type, duration, status, phone number, summary slots) is sampled
+as a NumPy array for a whole batch at once. Batches stay columnar until a
+sink needs per-call dicts, so bulk runs never loop in Python per attribute.
+"""
+from datetime import datetime, timezone
+
+import numpy as np
+
+import summary_templates
+from simulation_scenarios import SCENARIOS
+
+STATUSES = ('active', 'dispatched', 'enroute', 'resolved')
+AREA_CODES = ('310', '213', '424', '323', '818', '615')
+
+# (min, max) call duration in seconds by severity; anything else uses DEFAULT_DURATION
+SEVERITY_DURATIONS = {
+    'critical': (120, 300),  # 2-5 minutes
+    'high': (90, 180),       # 1.5-3 minutes
+}
+DEFAULT_DURATION = (60, 120)  # 1-2 minutes
+
+STREET_NUMBER_RANGE = (100, 2999)
+JITTER = 0.02           # degrees of coordinate variance around an area
+WIDE_JITTER = 0.05      # variance used when a location can't be made unique
+DEDUP_ROUNDS = 8        # resampling passes before falling back to WIDE_JITTER
+_COORD_UNITS = 10_000   # uniqueness is judged on coordinates rounded to 4 places
+
+DEFAULT_BATCH_SIZE = 10_000
+
+# Seeded runs without an explicit start time are anchored here (2024-01-01 UTC)
+# so the same seed always yields the same call IDs and timestamps
+DETERMINISTIC_EPOCH = 1_704_067_200
+
+class CompiledScenario:
+    """A scenario's lookup tables as arrays, built once per scenario"""
+
+    def __init__(self, scenario_name, scenario):
+        self.scenario_name = scenario_name
+        self.scenario = scenario
+        self.call_prefix = scenario_name.upper()
+        self.areas = [loc['area'] for loc in scenario['locations']]
+        self.area_lat = np.array([loc['lat'] for loc in scenario['locations']])
+        self.area_lon = np.array([loc['lon'] for loc in scenario['locations']])
+        self.streets = list(scenario['streets'])
+        self.emergency_types = [e['type'] for e in scenario['emergency_types']]
+        self.emergency_descs = [e['desc'] for e in scenario['emergency_types']]
+        self.emergency_sevs = [e['sev'] for e in scenario['emergency_types']]
+        bounds = [SEVERITY_DURATIONS.get(sev, DEFAULT_DURATION) for sev in self.emergency_sevs]
+        self.duration_low = np.array([low for low, _ in bounds])
+        self.duration_high = np.array([high for _, high in bounds])
+        self.templates = summary_templates.get_bank(scenario_name, scenario)
+
+_compiled = {}
+
+def compile_scenario(scenario_name, scenario):
+    compiled = _compiled.get(scenario_name)
+    if compiled is None or compiled.scenario is not scenario:
+        compiled = _compiled[scenario_name] = CompiledScenario(scenario_name, scenario)
+    return compiled
+
+def _sample_locations(compiled, n, rng, jitter, area_probs=None):
+    """
+    area_probs, when given, is an (n, areas) matrix of per-call area weights
+    and jitter may be a per-call array (used by the temporal replay engine)
+    """
+    if area_probs is None:
+        area_idx = rng.integers(0, len(compiled.areas), n)
+    else:
+        cumulative = np.cumsum(area_probs, axis=1)
+        draws = rng.random(n) * cumulative[:, -1]
+        area_idx = (cumulative < draws[:, None]).sum(axis=1)
+    return {
+        'area_idx': area_idx,
+        'lat': compiled.area_lat[area_idx] + rng.uniform(-jitter, jitter, n),
+        'lon': compiled.area_lon[area_idx] + rng.uniform(-jitter, jitter, n),
+        'street_idx': rng.integers(0, len(compiled.streets), n),
+        'street_num': rng.integers(STREET_NUMBER_RANGE[0], STREET_NUMBER_RANGE[1] + 1, n),
+    }
+
+def _location_keys(compiled, loc):
+    """
+    One int64 per call identifying its address and rounded coordinates
+    (the same identity the original per-call retry loop used)
+    """
+    span = int(WIDE_JITTER * _COORD_UNITS)
+    width = 2 * span + 1
+    base_lat = np.rint(compiled.area_lat[loc['area_idx']] * _COORD_UNITS)
+    base_lon = np.rint(compiled.area_lon[loc['area_idx']] * _COORD_UNITS)
+    dlat = np.clip(np.rint(loc['lat'] * _COORD_UNITS) - base_lat + span, 0, width - 1).astype(np.int64)
+    dlon = np.clip(np.rint(loc['lon'] * _COORD_UNITS) - base_lon + span, 0, width - 1).astype(np.int64)
+    street_nums = STREET_NUMBER_RANGE[1] - STREET_NUMBER_RANGE[0] + 1
+    key = loc['area_idx'].astype(np.int64) * len(compiled.streets) + loc['street_idx']
+    key = key * street_nums + (loc['street_num'] - STREET_NUMBER_RANGE[0])
+    return (key * width + dlat) * width + dlon
+
+def _duplicate_mask(keys, seen):
+    """True for every key already in `seen` or repeated earlier in `keys`"""
+    _, first = np.unique(keys, return_index=True)
+    mask = np.ones(len(keys), dtype=bool)
+    mask[first] = False
+    if seen:
+        mask |= np.fromiter((k in seen for k in keys.tolist()), dtype=bool, count=len(keys))
+    return mask
+
+def generate_unique_locations(compiled, n, rng, seen=None, area_probs=None, jitter_scale=None):
+    """
+    Sample n locations with distinct addresses/coordinates, also avoiding
+    any key in `seen` (which is updated in place). Duplicates are resampled
+    as a group; the rare leftovers get the wider fallback variance.
+    area_probs / jitter_scale optionally shape where each call lands.
+    """
+    seen = set() if seen is None else seen
+    scale = np.ones(n) if jitter_scale is None else np.asarray(jitter_scale, dtype=float)
+
+    def resample(rows, jitter):
+        probs = None if area_probs is None else area_probs[rows]
+        return _sample_locations(compiled, len(rows), rng, jitter * scale[rows], probs)
+
+    loc = resample(np.arange(n), JITTER)
+    keys = _location_keys(compiled, loc)
+    for _ in range(DEDUP_ROUNDS):
+        dup = _duplicate_mask(keys, seen)
+        if not dup.any():
+            break
+        redo = np.flatnonzero(dup)
+        fresh = resample(redo, JITTER)
+        for field, values in fresh.items():
+            loc[field][redo] = values
+        keys[redo] = _location_keys(compiled, fresh)
+    else:
+        redo = np.flatnonzero(_duplicate_mask(keys, seen))
+        if len(redo):
+            fresh = resample(redo, WIDE_JITTER)
+            for field, values in fresh.items():
+                loc[field][redo] = values
+            keys[redo] = _location_keys(compiled, fresh)
+    seen.update(keys.tolist())
+    return loc
+
+def generate_batch(compiled, n, rng, start_index=0, start_ts=0, seen=None, area_probs=None, jitter_scale=None):
+    """Sample one columnar batch of n calls"""
+    batch = generate_unique_locations(compiled, n, rng, seen, area_probs, jitter_scale)
+    emergency_idx = rng.integers(0, len(compiled.emergency_types), n)
+    batch.update({
+        'index': np.arange(start_index, start_index + n),
+        'timestamp': start_ts + np.arange(start_index, start_index + n),
+        'call_suffix': rng.integers(1000, 10000, n),
+        'emergency_idx': emergency_idx,
+        'duration': rng.integers(compiled.duration_low[emergency_idx], compiled.duration_high[emergency_idx] + 1),
+        'status_idx': rng.integers(0, len(STATUSES), n),
+        'area_code_idx': rng.integers(0, len(AREA_CODES), n),
+        'phone_number': rng.integers(2000000, 10000000, n),
+    })
+    batch.update(compiled.templates.sample(rng, emergency_idx))
+    return batch
+
+def generate_call_batches(scenario_name, scenario, num_calls, batch_size=DEFAULT_BATCH_SIZE, rng=None, start_ts=None):
+    """Yield columnar batches covering num_calls calls, unique across the whole run"""
+    compiled = compile_scenario(scenario_name, scenario)
+    rng = rng if rng is not None else np.random.default_rng()
+    start_ts = int(datetime.now().timestamp()) if start_ts is None else int(start_ts)
+    seen = set()
+    for start in range(0, num_calls, batch_size):
+        n = min(batch_size, num_calls - start)
+        yield generate_batch(compiled, n, rng, start_index=start, start_ts=start_ts, seen=seen)
+
+def get_scenario(scenario_name):
+    if scenario_name not in SCENARIOS:
+        raise ValueError(f"Unknown scenario: {scenario_name} (available: {', '.join(SCENARIOS)})")
+    return SCENARIOS[scenario_name]
+
+def resolve_seed(seed=None):
+    """The given seed as an int, or a fresh random one to report so the run can be repeated"""
+    return int(seed) if seed is not None else int(np.random.SeedSequence().entropy % 2**63)
+
+def resolve_start_ts(seed=None, start_ts=None):
+    if start_ts is not None:
+        return int(start_ts)
+    return DETERMINISTIC_EPOCH if seed is not None else int(datetime.now().timestamp())
+
+def timestamp_to_created_at(ts):
+    """created_at derived from a timestamp (UTC), so seeded output is reproducible"""
+    return datetime.fromtimestamp(ts, timezone.utc).replace(tzinfo=None).isoformat()
+
+def generate_batches(scenario_name, num_calls, seed=None, start_ts=None, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Yield (compiled_scenario, columnar_batch) for a scenario selected by name.
+    The same seed and start_ts always produce the same calls.
+    """
+    scenario = get_scenario(scenario_name)
+    compiled = compile_scenario(scenario_name, scenario)
+    rng = np.random.default_rng(seed)
+    start_ts = resolve_start_ts(seed, start_ts)
+    for batch in generate_call_batches(scenario_name, scenario, num_calls, batch_size, rng, start_ts):
+        yield compiled, batch
+
+def generate_calls(scenario_name, num_calls, seed=None, start_ts=None, batch_size=DEFAULT_BATCH_SIZE):
+    """Stream call records one at a time, materializing a batch at a time"""
+    for compiled, batch in generate_batches(scenario_name, num_calls, seed, start_ts, batch_size):
+        created_at = timestamp_to_created_at(int(batch['timestamp'][0]))
+        yield from batch_to_records(compiled, batch, created_at=created_at)
+
+def batch_addresses(compiled, batch):
+    streets = compiled.streets
+    areas = compiled.areas
+    return [
+        f"{num} {streets[street]}, {areas[area]}"
+        for num, street, area in zip(batch['street_num'].tolist(), batch['street_idx'].tolist(), batch['area_idx'].tolist())
+    ]
+
+def batch_summaries(compiled, batch, addresses):
+    descs = compiled.emergency_descs
+    return compiled.templates.render_batch(batch, [descs[e] for e in batch['emergency_idx'].tolist()], addresses)
+
+def batch_to_records(compiled, batch, created_at=None, summaries=None):
+    """
+    Materialize a columnar batch into call records in the simulator's
+    DynamoDB item shape (plain Python types, coordinates as strings)
+    """
+    created_at = created_at or datetime.now().isoformat()
+    scenario_name = compiled.scenario_name
+    display_name = compiled.scenario['name']
+    addresses = batch_addresses(compiled, batch)
+    if summaries is None:
+        summaries = batch_summaries(compiled, batch, addresses)
+    lat = np.round(batch['lat'], 6).tolist()
+    lon = np.round(batch['lon'], 6).tolist()
+    records = []
+    for i, (ts, suffix, area, emergency, duration, status, area_code, phone) in enumerate(zip(
+            batch['timestamp'].tolist(), batch['call_suffix'].tolist(), batch['area_idx'].tolist(),
+            batch['emergency_idx'].tolist(), batch['duration'].tolist(), batch['status_idx'].tolist(),
+            batch['area_code_idx'].tolist(), batch['phone_number'].tolist())):
+        records.append({
+            'call_id': f"{compiled.call_prefix}-{ts}-{suffix}",
+            'timestamp': ts,
+            'created_at': created_at,
+            'location': {
+                'latitude': str(lat[i]),
+                'longitude': str(lon[i]),
+                'address': addresses[i],
+                'area': compiled.areas[area]
+            },
+            'emergency_type': compiled.emergency_types[emergency],
+            'severity': compiled.emergency_sevs[emergency],
+            'description': compiled.emergency_descs[emergency],
+            'summary': summaries[i],
+            'duration_secs': duration,
+            'caller_phone': f"+1{AREA_CODES[area_code]}{phone}",
+            'status': STATUSES[status],
+            'simulation': True,
+            'scenario': scenario_name,
+            'scenario_name': display_name
+        })
+    return records
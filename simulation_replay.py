@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+Time-sequenced replay of simulated emergency calls
+
+Call arrivals follow a per-scenario surge curve through either an
+inhomogeneous Poisson process or a self-exciting Hawkes process (calls
+trigger follow-up calls, as aftershocks and neighbours reporting the same
+incident do). Incidents spread spatially as the event unfolds. The timeline
+is replayed against the webhook endpoint or the ElevenLabs Lambda handler in
+real time or at N× speed, and the run reports latency and scheduling lag.
+"""
+import argparse
+import importlib
+import json
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import simulation_engine
+import simulation_sinks
+import webhook_signature
+from simulation_scenarios import SCENARIOS
+
+# Relative call intensity over normalized event time u in [0, 1]
+SURGE_CURVES = {
+    'flat': lambda u: np.ones_like(u),
+    'ramp': lambda u: 0.1 + 0.9 * u,
+    # Sharp onset peaking early, then exponential decay (tornado, earthquake)
+    'spike': lambda u: np.where(u < 0.08, u / 0.08, np.exp(-(u - 0.08) / 0.2)),
+    # Slow build to landfall, plateau, then tail-off (hurricane)
+    'build': lambda u: 1 / (1 + np.exp(-12 * (u - 0.35))) * np.where(u > 0.75, np.exp(-(u - 0.75) / 0.15), 1.0),
+}
+
+# Default arrival shape per scenario; `alpha` is the Hawkes branching ratio
+# (expected follow-up calls per call) and `decay` its rate in 1/seconds
+SCENARIO_PROFILES = {
+    'la_wildfire': {'process': 'poisson', 'curve': 'ramp', 'spread': 0.6},
+    'hurricane_florida': {'process': 'poisson', 'curve': 'build', 'spread': 0.8},
+    'earthquake_sf': {'process': 'hawkes', 'curve': 'spike', 'alpha': 0.5, 'decay': 1 / 30, 'spread': 0.9},
+    'nashville_tornado': {'process': 'hawkes', 'curve': 'spike', 'alpha': 0.4, 'decay': 1 / 60, 'spread': 0.5},
+}
+DEFAULT_PROFILE = {'process': 'poisson', 'curve': 'flat', 'spread': 1.0}
+
+def _curve(name):
+    if name not in SURGE_CURVES:
+        raise ValueError(f"Unknown surge curve: {name} (available: {', '.join(SURGE_CURVES)})")
+    return SURGE_CURVES[name]
+
+def poisson_arrivals(num_calls, duration, curve, rng):
+    """
+    num_calls arrival offsets (seconds) of an inhomogeneous Poisson process
+    with intensity proportional to `curve`. Conditional on the count, the
+    points are iid with density ∝ curve, so they're drawn by vectorized
+    rejection sampling.
+    """
+    arrivals = []
+    needed = num_calls
+    while needed > 0:
+        u = rng.random(max(needed * 2, 1024))
+        accepted = u[rng.random(len(u)) < curve(u)]
+        arrivals.append(accepted[:needed])
+        needed -= len(arrivals[-1])
+    return np.sort(np.concatenate(arrivals)) * duration
+
+def hawkes_arrivals(num_calls, duration, curve, rng, alpha=0.4, decay=1 / 60):
+    """
+    Arrival offsets of a Hawkes process with baseline ∝ `curve` and an
+    exponential excitation kernel, simulated by Ogata thinning. The baseline
+    is scaled so the expected count is num_calls; the result is trimmed or
+    topped up from the baseline to exactly num_calls. Requires
+    0 <= alpha < 1 (each call triggers fewer than one follow-up on average,
+    so the process stays finite) and decay > 0.
+    """
+    if not 0 <= alpha < 1:
+        raise ValueError(f"Hawkes alpha must be in [0, 1), got {alpha}")
+    if decay <= 0:
+        raise ValueError(f"Hawkes decay must be positive, got {decay}")
+    grid = np.linspace(0, 1, 1001)
+    mean_curve = float(np.mean(curve(grid)))
+    base_rate = num_calls * (1 - alpha) / (duration * mean_curve)
+    peak_base = base_rate * float(np.max(curve(grid)))
+
+    arrivals = []
+    t = 0.0
+    excitation = 0.0  # sum of alpha * decay * exp(-decay * (t - t_i))
+    while t < duration and len(arrivals) < num_calls * 2:
+        bound = peak_base + excitation
+        step = rng.exponential(1 / bound)
+        t += step
+        excitation *= math.exp(-decay * step)
+        if t >= duration:
+            break
+        intensity = base_rate * float(curve(np.array(t / duration))) + excitation
+        if rng.random() * bound <= intensity:
+            arrivals.append(t)
+            excitation += alpha * decay
+
+    arrivals = np.array(arrivals)
+    if len(arrivals) > num_calls:
+        arrivals = np.sort(rng.choice(arrivals, num_calls, replace=False))
+    elif len(arrivals) < num_calls:
+        top_up = poisson_arrivals(num_calls - len(arrivals), duration, curve, rng)
+        arrivals = np.sort(np.concatenate([arrivals, top_up]))
+    return arrivals
+
+def spatial_spread(compiled, offsets, duration, spread):
+    """
+    Per-call area weights and jitter scale for arrival offsets: the incident
+    front moves through the scenario's areas in order while the affected
+    radius grows. `spread` is the front's width in areas (larger = more diffuse).
+    """
+    u = offsets / duration
+    n_areas = len(compiled.areas)
+    front = u * (n_areas - 1)
+    distance = np.arange(n_areas)[None, :] - front[:, None]
+    area_probs = np.exp(-0.5 * (distance / max(spread, 1e-3)) ** 2) + 1e-6
+    jitter_scale = 0.5 + u
+    return area_probs, jitter_scale
+
+def build_timeline(scenario_name, num_calls, duration, seed=None, start_ts=None,
+                   process=None, curve=None, alpha=None, decay=None, spread=None):
+    """
+    Return [(offset_secs, call_record)] sorted by arrival. Record timestamps
+    and created_at follow the arrival times.
+    """
+    profile = dict(DEFAULT_PROFILE, **SCENARIO_PROFILES.get(scenario_name, {}))
+    process = process or profile['process']
+    curve_fn = _curve(curve or profile['curve'])
+    spread = spread if spread is not None else profile['spread']
+    rng = np.random.default_rng(seed)
+    start_ts = simulation_engine.resolve_start_ts(seed, start_ts)
+
+    if process == 'hawkes':
+        offsets = hawkes_arrivals(num_calls, duration, curve_fn, rng,
+                                  alpha=alpha if alpha is not None else profile.get('alpha', 0.4),
+                                  decay=decay if decay is not None else profile.get('decay', 1 / 60))
+    elif process == 'poisson':
+        offsets = poisson_arrivals(num_calls, duration, curve_fn, rng)
+    else:
+        raise ValueError(f"Unknown arrival process: {process}")
+
+    compiled = simulation_engine.compile_scenario(scenario_name, simulation_engine.get_scenario(scenario_name))
+    area_probs, jitter_scale = spatial_spread(compiled, offsets, duration, spread)
+    batch = simulation_engine.generate_batch(compiled, num_calls, rng, start_ts=start_ts, seen=set(),
+                                             area_probs=area_probs, jitter_scale=jitter_scale)
+    # Stamp arrival times before materializing so call_id and timestamp agree
+    batch['timestamp'] = start_ts + offsets.astype(np.int64)
+    records = simulation_engine.batch_to_records(compiled, batch)
+    for record in records:
+        record['created_at'] = simulation_engine.timestamp_to_created_at(record['timestamp'])
+    return list(zip(offsets.tolist(), records))
+
+def arrival_histogram(offsets, duration, buckets=20):
+    counts, _ = np.histogram(offsets, bins=buckets, range=(0, duration))
+    return counts.tolist()
+
+class WebhookTarget:
+    """POSTs each call to the webhook endpoint as a signed ElevenLabs payload"""
+
+    def __init__(self, url, secret=''):
+        self._sink = simulation_sinks.WebhookSink(url, secret=secret, concurrency=1)
+
+    def send(self, record):
+        return self._sink.post(record)
+
+    def close(self):
+        self._sink.close()
+
+class LambdaTarget:
+    """Invokes eleven_labs_lambda.lambda_handler in-process with API Gateway-shaped events"""
+
+    def __init__(self, secret=''):
+        self.handler = importlib.import_module('eleven_labs_lambda').lambda_handler
+        self.signer = webhook_signature.SignatureVerifier(secret)
+
+    def send(self, record):
+        body = json.dumps(simulation_sinks.to_elevenlabs_payload(record), separators=(',', ':'))
+        headers = {}
+        if self.signer.enabled:
+            headers['elevenlabs-signature'] = self.signer.sign(body.encode('utf-8'))
+        return self.handler({'body': body, 'headers': headers}, None)['statusCode']
+
+    def close(self):
+        pass
+
+def open_target(spec, secret=''):
+    kind, _, target = spec.partition(':')
+    if kind == 'webhook' and target:
+        return WebhookTarget(target, secret)
+    if kind == 'lambda':
+        return LambdaTarget(secret)
+    raise ValueError(f"Invalid target '{spec}' (expected webhook:<url> or lambda)")
+
+def _percentile(values, pct):
+    return round(float(np.percentile(values, pct)), 2) if values else None
+
+def replay(timeline, target, speed=1.0, concurrency=32):
+    """
+    Send each call when its arrival offset comes up (offset / speed seconds
+    after start; speed <= 0 sends as fast as possible). Sends run on a thread
+    pool so a slow target doesn't delay the schedule; lag is how late each
+    send actually started.
+    """
+    latencies = []
+    lags = []
+    failures = []
+    lock = threading.Lock()
+    started = time.perf_counter()
+
+    def send(scheduled, record):
+        begin = time.perf_counter()
+        try:
+            status = target.send(record)
+            ok = status is None or 200 <= int(status) < 300
+        except Exception as e:
+            ok = False
+            status = str(e)
+        elapsed = time.perf_counter() - begin
+        with lock:
+            latencies.append(elapsed * 1000)
+            lags.append(max(0.0, begin - scheduled) * 1000)
+            if not ok:
+                failures.append(f"{record['call_id']}: {status}")
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for offset, record in timeline:
+            scheduled = started + (offset / speed if speed > 0 else 0)
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(send, scheduled, record)
+
+    wall = time.perf_counter() - started
+    return {
+        'sent': len(latencies),
+        'failed': len(failures),
+        'wall_secs': round(wall, 2),
+        'achieved_rate_per_sec': round(len(latencies) / wall, 2) if wall else None,
+        'latency_ms': {'p50': _percentile(latencies, 50), 'p95': _percentile(latencies, 95),
+                       'p99': _percentile(latencies, 99), 'max': _percentile(latencies, 100)},
+        'schedule_lag_ms': {'p50': _percentile(lags, 50), 'p99': _percentile(lags, 99),
+                            'max': _percentile(lags, 100)},
+        'errors': failures[:5],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a simulated surge of calls on a realistic timeline")
+    parser.add_argument("--scenario", default="nashville_tornado", choices=sorted(SCENARIOS), help="Scenario name")
+    parser.add_argument("--num-calls", type=int, default=500, help="Calls in the event")
+    parser.add_argument("--duration", type=float, default=3600, help="Event length in simulated seconds")
+    parser.add_argument("--process", choices=["poisson", "hawkes"], help="Arrival process (default: per scenario)")
+    parser.add_argument("--curve", choices=sorted(SURGE_CURVES), help="Surge curve (default: per scenario)")
+    parser.add_argument("--alpha", type=float, help="Hawkes branching ratio, 0 <= alpha < 1")
+    parser.add_argument("--decay", type=float, help="Hawkes excitation decay rate (1/seconds, > 0)")
+    parser.add_argument("--spread", type=float, help="Width of the moving incident front, in areas")
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay speed multiplier (0 = as fast as possible)")
+    parser.add_argument("--target", default="webhook:http://localhost:8000/elevenlabs-webhook",
+                        help="webhook:<url> or lambda (in-process eleven_labs_lambda handler)")
+    parser.add_argument("--webhook-secret", default=os.getenv("ELEVENLABS_WEBHOOK_SECRET", ""),
+                        help="Secret used to sign replayed requests")
+    parser.add_argument("--concurrency", type=int, default=32, help="Maximum in-flight requests")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for a reproducible timeline")
+    parser.add_argument("--dry-run", action="store_true", help="Print the arrival shape without sending")
+
+    args = parser.parse_args()
+
+    try:
+        timeline = build_timeline(
+            args.scenario, args.num_calls, args.duration, seed=args.seed,
+            process=args.process, curve=args.curve, alpha=args.alpha, decay=args.decay, spread=args.spread
+        )
+    except ValueError as e:
+        parser.error(str(e))
+    offsets = np.array([offset for offset, _ in timeline])
+    histogram = arrival_histogram(offsets, args.duration)
+    print(f"🌪️  {SCENARIOS[args.scenario]['name']}: {len(timeline)} calls over {args.duration:.0f}s")
+    if not timeline:
+        print("   No arrivals generated; nothing to replay")
+        return
+    print(f"   Arrivals per {args.duration / len(histogram):.0f}s bucket: {histogram}")
+    print(f"   Peak bucket is {max(histogram) / (len(timeline) / len(histogram)):.1f}x the uniform rate")
+
+    if args.dry_run:
+        return
+
+    target = open_target(args.target, args.webhook_secret)
+    speed_label = f"{args.speed}x" if args.speed > 0 else "max speed"
+    print(f"▶️  Replaying against {args.target} at {speed_label}")
+    try:
+        report = replay(timeline, target, speed=args.speed, concurrency=args.concurrency)
+    finally:
+        target.close()
+    report['arrivals_histogram'] = histogram
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Scenario definitions shared by the simulator Lambda, engine and CLI
+"""
+
+# Scenario configurations
+SCENARIOS = {
+    'la_wildfire': {
+        'name': 'Los Angeles Wildfire',
+        'locations': [
+            {'area': 'Pacific Palisades', 'lat': 34.0453, 'lon': -118.5270},
+            {'area': 'Malibu', 'lat': 34.0259, 'lon': -118.7798},
+            {'area': 'Topanga', 'lat': 34.0941, 'lon': -118.6018},
+            {'area': 'Brentwood', 'lat': 34.0622, 'lon': -118.4747},
+            {'area': 'Santa Monica Mountains', 'lat': 34.0954, 'lon': -118.7513}
+        ],
+        'streets': ['Sunset Mesa Dr', 'Palisades Dr', 'Via de la Paz', 'Porto Marina Way', 'Revello Dr'],
+        'emergency_types': [
+            {'type': 'structure_fire', 'desc': 'house fire with family evacuating', 'sev': 'critical'},
+            {'type': 'evacuation_assistance', 'desc': 'resident needs evacuation help', 'sev': 'high'},
+            {'type': 'trapped_person', 'desc': 'person trapped by fire', 'sev': 'critical'},
+            {'type': 'medical_emergency', 'desc': 'smoke inhalation injury', 'sev': 'high'},
+            {'type': 'shelter_information', 'desc': 'evacuee requesting shelter location', 'sev': 'moderate'}
+        ]
+    },
+    'hurricane_florida': {
+        'name': 'Florida Hurricane',
+        'locations': [
+            {'area': 'Miami Beach', 'lat': 25.7907, 'lon': -80.1300},
+            {'area': 'Fort Lauderdale', 'lat': 26.1224, 'lon': -80.1373},
+            {'area': 'West Palm Beach', 'lat': 26.7153, 'lon': -80.0534}
+        ],
+        'streets': ['Ocean Dr', 'Collins Ave', 'Washington Ave', 'Lincoln Rd', 'Alton Rd'],
+        'emergency_types': [
+            {'type': 'flooding', 'desc': 'severe flooding in home', 'sev': 'critical'},
+            {'type': 'wind_damage', 'desc': 'roof damaged by wind', 'sev': 'high'},
+            {'type': 'power_outage', 'desc': 'power lines down', 'sev': 'high'},
+            {'type': 'evacuation_needed', 'desc': 'requesting evacuation', 'sev': 'critical'}
+        ]
+    },
+    'earthquake_sf': {
+        'name': 'San Francisco Earthquake',
+        'locations': [
+            {'area': 'Marina District', 'lat': 37.8033, 'lon': -122.4377},
+            {'area': 'Mission District', 'lat': 37.7599, 'lon': -122.4148},
+            {'area': 'Financial District', 'lat': 37.7946, 'lon': -122.3999}
+        ],
+        'streets': ['Market St', 'Mission St', 'Valencia St', 'Folsom St', 'Howard St'],
+        'emergency_types': [
+            {'type': 'building_collapse', 'desc': 'partial building collapse', 'sev': 'critical'},
+            {'type': 'gas_leak', 'desc': 'gas leak detected', 'sev': 'critical'},
+            {'type': 'trapped_person', 'desc': 'person trapped in debris', 'sev': 'critical'},
+            {'type': 'medical_injury', 'desc': 'injuries from falling objects', 'sev': 'high'}
+        ]
+    },
+    'nashville_tornado': {
+        'name': 'Nashville Tornado Outbreak',
+        'locations': [
+            {'area': 'Downtown Nashville', 'lat': 36.1627, 'lon': -86.7816},
+            {'area': 'East Nashville', 'lat': 36.1714, 'lon': -86.7489},
+            {'area': 'Germantown', 'lat': 36.1752, 'lon': -86.7845},
+            {'area': 'The Gulch', 'lat': 36.1540, 'lon': -86.7782},
+            {'area': 'Music Row', 'lat': 36.1487, 'lon': -86.7977}
+        ],
+        'streets': ['Broadway', 'Music Valley Dr', 'Dickerson Pike', 'Gallatin Pike', 'Woodland St', 'Main St', 'Church St'],
+        'emergency_types': [
+            {'type': 'building_damage', 'desc': 'severe structural damage from tornado', 'sev': 'critical'},
+            {'type': 'trapped_person', 'desc': 'person trapped in collapsed building', 'sev': 'critical'},
+            {'type': 'debris_injury', 'desc': 'injuries from flying debris', 'sev': 'high'},
+            {'type': 'power_lines_down', 'desc': 'downed power lines blocking road', 'sev': 'high'},
+            {'type': 'gas_leak', 'desc': 'gas line ruptured by tornado', 'sev': 'critical'},
+            {'type': 'vehicle_accident', 'desc': 'multi-vehicle accident during storm', 'sev': 'high'},
+            {'type': 'shelter_needed', 'desc': 'displaced resident needs shelter', 'sev': 'moderate'}
+        ]
+    }
+}
@@ -0,0 +1,152 @@
+"""
+Sharded simulation runs
+
+A large simulate request is split into shards that generate and write their
+calls independently. Each shard gets a seed spawned from the run's root seed
+and a timestamp offset matching its position in the run, so a sharded run is
+reproducible and its call timestamps line up with an unsharded one.
+
+Shards run either in a local process pool (offline, any sink) or as parallel
+self-invocations of the simulator Lambda; results are aggregated back into
+the simulator's response shape.
+"""
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+
+import simulation_engine
+import simulation_sinks
+
+MAX_SHARDS = int(os.environ.get('MAX_SHARDS', '64'))
+SAMPLE_SIZE = 5
+
+def plan_shards(scenario_name, num_calls, shards, seed=None, start_ts=None):
+    """
+    Split a run into at most `shards` shard specs. Without a seed a random
+    root seed is drawn and returned so the run can be repeated.
+    Returns (root_seed, [shard, ...]).
+    """
+    shards = max(1, min(int(shards), MAX_SHARDS, num_calls or 1))
+    root_seed = simulation_engine.resolve_seed(seed)
+    start_ts = simulation_engine.resolve_start_ts(root_seed, start_ts)
+    children = np.random.SeedSequence(root_seed).spawn(shards)
+
+    base, extra = divmod(num_calls, shards)
+    plan = []
+    offset = 0
+    for i, child in enumerate(children):
+        count = base + (1 if i < extra else 0)
+        plan.append({
+            'shard_index': i,
+            'shard_count': shards,
+            'scenario': scenario_name,
+            'num_calls': count,
+            'seed': int(child.generate_state(1, np.uint64)[0] >> 1),
+            'start_ts': start_ts + offset,
+        })
+        offset += count
+    return root_seed, plan
+
+def _sample(compiled, batch, limit):
+    return [{
+        'call_id': f"{compiled.call_prefix}-{ts}-{suffix}",
+        'location': compiled.areas[area],
+        'emergency_type': compiled.emergency_types[emergency],
+    } for ts, suffix, area, emergency in zip(
+        batch['timestamp'][:limit].tolist(), batch['call_suffix'][:limit].tolist(),
+        batch['area_idx'][:limit].tolist(), batch['emergency_idx'][:limit].tolist()
+    )]
+
+def run_shard(shard, sinks, batch_size=simulation_engine.DEFAULT_BATCH_SIZE):
+    """Generate one shard's calls into already-open sinks; returns the shard result"""
+    successful = 0
+    sample_calls = []
+    errors = []
+    for compiled, batch in simulation_engine.generate_batches(
+            shard['scenario'], shard['num_calls'], shard['seed'], shard['start_ts'], batch_size):
+        try:
+            for sink in sinks:
+                sink.write_batch(compiled, batch)
+        except Exception as e:
+            error_msg = (f"Shard {shard['shard_index']}: error writing calls "
+                         f"{int(batch['index'][0]) + 1}-{int(batch['index'][-1]) + 1}: {e}")
+            print(f"✗ {error_msg}")
+            errors.append(error_msg)
+            continue
+        successful += len(batch['index'])
+        if len(sample_calls) < SAMPLE_SIZE:
+            sample_calls.extend(_sample(compiled, batch, SAMPLE_SIZE - len(sample_calls)))
+
+    print(f"✓ Shard {shard['shard_index'] + 1}/{shard['shard_count']}: {successful}/{shard['num_calls']}")
+    return {
+        'shard_index': shard['shard_index'],
+        'successful': successful,
+        'sample_calls': sample_calls,
+        'errors': errors,
+    }
+
+def shard_sink_spec(spec, shard_index):
+    """Give file sinks a per-shard path (calls.jsonl -> calls.shard3.jsonl)"""
+    kind, _, target = spec.partition(':')
+    if kind not in ('jsonl', 'parquet'):
+        return spec
+    root, ext = os.path.splitext(target)
+    return f"{kind}:{root}.shard{shard_index}{ext}"
+
+def _run_shard_to_specs(shard, sink_specs, webhook_secret, batch_size):
+    sinks = [simulation_sinks.open_sink(shard_sink_spec(spec, shard['shard_index']), webhook_secret)
+             for spec in sink_specs]
+    try:
+        return run_shard(shard, sinks, batch_size)
+    finally:
+        for sink in sinks:
+            sink.close()
+
+def run_local(plan, sink_specs, webhook_secret='', max_workers=None,
+              batch_size=simulation_engine.DEFAULT_BATCH_SIZE):
+    """Run shards in a local process pool; each process opens its own sinks"""
+    with ProcessPoolExecutor(max_workers=max_workers or min(len(plan), os.cpu_count() or 1)) as pool:
+        futures = [pool.submit(_run_shard_to_specs, shard, sink_specs, webhook_secret, batch_size)
+                   for shard in plan]
+        return [future.result() for future in futures]
+
+def run_lambda(plan, lambda_client, function_name, table_name, wait=True):
+    """
+    Run each shard as a self-invocation of the simulator Lambda. With wait,
+    shards are invoked in parallel (RequestResponse) and their results
+    returned; otherwise they are queued as async Event invocations and only
+    the acceptance of each invocation is reported.
+    """
+    def invoke(shard):
+        try:
+            response = lambda_client.invoke(
+                FunctionName=function_name,
+                InvocationType='RequestResponse' if wait else 'Event',
+                Payload=json.dumps({'shard': shard, 'table_name': table_name}).encode('utf-8')
+            )
+            if not wait:
+                return {'shard_index': shard['shard_index'], 'successful': 0, 'sample_calls': [], 'errors': []}
+            payload = json.loads(response['Payload'].read())
+            if response.get('FunctionError'):
+                raise RuntimeError(payload.get('errorMessage', response['FunctionError']))
+            return payload
+        except Exception as e:
+            error_msg = f"Shard {shard['shard_index']}: invocation failed: {e}"
+            print(f"✗ {error_msg}")
+            return {'shard_index': shard['shard_index'], 'successful': 0, 'sample_calls': [], 'errors': [error_msg]}
+
+    with ThreadPoolExecutor(max_workers=len(plan)) as pool:
+        return list(pool.map(invoke, plan))
+
+def aggregate(results):
+    """Fold shard results into (successful, sample_calls, errors)"""
+    successful = 0
+    sample_calls = []
+    errors = []
+    for result in sorted(results, key=lambda r: r['shard_index']):
+        successful += result['successful']
+        sample_calls.extend(result['sample_calls'][:SAMPLE_SIZE - len(sample_calls)])
+        errors.extend(result['errors'])
+    return successful, sample_calls, errors
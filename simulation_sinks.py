@@ -0,0 +1,199 @@
+"""
+Output sinks for simulated calls
+
+Every sink takes the simulator's columnar batches through write_batch() and
+is closed once the run ends. open_sink() builds one from a "kind:target"
+spec, e.g. "jsonl:calls.jsonl", "parquet:calls.parquet",
+"dynamodb:wildfire-simulation-calls" or "webhook:http://localhost:8000/elevenlabs-webhook".
+"""
+import json
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import simulation_engine
+import webhook_signature
+
+class Sink:
+    """Base sink: materializes each batch into call records for write_records()"""
+
+    def write_batch(self, compiled, batch):
+        created_at = simulation_engine.timestamp_to_created_at(int(batch['timestamp'][0]))
+        self.write_records(simulation_engine.batch_to_records(compiled, batch, created_at=created_at))
+
+    def write_records(self, records):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+class JsonlSink(Sink):
+    """One compact JSON call record per line"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'w', encoding='utf-8')
+
+    def write_records(self, records):
+        self._file.write(''.join(json.dumps(r, separators=(',', ':')) + '\n' for r in records))
+
+    def close(self):
+        self._file.close()
+
+class ParquetSink(Sink):
+    """
+    Flattened call records in a Parquet file, built straight from the
+    columnar batch (requires pyarrow)
+    """
+
+    def __init__(self, path):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise RuntimeError("The parquet sink requires pyarrow (pip install pyarrow)")
+        self._pa = pyarrow
+        self.path = path
+        self._writer = None
+
+    def write_batch(self, compiled, batch):
+        pa = self._pa
+        addresses = simulation_engine.batch_addresses(compiled, batch)
+        emergency_idx = batch['emergency_idx']
+        created_at = simulation_engine.timestamp_to_created_at(int(batch['timestamp'][0]))
+        table = pa.table({
+            'call_id': [f"{compiled.call_prefix}-{ts}-{suffix}"
+                        for ts, suffix in zip(batch['timestamp'].tolist(), batch['call_suffix'].tolist())],
+            'timestamp': batch['timestamp'],
+            'created_at': pa.array([created_at] * len(addresses)),
+            'latitude': batch['lat'].round(6),
+            'longitude': batch['lon'].round(6),
+            'address': addresses,
+            'area': pa.DictionaryArray.from_arrays(batch['area_idx'].astype('int32'), compiled.areas),
+            'emergency_type': pa.DictionaryArray.from_arrays(emergency_idx.astype('int32'), compiled.emergency_types),
+            'severity': [compiled.emergency_sevs[e] for e in emergency_idx.tolist()],
+            'description': pa.DictionaryArray.from_arrays(emergency_idx.astype('int32'), compiled.emergency_descs),
+            'summary': simulation_engine.batch_summaries(compiled, batch, addresses),
+            'duration_secs': batch['duration'],
+            'caller_phone': [f"+1{simulation_engine.AREA_CODES[a]}{p}"
+                             for a, p in zip(batch['area_code_idx'].tolist(), batch['phone_number'].tolist())],
+            'status': pa.DictionaryArray.from_arrays(batch['status_idx'].astype('int32'), list(simulation_engine.STATUSES)),
+            'scenario': pa.array([compiled.scenario_name] * len(addresses)),
+        })
+        if self._writer is None:
+            self._writer = self._pa.parquet.ParquetWriter(self.path, table.schema)
+        self._writer.write_table(table)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+class DynamoDBSink(Sink):
+    """Batch-writes call records to the simulator's DynamoDB table"""
+
+    def __init__(self, table_name, dynamodb=None):
+        if dynamodb is None:
+            import boto3
+            dynamodb = boto3.resource('dynamodb')
+        self.table = dynamodb.Table(table_name)
+
+    def write_records(self, records):
+        with self.table.batch_writer() as writer:
+            for record in records:
+                writer.put_item(Item=record)
+
+def to_elevenlabs_payload(record):
+    """Wrap a simulated call as an ElevenLabs post_call_transcription webhook"""
+    location = record['location']
+    return {
+        'type': 'post_call_transcription',
+        'event_timestamp': record['timestamp'],
+        'data': {
+            'agent_id': 'simulator',
+            'conversation_id': record['call_id'],
+            'status': 'done',
+            'transcript': [
+                {'role': 'agent', 'message': "911, what's your emergency?"},
+                {'role': 'user', 'message': f"There's a {record['description']} at {location['address']}."},
+                {'role': 'agent', 'message': 'Help is on the way. Stay on the line.'}
+            ],
+            'metadata': {'call_duration_secs': record['duration_secs']},
+            'analysis': {
+                'transcript_summary': record['summary'],
+                'call_successful': 'success',
+                'data_collection_results': {
+                    'emergency_type': {'value': record['emergency_type']},
+                    'location': {'value': location['address']},
+                    'latitude': {'value': float(location['latitude'])},
+                    'longitude': {'value': float(location['longitude'])},
+                    'severity': {'value': record['severity']}
+                }
+            }
+        }
+    }
+
+class WebhookSink(Sink):
+    """Replays each call as a signed ElevenLabs webhook POST"""
+
+    def __init__(self, url, secret='', concurrency=8, timeout=10):
+        self.url = url
+        self.signer = webhook_signature.SignatureVerifier(secret)
+        self.timeout = timeout
+        self.sent = 0
+        self.failed = 0
+        self._pool = ThreadPoolExecutor(max_workers=concurrency)
+
+    def post(self, record):
+        body = json.dumps(to_elevenlabs_payload(record), separators=(',', ':')).encode('utf-8')
+        headers = {'Content-Type': 'application/json'}
+        if self.signer.enabled:
+            headers['elevenlabs-signature'] = self.signer.sign(body)
+        req = urllib.request.Request(self.url, data=body, headers=headers, method='POST')
+        with urllib.request.urlopen(req, timeout=self.timeout) as response:
+            response.read()
+            return response.status
+
+    def _post_quietly(self, record):
+        try:
+            self.post(record)
+            return True
+        except Exception as e:
+            print(f"✗ Webhook replay failed for {record['call_id']}: {e}")
+            return False
+
+    def write_records(self, records):
+        for ok in self._pool.map(self._post_quietly, records):
+            if ok:
+                self.sent += 1
+            else:
+                self.failed += 1
+
+    def close(self):
+        self._pool.shutdown(wait=True)
+
+SINKS = {
+    'jsonl': JsonlSink,
+    'parquet': ParquetSink,
+    'dynamodb': DynamoDBSink,
+    'webhook': WebhookSink,
+}
+
+def open_sink(spec, webhook_secret=''):
+    """Build a sink from a "kind:target" spec"""
+    kind, _, target = spec.partition(':')
+    if kind not in SINKS or not target:
+        raise ValueError(f"Invalid sink '{spec}' (expected one of: {', '.join(k + ':<target>' for k in SINKS)})")
+    if kind == 'webhook':
+        return WebhookSink(target, secret=webhook_secret)
+    return SINKS[kind](target)
+
+def stream_to_sinks(scenario_name, num_calls, sinks, seed=None, start_ts=None,
+                    batch_size=simulation_engine.DEFAULT_BATCH_SIZE, progress=None):
+    """Generate calls batch by batch and hand each batch to every sink; returns the call count"""
+    written = 0
+    for compiled, batch in simulation_engine.generate_batches(scenario_name, num_calls, seed, start_ts, batch_size):
+        for sink in sinks:
+            sink.write_batch(compiled, batch)
+        written += len(batch['index'])
+        if progress:
+            progress(written)
+    return written
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Local cache for Bedrock call summaries
+
+Summary prompts differ mostly by address, so the address is templated out
+of both the prompt and the response before caching: one cache entry then
+serves every address for the same emergency. Entries are keyed on that
+prompt's hash, the model ID and a temperature bucket, and each key holds a
+few response variants so cached runs keep some variety. The cache is a
+SQLite file with a size cap and least-recently-used eviction; in Lambda it
+lives in /tmp and survives warm invocations. A cold container starts from a
+prewarmed copy when one is available: SUMMARY_CACHE_SEED packaged with the
+function, or else SUMMARY_CACHE_S3_URI.
+
+    python summary_cache.py --prewarm              # fill every scenario
+    python summary_cache.py --prewarm --scenario la_wildfire --variants 5
+    python summary_cache.py --prewarm --export bedrock_summary_cache.sqlite3   # package with the Lambda
+    python summary_cache.py --prewarm --upload s3://bucket/bedrock_summary_cache.sqlite3
+    python summary_cache.py --stats
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import shutil
+import sqlite3
+import threading
+import time
+
+SUMMARY_CACHE_PATH = os.environ.get('SUMMARY_CACHE_PATH', '/tmp/bedrock_summary_cache.sqlite3')
+SUMMARY_CACHE_MAX_ENTRIES = int(os.environ.get('SUMMARY_CACHE_MAX_ENTRIES', '5000'))
+SUMMARY_CACHE_VARIANTS = int(os.environ.get('SUMMARY_CACHE_VARIANTS', '3'))
+# Prewarmed cache copied into SUMMARY_CACHE_PATH on a cold start
+SUMMARY_CACHE_SEED = os.environ.get(
+    'SUMMARY_CACHE_SEED', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bedrock_summary_cache.sqlite3'))
+SUMMARY_CACHE_S3_URI = os.environ.get('SUMMARY_CACHE_S3_URI', '')
+
+PROMPT_TEMPLATE = "Write a brief 2-sentence 911 dispatcher summary for: {desc} at {address}. Include emergency services dispatched."
+ADDRESS_MARKER = '<<address>>'
+
+def split_s3_uri(uri):
+    bucket, _, key = uri[len('s3://'):].partition('/')
+    return bucket, key
+
+def seed_cache(path, seed_path=SUMMARY_CACHE_SEED, s3_uri=SUMMARY_CACHE_S3_URI):
+    """
+    Copy a prewarmed cache to `path` when it doesn't exist yet: the packaged
+    seed file first, then the S3 object. Returns where it came from, or None.
+    """
+    if not path or os.path.exists(path):
+        return None
+    if seed_path and os.path.exists(seed_path) and os.path.abspath(seed_path) != os.path.abspath(path):
+        shutil.copyfile(seed_path, path)
+        return seed_path
+    if s3_uri:
+        tmp = f"{path}.download"
+        try:
+            import boto3
+            boto3.client('s3').download_file(*split_s3_uri(s3_uri), tmp)
+            os.replace(tmp, path)
+            return s3_uri
+        except Exception as e:
+            # Start empty rather than fail the simulation
+            print(f"⚠️  Could not download summary cache from {s3_uri}: {e}")
+            if os.path.exists(tmp):
+                os.remove(tmp)
+    return None
+
+def temperature_bucket(temperature):
+    return f"{round(float(temperature), 1):.1f}"
+
+class SummaryCache:
+    """
+    get(key, address) returns a cached summary with the address filled in,
+    or None until the key holds `variants` responses. put() stores one more
+    variant and evicts the least recently used rows beyond max_entries.
+    """
+
+    def __init__(self, path=SUMMARY_CACHE_PATH, max_entries=SUMMARY_CACHE_MAX_ENTRIES,
+                 variants=SUMMARY_CACHE_VARIANTS):
+        self.path = path
+        self.max_entries = max_entries
+        self.variants = max(1, variants)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = None
+        self.seeded_from = seed_cache(path) if path else None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS summaries (
+                    cache_key TEXT NOT NULL,
+                    variant INTEGER NOT NULL,
+                    summary TEXT NOT NULL,
+                    last_used REAL NOT NULL,
+                    PRIMARY KEY (cache_key, variant)
+                )
+            """)
+            self._db.execute('CREATE INDEX IF NOT EXISTS summaries_last_used ON summaries (last_used)')
+
+    @staticmethod
+    def key(prompt, model_id, temperature):
+        identity = f"{model_id}|{temperature_bucket(temperature)}|{prompt}"
+        return hashlib.sha256(identity.encode('utf-8')).hexdigest()
+
+    def get(self, key, address):
+        if self._db is None:
+            return None
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT variant, summary FROM summaries WHERE cache_key = ?', (key,)
+            ).fetchall()
+            if len(rows) < self.variants:
+                self.misses += 1
+                return None
+            variant, summary = random.choice(rows)
+            self._db.execute(
+                'UPDATE summaries SET last_used = ? WHERE cache_key = ? AND variant = ?',
+                (time.time(), key, variant)
+            )
+            self.hits += 1
+        return summary.replace(ADDRESS_MARKER, address)
+
+    def put(self, key, summary, address):
+        """Cache a response; skipped when it can't be made address-independent"""
+        if self._db is None:
+            return False
+        templated = summary.replace(address, ADDRESS_MARKER)
+        street_number = address.split(' ', 1)[0]
+        if street_number.isdigit() and re.search(rf'\b{street_number}\b', templated):
+            # The model reworded the address; caching would leak it into other calls
+            return False
+        with self._lock:
+            # Eviction can remove any variant, so number new ones past the highest left
+            count, variant = self._db.execute(
+                'SELECT COUNT(*), COALESCE(MAX(variant) + 1, 0) FROM summaries WHERE cache_key = ?', (key,)
+            ).fetchone()
+            if count >= self.variants:
+                return False
+            self._db.execute(
+                'INSERT INTO summaries (cache_key, variant, summary, last_used) VALUES (?, ?, ?, ?)',
+                (key, variant, templated, time.time())
+            )
+            self._db.execute("""
+                DELETE FROM summaries WHERE rowid IN (
+                    SELECT rowid FROM summaries ORDER BY last_used
+                    LIMIT MAX(0, (SELECT COUNT(*) FROM summaries) - ?)
+                )
+            """, (self.max_entries,))
+        return True
+
+    def stats(self):
+        entries = keys = 0
+        if self._db is not None:
+            with self._lock:
+                entries, keys = self._db.execute(
+                    'SELECT COUNT(*), COUNT(DISTINCT cache_key) FROM summaries'
+                ).fetchone()
+        return {'path': self.path, 'seeded_from': self.seeded_from, 'entries': entries, 'prompts': keys,
+                'max_entries': self.max_entries, 'hits': self.hits, 'misses': self.misses}
+
+    def export(self, dest):
+        """Write a self-contained copy of the cache (WAL folded in) for packaging or upload"""
+        if self._db is None:
+            raise ValueError("Cache is disabled (no path)")
+        target = sqlite3.connect(dest)
+        try:
+            with self._lock:
+                self._db.backup(target)
+        finally:
+            target.close()
+
+    def clear(self):
+        if self._db is not None:
+            with self._lock:
+                self._db.execute('DELETE FROM summaries')
+
+def invoke_bedrock(bedrock, model_id, prompt, temperature=0.8, max_tokens=200):
+    response = bedrock.invoke_model(
+        modelId=model_id,
+        body=json.dumps({
+            "anthropic_version": "bedrock-2023-05-31",
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "messages": [{
+                "role": "user",
+                "content": prompt
+            }]
+        })
+    )
+    result = json.loads(response['body'].read())
+    return result['content'][0]['text'].strip()
+
+def cached_summary(bedrock, model_id, emergency_desc, address, temperature=0.8, cache=None):
+    """Summary for a call, from the cache when possible and from Bedrock otherwise"""
+    key = None
+    if cache is not None:
+        key = cache.key(PROMPT_TEMPLATE.format(desc=emergency_desc, address=ADDRESS_MARKER), model_id, temperature)
+        summary = cache.get(key, address)
+        if summary is not None:
+            return summary
+
+    summary = invoke_bedrock(bedrock, model_id, PROMPT_TEMPLATE.format(desc=emergency_desc, address=address), temperature)
+    if cache is not None:
+        cache.put(key, summary, address)
+    return summary
+
+def prewarm(bedrock, model_id, scenarios, cache, temperature=0.8):
+    """Fill every emergency type of the given scenarios up to cache.variants responses"""
+    requested = 0
+    for scenario_name, scenario in scenarios.items():
+        location = scenario['locations'][0]
+        address = f"1200 {scenario['streets'][0]}, {location['area']}"
+        for emergency in scenario['emergency_types']:
+            key = cache.key(PROMPT_TEMPLATE.format(desc=emergency['desc'], address=ADDRESS_MARKER), model_id, temperature)
+            for attempt in range(cache.variants * 2):
+                if cache.get(key, address) is not None:
+                    break
+                summary = invoke_bedrock(bedrock, model_id, PROMPT_TEMPLATE.format(desc=emergency['desc'], address=address), temperature)
+                cache.put(key, summary, address)
+                requested += 1
+            print(f"✓ {scenario_name}: {emergency['type']}")
+    return requested
+
+def main():
+    from simulation_scenarios import SCENARIOS
+
+    parser = argparse.ArgumentParser(description="Inspect or prewarm the Bedrock summary cache")
+    parser.add_argument("--prewarm", action="store_true", help="Fill the cache for every scenario's emergency types")
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), help="Prewarm only this scenario")
+    parser.add_argument("--variants", type=int, default=SUMMARY_CACHE_VARIANTS, help="Responses kept per prompt")
+    parser.add_argument("--temperature", type=float, default=0.8, help="Sampling temperature to prewarm for")
+    parser.add_argument("--model", default=os.environ.get('BEDROCK_MODEL', 'us.anthropic.claude-3-5-sonnet-20241022-v2:0'),
+                        help="Bedrock model ID")
+    parser.add_argument("--path", default=SUMMARY_CACHE_PATH, help="Cache file")
+    parser.add_argument("--stats", action="store_true", help="Print cache statistics")
+    parser.add_argument("--clear", action="store_true", help="Delete every cached summary")
+    parser.add_argument("--export", metavar="FILE", help="Write the cache to FILE to package with the Lambda (SUMMARY_CACHE_SEED)")
+    parser.add_argument("--upload", metavar="S3_URI", help="Upload the cache to S3 for cold starts (SUMMARY_CACHE_S3_URI)")
+
+    args = parser.parse_args()
+    cache = SummaryCache(args.path, variants=args.variants)
+
+    if args.clear:
+        cache.clear()
+        print(f"🗑️  Cleared {args.path}")
+
+    if args.prewarm:
+        import boto3
+        scenarios = {args.scenario: SCENARIOS[args.scenario]} if args.scenario else SCENARIOS
+        started = time.perf_counter()
+        requested = prewarm(boto3.client('bedrock-runtime'), args.model, scenarios, cache, args.temperature)
+        print(f"✅ Prewarmed {len(scenarios)} scenarios with {requested} Bedrock requests "
+              f"in {time.perf_counter() - started:.1f}s")
+
+    if args.export:
+        cache.export(args.export)
+        print(f"📦 Exported {args.path} → {args.export}")
+
+    if args.upload:
+        import boto3
+        snapshot = f"{args.path}.upload"
+        cache.export(snapshot)
+        try:
+            boto3.client('s3').upload_file(snapshot, *split_s3_uri(args.upload))
+        finally:
+            os.remove(snapshot)
+        print(f"☁️  Uploaded {args.path} → {args.upload}")
+
+    if args.stats or not (args.prewarm or args.clear or args.export or args.upload):
+        print(json.dumps(cache.stats(), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Template summaries for the simulator's fast mode
+
+A summary is assembled from slots — opener (with caller), hazard detail,
+dispatched units and ETA — each filled from phrase banks. Every scenario
+adds its own hazards and unit types to the shared banks, and the combined
+bank is compiled once per scenario. Bulk runs sample every slot for a whole
+batch as arrays and render in one pass; the per-call Lambda path renders
+single summaries with the same banks.
+"""
+import random
+
+try:
+    import numpy as np
+except ImportError:  # per-call rendering works without NumPy
+    np = None
+
+OPENERS = (
+    "{Caller} reported {desc} at {address}.",
+    "911 received a call from {caller} about {desc} at {address}.",
+    "{Caller} called in {desc} at {address}.",
+    "Dispatch received report of {desc} at {address} from {caller}.",
+    "Emergency call regarding {desc} at {address}; reported by {caller}.",
+    "Report of {desc} at {address}, called in by {caller}.",
+)
+
+CALLERS = (
+    "the caller", "a neighbor", "a passerby", "the homeowner", "a family member",
+    "a resident", "a building manager", "a delivery driver",
+)
+
+DISPATCH = (
+    "{a} and {b} dispatched.",
+    "{a} and {b} en route.",
+    "{a} responding with {b} in support.",
+    "{a} assigned; {b} requested as backup.",
+    "{a} and {b} notified and responding.",
+)
+
+ETAS = (
+    " ETA {eta} minutes.",
+    " First unit expected in {eta} minutes.",
+    " Arrival estimated within {eta} minutes.",
+    " Units {eta} minutes out.",
+    "",
+)
+
+# (min, max) ETA in minutes by severity; anything else uses DEFAULT_ETA
+SEVERITY_ETAS = {
+    'critical': (3, 6),
+    'high': (5, 9),
+}
+DEFAULT_ETA = (8, 15)
+
+UNIT_NUMBER_RANGE = (1, 60)
+
+DEFAULT_UNITS = ("Engine", "Medic", "Ladder", "Battalion")
+
+# Per-scenario hazard details (leading space; "" leaves the slot out) and unit types
+SCENARIO_PHRASES = {
+    'la_wildfire': {
+        'hazards': (
+            "", " Heavy smoke reported in the area.", " Flames visible from the street.",
+            " Winds pushing fire toward structures.", " Embers landing on nearby roofs.",
+            " Road access partially blocked by fire.",
+        ),
+        'units': ("Engine", "Brush", "Medic", "Battalion", "Strike Team", "Water Tender"),
+    },
+    'hurricane_florida': {
+        'hazards': (
+            "", " Water level still rising.", " Sustained winds making access difficult.",
+            " Downed trees blocking the street.", " Caller reports no power in the building.",
+            " Storm surge reported nearby.",
+        ),
+        'units': ("Swift Water Rescue", "Engine", "Medic", "Rescue", "High Water Vehicle"),
+    },
+    'earthquake_sf': {
+        'hazards': (
+            "", " Aftershocks continuing.", " Structural damage visible from outside.",
+            " Strong odor of gas reported.", " Debris on the roadway.",
+            " Multiple people reported injured.",
+        ),
+        'units': ("USAR", "Engine", "Ladder", "Medic", "Rescue", "PG&E crew"),
+    },
+    'nashville_tornado': {
+        'hazards': (
+            "", " Debris blocking the road.", " Power lines down nearby.",
+            " Several homes damaged on the block.", " Caller hears people calling for help.",
+            " Trees down across the driveway.",
+        ),
+        'units': ("Rescue", "Engine", "Medic", "Ladder", "Squad"),
+    },
+}
+DEFAULT_PHRASES = {'hazards': ("",), 'units': DEFAULT_UNITS}
+
+class TemplateBank:
+    """A scenario's phrase banks with the format methods bound once"""
+
+    def __init__(self, scenario_name, scenario):
+        phrases = SCENARIO_PHRASES.get(scenario_name, DEFAULT_PHRASES)
+        self.scenario_name = scenario_name
+        self.scenario = scenario
+        self.openers = [opener.format for opener in OPENERS]
+        self.callers = list(CALLERS)
+        self.callers_cap = [caller[0].upper() + caller[1:] for caller in CALLERS]
+        self.hazards = list(phrases['hazards'])
+        self.units = list(phrases['units'])
+        self.dispatch = [phrase.format for phrase in DISPATCH]
+        self.etas = [eta.format for eta in ETAS]
+        sevs = [e['sev'] for e in scenario['emergency_types']]
+        bounds = [SEVERITY_ETAS.get(sev, DEFAULT_ETA) for sev in sevs]
+        self.eta_low = [low for low, _ in bounds]
+        self.eta_high = [high for _, high in bounds]
+        self.eta_by_severity = dict(zip(sevs, bounds))
+
+    def sample(self, rng, emergency_idx):
+        """Sample every slot for a batch (NumPy Generator + emergency index array)"""
+        n = len(emergency_idx)
+        low, high = UNIT_NUMBER_RANGE
+        return {
+            'summary_opener': rng.integers(0, len(self.openers), n),
+            'summary_caller': rng.integers(0, len(self.callers), n),
+            'summary_hazard': rng.integers(0, len(self.hazards), n),
+            'summary_unit_a': rng.integers(0, len(self.units), n),
+            'summary_unit_b': rng.integers(0, len(self.units), n),
+            'summary_unit_a_num': rng.integers(low, high + 1, n),
+            'summary_unit_b_num': rng.integers(low, high + 1, n),
+            'summary_dispatch': rng.integers(0, len(self.dispatch), n),
+            'summary_eta_phrase': rng.integers(0, len(self.etas), n),
+            'summary_eta': rng.integers(np.asarray(self.eta_low)[emergency_idx],
+                                        np.asarray(self.eta_high)[emergency_idx] + 1),
+        }
+
+    def render_batch(self, slots, descs, addresses):
+        """Render a batch of summaries from sampled slots; descs/addresses are per call"""
+        openers, callers, callers_cap = self.openers, self.callers, self.callers_cap
+        hazards, units, dispatch, etas = self.hazards, self.units, self.dispatch, self.etas
+        return [
+            openers[o](Caller=callers_cap[c], caller=callers[c], desc=desc, address=address)
+            + hazards[h] + " "
+            + dispatch[d](a=f"{units[ua]} {na}", b=f"{units[ub]} {nb}")
+            + etas[ep](eta=eta)
+            for o, c, h, ua, ub, na, nb, d, ep, eta, desc, address in zip(
+                slots['summary_opener'].tolist(), slots['summary_caller'].tolist(),
+                slots['summary_hazard'].tolist(), slots['summary_unit_a'].tolist(),
+                slots['summary_unit_b'].tolist(), slots['summary_unit_a_num'].tolist(),
+                slots['summary_unit_b_num'].tolist(), slots['summary_dispatch'].tolist(),
+                slots['summary_eta_phrase'].tolist(), slots['summary_eta'].tolist(),
+                descs, addresses
+            )
+        ]
+
+    def render(self, desc, address, severity=None, rng=random):
+        """Render one summary using the stdlib random module (or any object with randrange)"""
+        c = rng.randrange(len(self.callers))
+        low, high = UNIT_NUMBER_RANGE
+        eta_low, eta_high = self.eta_by_severity.get(severity, DEFAULT_ETA)
+        units = self.units
+        return (
+            self.openers[rng.randrange(len(self.openers))](
+                Caller=self.callers_cap[c], caller=self.callers[c], desc=desc, address=address)
+            + self.hazards[rng.randrange(len(self.hazards))] + " "
+            + self.dispatch[rng.randrange(len(self.dispatch))](
+                a=f"{units[rng.randrange(len(units))]} {rng.randrange(low, high + 1)}",
+                b=f"{units[rng.randrange(len(units))]} {rng.randrange(low, high + 1)}")
+            + self.etas[rng.randrange(len(self.etas))](eta=rng.randrange(eta_low, eta_high + 1))
+        )
+
+_banks = {}
+
+def get_bank(scenario_name, scenario):
+    bank = _banks.get(scenario_name)
+    if bank is None or bank.scenario is not scenario:
+        bank = _banks[scenario_name] = TemplateBank(scenario_name, scenario)
+    return bank
+
+def render_summary(scenario_name, scenario, desc, address, severity=None):
+    """Single fast-mode summary for a call"""
+    return get_bank(scenario_name, scenario).render(desc, address, severity)
@@ -7,6 +7,8 @@ import boto3
 from dotenv import load_dotenv
 import json
 
+import call_archive
+
 load_dotenv()
 
 AWS_REGION = os.getenv("AWS_REGION")
@@ -64,6 +66,22 @@ if 'Contents' in response:
         print(f"\n  Key: {obj['Key']}")
         print(f"  Size: {obj['Size']} bytes")
         print(f"  Last Modified: {obj['LastModified']}")
+
+    # Decode a few archived payloads (compressed objects are decompressed transparently)
+    print("\n\n📦 Sample Payloads:")
+    print("-" * 80)
+    for obj in response['Contents'][:5]:
+        if not obj['Key'].startswith(call_archive.ARCHIVE_PREFIX + '/'):
+            continue
+        raw = call_archive.read_payload(s3, S3_BUCKET, obj['Key'])
+        payload = json.loads(raw)
+        call_data = payload.get('data', {})
+        ratio = len(raw) / obj['Size'] if obj['Size'] else 0
+        print(f"\n  Key: {obj['Key']}")
+        print(f"  Event type: {payload.get('type')}")
+        print(f"  Conversation: {call_data.get('conversation_id')}")
+        print(f"  Transcript turns: {len(call_data.get('transcript', []))}")
+        print(f"  Raw size: {len(raw)} bytes ({ratio:.1f}x compression)")
 else:
     print("  Bucket is empty")
 
@@ -0,0 +1,62 @@
+"""
+Bounded streaming request bodies for the webhook server
+
+read_body() streams the request instead of buffering it through
+`request.body()`: the declared Content-Length is checked before anything is
+read, the running size is checked per chunk, and each chunk is fed to the
+pending signature (webhook_signature.PendingSignature) as it arrives. The
+chunks are joined once at the end, so a request never holds more than
+max_bytes plus one chunk, and oversized bodies are refused part way through.
+"""
+import os
+
+WEBHOOK_MAX_BODY_BYTES = int(os.getenv("WEBHOOK_MAX_BODY_BYTES", str(10 * 1024 * 1024)))
+
+class BodyRejected(Exception):
+    """The body can't be accepted; `status_code` is the HTTP status to answer with"""
+
+    def __init__(self, status_code, message):
+        super().__init__(message)
+        self.status_code = status_code
+        self.message = message
+
+def declared_length(headers, max_bytes=WEBHOOK_MAX_BODY_BYTES):
+    """Content-Length as an int (None when absent); raises BodyRejected when invalid or too large"""
+    value = headers.get("content-length")
+    if value is None:
+        return None
+    try:
+        length = int(value)
+    except ValueError:
+        raise BodyRejected(400, "Invalid Content-Length")
+    if length < 0:
+        raise BodyRejected(400, "Invalid Content-Length")
+    if length > max_bytes:
+        raise BodyRejected(413, f"Body exceeds {max_bytes} bytes")
+    return length
+
+async def read_body(request, max_bytes=WEBHOOK_MAX_BODY_BYTES, signature=None):
+    """
+    Stream the request body into bytes, enforcing max_bytes while reading.
+    `signature` (optional) receives every chunk through update().
+    """
+    declared_length(request.headers, max_bytes)
+    chunks = []
+    size = 0
+    async for chunk in request.stream():
+        if not chunk:
+            continue
+        size += len(chunk)
+        if size > max_bytes:
+            raise BodyRejected(413, f"Body exceeds {max_bytes} bytes")
+        if signature is not None:
+            signature.update(chunk)
+        chunks.append(chunk)
+    return chunks[0] if len(chunks) == 1 else b"".join(chunks)
+
+def decode_body(body):
+    """The one UTF-8 decode of a body; raises BodyRejected(400) for invalid UTF-8"""
+    try:
+        return body.decode("utf-8")
+    except UnicodeDecodeError:
+        raise BodyRejected(400, "Body is not valid UTF-8")
@@ -0,0 +1,116 @@
+"""
+Fast-path JSON codec for ElevenLabs webhook payloads
+Uses orjson when it is installed and falls back to the stdlib json module.
+Output is always compact UTF-8 bytes.
+"""
+import json
+import re
+
+try:
+    import orjson
+except ImportError:  # stdlib fallback
+    orjson = None
+
+BACKEND = 'orjson' if orjson else 'json'
+
+# Fields the handlers route on, as paths from the top-level object. ElevenLabs
+# sends these ahead of the transcript, so extracting them scans only a prefix.
+ROUTING_FIELDS = {
+    'type': ('type',),
+    'event_timestamp': ('event_timestamp',),
+    'conversation_id': ('data', 'conversation_id'),
+}
+# `analysis` follows the transcript; extracting it scans past the transcript
+# text but still never builds the turn objects
+ANALYSIS_FIELDS = {
+    'analysis': ('data', 'analysis'),
+}
+
+# A JSON string literal (unrolled loop, no backtracking on long transcripts)
+_STRING_RE = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"')
+_WHITESPACE = ' \t\n\r'
+_decoder = json.JSONDecoder()
+
+def to_bytes(body):
+    """Return the payload as bytes without copying when it already is bytes"""
+    if isinstance(body, (bytes, bytearray, memoryview)):
+        return bytes(body)
+    return body.encode('utf-8')
+
+def loads(body):
+    """Decode a JSON payload from bytes or str"""
+    if orjson:
+        return orjson.loads(body)
+    return json.loads(body)
+
+def dumps(obj):
+    """Encode to compact JSON bytes; non-JSON values (datetime, Decimal) go through str()"""
+    if orjson:
+        return orjson.dumps(obj, default=str)
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False, default=str).encode('utf-8')
+
+def _depth(text, start, end):
+    """Change in object/array nesting depth over text[start:end], ignoring string contents"""
+    segment = _STRING_RE.sub('', text[start:end])
+    return (segment.count('{') + segment.count('[')
+            - segment.count('}') - segment.count(']'))
+
+def _skip_whitespace(text, idx):
+    while idx < len(text) and text[idx] in _WHITESPACE:
+        idx += 1
+    return idx
+
+def _find_value(text, key, start):
+    """
+    Index of the value for `key` among the direct members of the object that
+    opens at `start`, or None when the key is absent
+    """
+    pattern = re.compile('"' + re.escape(key) + r'"\s*:')
+    depth = 0
+    scanned = start
+    for match in pattern.finditer(text, start):
+        if text[match.start() - 1] == '\\':
+            continue  # escaped quote inside a longer key
+        # Track depth incrementally between candidates to stay linear
+        depth += _depth(text, scanned, match.start())
+        scanned = match.start()
+        if depth == 1:
+            return _skip_whitespace(text, match.end())
+        if depth < 1:
+            return None  # left the object
+    return None
+
+def extract_fields(body, fields=None):
+    """
+    Decode only the requested fields of a webhook payload.
+
+    `fields` maps output names to key paths (default: ROUTING_FIELDS). Each
+    value is located by scanning the raw text and decoded on its own, so a
+    long transcript elsewhere in the body is never materialized. Missing
+    fields come back as None. Raises json.JSONDecodeError for malformed values.
+    """
+    fields = fields or ROUTING_FIELDS
+    text = body if isinstance(body, str) else to_bytes(body).decode('utf-8')
+    root = _skip_whitespace(text, 0)
+    if not text.startswith('{', root):
+        raise json.JSONDecodeError('Expecting object', text, root)
+
+    result = {}
+    containers = {(): root}
+    for name, path in fields.items():
+        # Resolve the parent objects one level at a time, caching each
+        for depth in range(1, len(path)):
+            parent = path[:depth]
+            if parent in containers:
+                continue
+            parent_idx = containers[path[:depth - 1]]
+            value_idx = None
+            if parent_idx is not None:
+                value_idx = _find_value(text, parent[-1], parent_idx)
+                if value_idx is not None and not text.startswith('{', value_idx):
+                    value_idx = None
+            containers[parent] = value_idx
+        idx = containers[path[:-1]]
+        value_idx = None if idx is None else _find_value(text, path[-1], idx)
+        result[name] = None if value_idx is None else _decoder.raw_decode(text, value_idx)[0]
+    return result
@@ -0,0 +1,159 @@
+"""
+Per-worker webhook log segments and stats for webhook_server.py
+
+With several server processes nothing on disk is shared for writing: each
+process appends to its own segment (`webhook_log.{pid}.jsonl`) and keeps its
+counters in its own stats file (`stats/worker.{pid}.json`, replaced
+atomically). Readers merge: iter_events() walks every segment, plus the
+single-process `webhook_log.jsonl` from older runs, and aggregate_stats()
+sums the files of live workers.
+"""
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+LOG_NAME = "webhook_log"
+LEGACY_LOG = f"{LOG_NAME}.jsonl"
+STATS_DIR = "stats"
+STATS_FLUSH_SECS = 1.0
+# A stats file this old whose pid is gone belongs to an exited worker
+STATS_STALE_SECS = 300
+
+def segment_path(data_dir, pid=None):
+    return Path(data_dir) / f"{LOG_NAME}.{pid or os.getpid()}.jsonl"
+
+def segment_paths(data_dir):
+    """Every log segment in data_dir, the legacy single-file log first"""
+    data_dir = Path(data_dir)
+    paths = sorted(data_dir.glob(f"{LOG_NAME}.*.jsonl"))
+    legacy = data_dir / LEGACY_LOG
+    return ([legacy] if legacy.exists() else []) + paths
+
+class SegmentWriter:
+    """
+    Appends lines to this process's segment; reopens after a fork so children
+    never share a handle. Thread-safe: ingest worker threads share the writer.
+    """
+
+    def __init__(self, data_dir):
+        self.data_dir = Path(data_dir)
+        self._file = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def path(self):
+        return segment_path(self.data_dir)
+
+    def append(self, line):
+        with self._lock:
+            if self._pid != os.getpid():
+                self._file = open(self.path, "ab")
+                self._pid = os.getpid()
+            # One process per segment and one locked write per record, so lines never interleave
+            self._file.write(line + b"\n")
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None and self._pid == os.getpid():
+                self._file.close()
+            self._file = None
+            self._pid = None
+
+def _read_segment(path, loads):
+    with open(path, "rb") as f:
+        for line in f:
+            if line.strip():
+                yield loads(line)
+
+def event_time(event):
+    try:
+        return float(event.get("event_timestamp") or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+def iter_events(data_dir, loads=json.loads, key=event_time):
+    """
+    Decoded records from every segment, sorted by `key`. Segments are in
+    write order, which is neither time order across workers nor within one
+    (the ingest scheduler persists by priority), so sorting loads every
+    record first. key=None streams the segments one after another instead.
+    """
+    streams = [_read_segment(path, loads) for path in segment_paths(data_dir)]
+    if key is None:
+        for stream in streams:
+            yield from stream
+    else:
+        yield from sorted((event for stream in streams for event in stream), key=key)
+
+class WorkerStats:
+    """Counters for this process, written to its own stats file at most every flush_secs"""
+
+    def __init__(self, data_dir, flush_secs=STATS_FLUSH_SECS):
+        self.stats_dir = Path(data_dir) / STATS_DIR
+        self.stats_dir.mkdir(parents=True, exist_ok=True)
+        self.flush_secs = flush_secs
+        self.counters = {}
+        self.started_at = time.time()
+        self._flushed_at = 0.0
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+
+    def incr(self, name, amount=1):
+        with self._lock:
+            if self._pid != os.getpid():
+                # Forked after creation: start this process's own counters
+                self.counters = {}
+                self.started_at = time.time()
+                self._pid = os.getpid()
+            self.counters[name] = self.counters.get(name, 0) + amount
+        self.flush()
+
+    def flush(self, force=False):
+        with self._lock:
+            now = time.time()
+            if not force and now - self._flushed_at < self.flush_secs:
+                return
+            self._flushed_at = now
+            path = self.stats_dir / f"worker.{self._pid}.json"
+            tmp = path.with_suffix(".tmp")
+            tmp.write_text(json.dumps({
+                "pid": self._pid,
+                "started_at": self.started_at,
+                "updated_at": now,
+                "counters": self.counters,
+            }))
+            os.replace(tmp, path)
+
+def _pid_running(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # exists, owned by someone else
+    return True
+
+def aggregate_stats(data_dir, stale_secs=STATS_STALE_SECS, now=None):
+    """
+    Sum the counters of the live workers' stats files in data_dir. Files
+    not updated for stale_secs whose pid has exited are listed with
+    "stale": True and summed separately under "stale_totals".
+    """
+    now = time.time() if now is None else now
+    totals, stale_totals = {}, {}
+    workers = []
+    for path in sorted((Path(data_dir) / STATS_DIR).glob("worker.*.json")):
+        try:
+            worker = json.loads(path.read_text())
+        except (OSError, ValueError):
+            continue  # replaced or removed while reading
+        stale = now - worker["updated_at"] > stale_secs and not _pid_running(worker["pid"])
+        workers.append({"pid": worker["pid"], "updated_at": worker["updated_at"], "stale": stale, **worker["counters"]})
+        target = stale_totals if stale else totals
+        for name, value in worker["counters"].items():
+            target[name] = target.get(name, 0) + value
+    return {"totals": totals, "stale_totals": stale_totals, "workers": workers}
@@ -4,24 +4,32 @@ SUPER SIMPLE WEBHOOK SERVER WITH MAXIMUM LOGGING
 Logs absolutely everything to help debug
 """
 from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from datetime import datetime
 import json
 from pathlib import Path
-import time
-import hmac
-from hashlib import sha256
 from dotenv import load_dotenv
 import os
 import boto3
 from botocore.exceptions import ClientError
 
+import call_archive
+import idempotency
+import ingest_scheduler
+import replay_guard
+import webhook_body
+import webhook_codec
+import webhook_log
+import webhook_signature
+
 # Load environment variables
 load_dotenv()
 
 app = FastAPI(title="ElevenLabs Webhook Server with AWS", version="2.0.0")
 
-# Webhook secret
+# Webhook secret (comma-separated while rotating: new,old)
 WEBHOOK_SECRET = os.getenv("ELEVENLABS_WEBHOOK_SECRET", "")
+signature_verifier = webhook_signature.SignatureVerifier(WEBHOOK_SECRET)
 
 # AWS Configuration
 AWS_REGION = os.getenv("AWS_REGION", "us-east-1")
@@ -31,6 +39,11 @@ AWS_SESSION_TOKEN = os.getenv("AWS_SESSION_TOKEN", "")
 DYNAMODB_TABLE = os.getenv("DYNAMODB_TABLE_NAME", "")
 S3_BUCKET = os.getenv("S3_BUCKET_NAME", "")
 
+# Batched S3 archival: pack up to N calls (or N ms worth) into one object.
+# 0 keeps one object per call.
+S3_BATCH_MAX_ITEMS = int(os.getenv("S3_BATCH_MAX_ITEMS", "0"))
+S3_BATCH_MAX_MS = int(os.getenv("S3_BATCH_MAX_MS", "500"))
+
 # Initialize AWS clients
 dynamodb = None
 s3_client = None
@@ -55,10 +68,74 @@ if AWS_ACCESS_KEY and AWS_SECRET_KEY:
     except Exception as e:
         print(f"⚠️  AWS initialization failed: {e}")
 
+def record_pack_locations(pack_key: str, entries: list):
+    """Store each batched call's pack key and byte range on its DynamoDB item"""
+    if not dynamodb or not DYNAMODB_TABLE:
+        return
+    table = dynamodb.Table(DYNAMODB_TABLE)
+    for entry in entries:
+        context = entry.get('context')
+        if not context:
+            continue
+        try:
+            table.update_item(
+                Key={'conversation_id': context['conversation_id'], 'timestamp': context['timestamp']},
+                UpdateExpression="SET s3_key = :key, s3_offset = :offset, s3_length = :length, s3_encoding = :encoding",
+                ExpressionAttributeValues={
+                    ':key': pack_key,
+                    ':offset': entry['offset'],
+                    ':length': entry['length'],
+                    ':encoding': entry['content_encoding']
+                }
+            )
+        except ClientError as e:
+            print(f"   ❌ DynamoDB pack index update failed for {context['conversation_id']}: {e}")
+
+def record_archive_location(s3_key: str, context: dict):
+    """Store the per-call object key of a batched call whose pack upload failed"""
+    if not dynamodb or not DYNAMODB_TABLE or not context:
+        return
+    try:
+        dynamodb.Table(DYNAMODB_TABLE).update_item(
+            Key={'conversation_id': context['conversation_id'], 'timestamp': context['timestamp']},
+            UpdateExpression="SET s3_key = :key",
+            ExpressionAttributeValues={':key': s3_key}
+        )
+    except ClientError as e:
+        print(f"   ❌ DynamoDB archive key update failed for {context['conversation_id']}: {e}")
+
+archive_batcher = None
+if s3_client and S3_BUCKET and S3_BATCH_MAX_ITEMS > 0:
+    archive_batcher = call_archive.ArchiveBatcher(
+        s3_client,
+        S3_BUCKET,
+        max_items=S3_BATCH_MAX_ITEMS,
+        max_wait_ms=S3_BATCH_MAX_MS,
+        on_flush=record_pack_locations,
+        on_fallback=record_archive_location
+    )
+
+# Duplicate deliveries short-circuit before any decoding or persistence
+ingest_guard = idempotency.IdempotencyGuard(client=dynamodb.meta.client if dynamodb else None)
+# Accepted (timestamp, signature) nonces; replays are dropped before hashing.
+# Each worker only sees its own requests; REPLAY_TABLE lets workers share them.
+nonce_guard = replay_guard.ReplayGuard(client=dynamodb.meta.client if dynamodb else None)
+
 # Data directory
 data_dir = Path("webhook_data")
 data_dir.mkdir(exist_ok=True)
 
+# Fields that decide a call's ingest priority; they sit in `analysis`, after the
+# transcript, but extracting them never builds the transcript turns
+PRIORITY_FIELDS = {
+    'severity': ('data', 'analysis', 'data_collection_results', 'severity'),
+    'emergency_type': ('data', 'analysis', 'data_collection_results', 'emergency_type'),
+}
+
+# Per-worker log segment and counters (safe with any number of worker processes)
+call_log = webhook_log.SegmentWriter(data_dir)
+worker_stats = webhook_log.WorkerStats(data_dir)
+
 def extract_metadata_from_elevenlabs(analysis: dict) -> dict:
     """
     Extract metadata from ElevenLabs data_collection_results.
@@ -133,21 +210,25 @@ def save_to_dynamodb(conversation_id: str, timestamp: int, call_data: dict, anal
         print(f"   ❌ DynamoDB save failed: {e}")
         return False
 
-def save_to_s3(conversation_id: str, data: dict) -> bool:
-    """Save full call data to S3"""
+def save_to_s3(conversation_id: str, data: dict, raw_body: bytes = None, timestamp: int = None) -> bool:
+    """
+    Archive full call data to S3 (the original request bytes when given).
+    In batched mode the call is queued for the next pack object and its byte
+    range is recorded on the DynamoDB item keyed by (conversation_id, timestamp).
+    """
     if not s3_client or not S3_BUCKET:
         print(f"   ⚠️  S3 not configured, skipping")
         return False
 
-    try:
-        s3_key = f"calls/{conversation_id}/{conversation_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    raw = raw_body if raw_body is not None else webhook_codec.dumps(data)
+    if archive_batcher:
+        context = {'conversation_id': conversation_id, 'timestamp': timestamp} if timestamp is not None else None
+        archive_batcher.add(conversation_id, raw, context=context)
+        print(f"   ✅ S3: Queued for batched archival")
+        return True
 
-        s3_client.put_object(
-            Bucket=S3_BUCKET,
-            Key=s3_key,
-            Body=json.dumps(data, indent=2),
-            ContentType='application/json'
-        )
+    try:
+        s3_key = call_archive.archive_payload(s3_client, S3_BUCKET, conversation_id, raw)
 
         print(f"   ✅ S3: Uploaded to s3://{S3_BUCKET}/{s3_key}")
         return True
@@ -155,6 +236,139 @@ def save_to_s3(conversation_id: str, data: dict) -> bool:
         print(f"   ❌ S3 upload failed: {e}")
         return False
 
+def reject(status_code: int, message: str):
+    """Log and answer a request refused before processing (bad signature, oversized body)"""
+    worker_stats.incr(f"rejected_{status_code}")
+    print(f"   ❌ {message}")
+    print("="*100 + "\n")
+    return JSONResponse(status_code=status_code, content={"status": "error", "message": message})
+
+def classify_priority(text: str) -> str:
+    """Ingest priority from the agent-extracted severity and emergency type"""
+    try:
+        fields = webhook_codec.extract_fields(text, PRIORITY_FIELDS)
+    except ValueError:
+        return "normal"
+    def get_value(field_data):
+        return field_data.get('value') if isinstance(field_data, dict) else field_data
+    return ingest_scheduler.classify(get_value(fields['severity']), get_value(fields['emergency_type']))
+
+def process_event(job: dict) -> bool:
+    """
+    Parse, log and persist one verified, deduplicated webhook. Returns False
+    when its dedup key was released so the sender's retry can store it.
+    """
+    body, text = job["body"], job["text"]
+    stored = True
+
+    # 6. PARSE JSON
+    print(f"\n📄 PARSING JSON:")
+    try:
+        data = webhook_codec.loads(text)
+        print(f"   Success: YES")
+        print(f"   Top-level keys: {list(data.keys())}")
+
+        # 7. EXTRACT KEY FIELDS
+        event_type = data.get("type", "UNKNOWN")
+        event_timestamp = data.get("event_timestamp", "UNKNOWN")
+
+        print(f"\n🔍 WEBHOOK EVENT:")
+        print(f"   Type: {event_type}")
+        print(f"   Timestamp: {event_timestamp}")
+
+        # 8. CHECK EVENT TYPE
+        if event_type == "post_call_transcription":
+            print(f"   ✅ CORRECT EVENT TYPE!")
+
+            call_data = data.get("data", {})
+            print(f"\n📞 CALL DATA:")
+            print(f"   Conversation ID: {call_data.get('conversation_id', 'MISSING')}")
+            print(f"   Agent ID: {call_data.get('agent_id', 'MISSING')}")
+            print(f"   Status: {call_data.get('status', 'MISSING')}")
+
+            transcript = call_data.get("transcript", [])
+            print(f"   Transcript turns: {len(transcript)}")
+
+            analysis = call_data.get("analysis", {})
+            summary = analysis.get("transcript_summary", "NO SUMMARY")
+            print(f"\n📝 SUMMARY:")
+            print(f"   {summary[:300]}...")
+
+            # 9. SAVE TO FILE (Local Backup)
+            conv_id = call_data.get('conversation_id', 'unknown')
+            filename = f"call_{conv_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+            filepath = data_dir / filename
+
+            with open(filepath, "wb") as f:
+                f.write(body)
+
+            print(f"\n💾 STORAGE (3 methods):")
+            print(f"   Local File: {filepath}")
+
+            # Save to this worker's log segment
+            call_log.append(webhook_codec.dumps(data))
+            print(f"   Local Log: {call_log.path}")
+
+            # 9.5 EXTRACT METADATA from ElevenLabs data_collection_results
+            metadata = extract_metadata_from_elevenlabs(analysis)
+
+            # 10. SAVE TO DYNAMODB (with extracted metadata)
+            dynamodb_success = save_to_dynamodb(
+                conversation_id=conv_id,
+                timestamp=event_timestamp,
+                call_data=call_data,
+                analysis=analysis,
+                metadata=metadata
+            )
+            # Let the sender's retry through if the call never reached the dashboard table
+            if not dynamodb_success:
+                release_delivery(job["dedup_key"], job["nonce"])
+                stored = False
+
+            # 11. SAVE TO S3
+            save_to_s3(conversation_id=conv_id, data=data, raw_body=body, timestamp=event_timestamp)
+            worker_stats.incr("processed")
+
+        elif event_type == "post_call_audio":
+            print(f"   ⚠️  WRONG EVENT TYPE: This is audio, not transcription!")
+            print(f"   You need to change the webhook event in ElevenLabs to 'post_call_transcription'")
+
+        else:
+            print(f"   ⚠️  UNKNOWN EVENT TYPE: {event_type}")
+            print(f"   Full data: {json.dumps(data, indent=2)[:1000]}")
+
+    except json.JSONDecodeError as e:
+        print(f"   Success: NO")
+        print(f"   Error: {e}")
+
+    print("\n✅ WEBHOOK PROCESSING COMPLETE")
+    print("="*100 + "\n")
+    return stored
+
+def release_delivery(dedup_key, nonce):
+    """Forget a delivery's dedup key and replay nonce so the sender's retry gets through"""
+    ingest_guard.release(dedup_key)
+    if nonce:
+        nonce_guard.release(*nonce)
+
+def process_queued_event(job: dict):
+    """Ingest worker: persist the call, then hold its dedup key for the full TTL"""
+    if process_event(job):
+        ingest_guard.commit(job["dedup_key"])
+
+def release_failed_event(job: dict, error: Exception):
+    """Let the sender's retry through when a queued call fails"""
+    worker_stats.incr("errors")
+    release_delivery(job["dedup_key"], job["nonce"])
+
+# INGEST_WORKERS > 0 opts into answering before the call is stored: verified calls are
+# queued per priority and persisted by that many threads. Their dedup keys are only held
+# for IDEMPOTENCY_INFLIGHT_SECS until stored, so a call lost with the process is retried.
+# The default (0) stores each call inside its request, in arrival order.
+call_scheduler = None
+if ingest_scheduler.INGEST_WORKERS > 0:
+    call_scheduler = ingest_scheduler.IngestScheduler(process_queued_event, on_error=release_failed_event)
+
 @app.post("/elevenlabs-webhook")
 async def webhook(request: Request):
     """
@@ -165,6 +379,9 @@ async def webhook(request: Request):
     print("🚨 WEBHOOK INCOMING!")
     print("="*100)
 
+    worker_stats.incr("received")
+    dedup_key = None
+    nonce = None
     try:
         # 1. LOG RAW REQUEST INFO
         print(f"\n📍 REQUEST INFO:")
@@ -179,148 +396,112 @@ async def webhook(request: Request):
             display_value = header_value[:200] + "..." if len(header_value) > 200 else header_value
             print(f"   {header_name}: {display_value}")
 
-        # 3. GET RAW BODY
-        body = await request.body()
-        print(f"\n📦 BODY INFO:")
-        print(f"   Size: {len(body)} bytes")
-        print(f"   First 500 chars: {body[:500].decode('utf-8', errors='ignore')}")
-
-        # 4. CHECK FOR SIGNATURE HEADER
+        # 3. CHECK FOR SIGNATURE HEADER (before reading the body)
         signature_header = request.headers.get("elevenlabs-signature", None)
         print(f"\n🔐 SIGNATURE:")
         if signature_header:
             print(f"   Found: YES")
             print(f"   Value: {signature_header}")
-
-            # Parse signature
-            headers_parts = signature_header.split(",")
-            timestamp = None
-            signature = None
-
-            for part in headers_parts:
-                if part.startswith("t="):
-                    timestamp = part[2:]
-                elif part.startswith("v0="):
-                    signature = part
-
-            print(f"   Timestamp: {timestamp}")
-            print(f"   Signature: {signature}")
-
-            # Validate timestamp
-            if timestamp:
-                req_timestamp = int(timestamp) * 1000
-                tolerance = int(time.time() * 1000) - (30 * 60 * 1000)
-                is_valid_time = req_timestamp > tolerance
-                print(f"   Timestamp valid: {is_valid_time}")
-
-            # Validate signature
-            if timestamp and signature and WEBHOOK_SECRET:
-                message = f"{timestamp}.{body.decode('utf-8')}"
-                expected_digest = 'v0=' + hmac.new(
-                    key=WEBHOOK_SECRET.encode("utf-8"),
-                    msg=message.encode("utf-8"),
-                    digestmod=sha256
-                ).hexdigest()
-                signature_matches = hmac.compare_digest(signature, expected_digest)
-                print(f"   Signature valid: {signature_matches}")
-                if not signature_matches:
-                    print(f"   Expected: {expected_digest}")
-                    print(f"   Received: {signature}")
         else:
             print(f"   Found: NO")
             print(f"   ⚠️  WARNING: No signature header found!")
 
-        # 5. PARSE JSON
-        print(f"\n📄 PARSING JSON:")
+        pending = None
+        if signature_verifier.enabled:
+            try:
+                pending = signature_verifier.start(signature_header)
+            except webhook_signature.SignatureError as e:
+                return reject(401, f"Signature rejected: {e.reason}")
+            if nonce_guard.seen(pending.timestamp, pending.signatures):
+                worker_stats.incr("replayed")
+                print(f"   🔁 Replayed request, ignoring")
+                print("="*100 + "\n")
+                return {"status": "ignored", "message": "Replayed request"}
+
+        # 4. STREAM RAW BODY (size-capped, hashed as it arrives, decoded once)
         try:
-            data = json.loads(body.decode('utf-8'))
-            print(f"   Success: YES")
-            print(f"   Top-level keys: {list(data.keys())}")
+            body = await webhook_body.read_body(request, signature=pending)
+        except webhook_body.BodyRejected as e:
+            return reject(e.status_code, e.message)
+
+        if pending is not None:
+            if not pending.matches():
+                return reject(401, "Signature rejected: invalid")
+            if not nonce_guard.claim(pending.timestamp, pending.matched):
+                worker_stats.incr("replayed")
+                print(f"   🔁 Replayed request, ignoring")
+                print("="*100 + "\n")
+                return {"status": "ignored", "message": "Replayed request"}
+            nonce = (pending.timestamp, pending.matched)
+            print(f"   Signature valid: True")
 
-            # 6. EXTRACT KEY FIELDS
-            event_type = data.get("type", "UNKNOWN")
-            event_timestamp = data.get("event_timestamp", "UNKNOWN")
-
-            print(f"\n🔍 WEBHOOK EVENT:")
-            print(f"   Type: {event_type}")
-            print(f"   Timestamp: {event_timestamp}")
-
-            # 7. CHECK EVENT TYPE
-            if event_type == "post_call_transcription":
-                print(f"   ✅ CORRECT EVENT TYPE!")
-
-                call_data = data.get("data", {})
-                print(f"\n📞 CALL DATA:")
-                print(f"   Conversation ID: {call_data.get('conversation_id', 'MISSING')}")
-                print(f"   Agent ID: {call_data.get('agent_id', 'MISSING')}")
-                print(f"   Status: {call_data.get('status', 'MISSING')}")
-
-                transcript = call_data.get("transcript", [])
-                print(f"   Transcript turns: {len(transcript)}")
+        try:
+            text = webhook_body.decode_body(body)
+        except webhook_body.BodyRejected as e:
+            return reject(e.status_code, e.message)
+        print(f"\n📦 BODY INFO:")
+        print(f"   Size: {len(body)} bytes")
+        print(f"   First 500 chars: {text[:500]}")
 
-                analysis = call_data.get("analysis", {})
-                summary = analysis.get("transcript_summary", "NO SUMMARY")
-                print(f"\n📝 SUMMARY:")
-                print(f"   {summary[:300]}...")
-
-                # 8. SAVE TO FILE (Local Backup)
-                conv_id = call_data.get('conversation_id', 'unknown')
-                filename = f"call_{conv_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-                filepath = data_dir / filename
-
-                with open(filepath, "w") as f:
-                    json.dump(data, f, indent=2)
-
-                print(f"\n💾 STORAGE (3 methods):")
-                print(f"   Local File: {filepath}")
-
-                # Save to log
-                log_file = data_dir / "webhook_log.jsonl"
-                with open(log_file, "a") as f:
-                    f.write(json.dumps(data) + "\n")
-                print(f"   Local Log: {log_file}")
-
-                # 8.5 EXTRACT METADATA from ElevenLabs data_collection_results
-                metadata = extract_metadata_from_elevenlabs(analysis)
-
-                # 9. SAVE TO DYNAMODB (with extracted metadata)
-                save_to_dynamodb(
-                    conversation_id=conv_id,
-                    timestamp=event_timestamp,
-                    call_data=call_data,
-                    analysis=analysis,
-                    metadata=metadata
-                )
-
-                # 10. SAVE TO S3
-                save_to_s3(conversation_id=conv_id, data=data)
-
-            elif event_type == "post_call_audio":
-                print(f"   ⚠️  WRONG EVENT TYPE: This is audio, not transcription!")
-                print(f"   You need to change the webhook event in ElevenLabs to 'post_call_transcription'")
-
-            else:
-                print(f"   ⚠️  UNKNOWN EVENT TYPE: {event_type}")
-                print(f"   Full data: {json.dumps(data, indent=2)[:1000]}")
-
-        except json.JSONDecodeError as e:
-            print(f"   Success: NO")
-            print(f"   Error: {e}")
-
-        print("\n✅ WEBHOOK PROCESSING COMPLETE")
+        # 4.5 SKIP REDELIVERED CALLS
+        try:
+            fields = webhook_codec.extract_fields(text)
+        except ValueError:
+            fields = None  # malformed; reported by the full parse below
+        if fields and fields['type'] == "post_call_transcription":
+            dedup_key = idempotency.idempotency_key(
+                fields['conversation_id'], fields['event_timestamp'], signature_header
+            )
+            inflight_secs = idempotency.IDEMPOTENCY_INFLIGHT_SECS if call_scheduler else None
+            if not ingest_guard.claim(dedup_key, ttl_secs=inflight_secs):
+                worker_stats.incr("duplicates")
+                print(f"\n🔁 DUPLICATE DELIVERY: {fields['conversation_id']} already processed, skipping")
+                print("="*100 + "\n")
+                return {"status": "duplicate", "message": "Webhook already processed"}
+
+        # 5. QUEUE BY PRIORITY (severity/type read without decoding the transcript)
+        job = {"body": body, "text": text, "dedup_key": dedup_key, "nonce": nonce}
+        if call_scheduler is None:
+            process_event(job)
+            return {"status": "success", "message": "Webhook received"}
+
+        priority = classify_priority(text)
+        try:
+            call_scheduler.submit(priority, job)
+        except ingest_scheduler.QueueFull as e:
+            release_delivery(dedup_key, nonce)
+            return reject(503, f"Ingest queue full: {e}")
+        print(f"\n📥 QUEUED: priority {priority} (depth {call_scheduler.depth(priority)})")
         print("="*100 + "\n")
-
-        return {"status": "success", "message": "Webhook received"}
+        return {"status": "queued", "message": "Webhook received", "priority": priority}
 
     except Exception as e:
         print(f"\n❌ EXCEPTION OCCURRED:")
         print(f"   Type: {type(e).__name__}")
         print(f"   Message: {str(e)}")
+        worker_stats.incr("errors")
+        release_delivery(dedup_key, nonce)
         import traceback
         traceback.print_exc()
         print("="*100 + "\n")
         return {"status": "error", "message": str(e)}
 
+@app.on_event("shutdown")
+def flush_archive_batcher():
+    if call_scheduler:
+        # Finish queued calls before the final flushes; release the rest for the sender's retry
+        leftover = call_scheduler.close(timeout=30)
+        for job in leftover:
+            release_delivery(job["dedup_key"], job["nonce"])
+        if leftover:
+            print(f"⚠️  Released {len(leftover)} queued calls at shutdown")
+    if archive_batcher:
+        unwritten = archive_batcher.close()
+        if unwritten:
+            worker_stats.incr("archive_dropped", len(unwritten))
+    call_log.close()
+    worker_stats.flush(force=True)
+
 @app.get("/")
 async def root():
     return {"message": "Simple ElevenLabs Webhook Server", "status": "running"}
@@ -329,30 +510,50 @@ async def root():
 async def recent_calls():
     """Get recent calls with summaries"""
     try:
-        log_file = data_dir / "webhook_log.jsonl"
-        if not log_file.exists():
+        if not webhook_log.segment_paths(data_dir):
             return {"calls": [], "message": "No calls yet"}
 
+        # Merge every worker's segment in event_timestamp order
         calls = []
-        with open(log_file, "r") as f:
-            for line in f:
-                event = json.loads(line.strip())
-                if event.get("type") == "post_call_transcription":
-                    call_data = event.get("data", {})
-                    analysis = call_data.get("analysis", {})
-                    calls.append({
-                        "conversation_id": call_data.get("conversation_id"),
-                        "summary": analysis.get("transcript_summary"),
-                        "timestamp": event.get("event_timestamp")
-                    })
+        for event in webhook_log.iter_events(data_dir, loads=webhook_codec.loads):
+            if event.get("type") == "post_call_transcription":
+                call_data = event.get("data", {})
+                analysis = call_data.get("analysis", {})
+                calls.append({
+                    "conversation_id": call_data.get("conversation_id"),
+                    "summary": analysis.get("transcript_summary"),
+                    "timestamp": event.get("event_timestamp")
+                })
 
         return {"calls": calls[-10:], "total": len(calls)}
 
     except Exception as e:
         return {"error": str(e)}
 
+@app.get("/queue")
+async def queue_metrics():
+    """This worker's ingest queue depth and per-priority latency"""
+    if call_scheduler is None:
+        return {"enabled": False}
+    return {"enabled": True, "pid": os.getpid(), **call_scheduler.metrics()}
+
+@app.get("/stats")
+async def stats():
+    """Request counters summed across live worker processes (exited ones under stale_totals)"""
+    worker_stats.flush(force=True)
+    return webhook_log.aggregate_stats(data_dir)
+
 if __name__ == "__main__":
+    import argparse
     import uvicorn
+
+    parser = argparse.ArgumentParser(description="ElevenLabs webhook server")
+    parser.add_argument("--host", default="0.0.0.0", help="Bind address")
+    parser.add_argument("--port", type=int, default=8000, help="Port")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEBHOOK_WORKERS", "1")),
+                        help="Worker processes (each keeps its own log segment and counters)")
+    args = parser.parse_args()
+
     print("="*80)
     print("🚀 Starting ElevenLabs Webhook Server with AWS Integration")
     print("="*80)
@@ -360,6 +561,7 @@ if __name__ == "__main__":
     print(f"   Data directory: {data_dir.absolute()}")
     print(f"\n🔐 Security:")
     print(f"   Webhook secret: {'✅ Configured' if WEBHOOK_SECRET else '❌ Missing'}")
+    print(f"   Max body size: {webhook_body.WEBHOOK_MAX_BODY_BYTES:,} bytes")
     print(f"\n☁️  AWS Configuration:")
     print(f"   Region: {AWS_REGION}")
     print(f"   DynamoDB Table: {DYNAMODB_TABLE if DYNAMODB_TABLE else '❌ Not configured'}")
@@ -368,6 +570,13 @@ if __name__ == "__main__":
     print(f"\n💾 Storage Methods:")
     print(f"   1. Local files: ✅ Active")
     print(f"   2. DynamoDB: {'✅ Active' if dynamodb else '⚠️  Disabled'}")
-    print(f"   3. S3: {'✅ Active' if s3_client else '⚠️  Disabled'}")
+    print(f"   3. S3: {'✅ Active' if s3_client else '⚠️  Disabled'}"
+          f"{f' (batched: {S3_BATCH_MAX_ITEMS} calls / {S3_BATCH_MAX_MS} ms)' if archive_batcher else ''}")
+    print(f"\n⚙️  Workers: {args.workers}")
+    print(f"   Ingest threads per worker: {ingest_scheduler.INGEST_WORKERS or 'inline (FIFO)'}")
     print("="*80 + "\n")
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    if args.workers > 1:
+        # Workers import the app themselves, so it has to be passed as an import string
+        uvicorn.run("webhook_server:app", host=args.host, port=args.port, workers=args.workers)
+    else:
+        uvicorn.run(app, host=args.host, port=args.port)
\ No newline at end of file
@@ -0,0 +1,130 @@
+"""
+Signature verification for ElevenLabs webhooks
+
+The `elevenlabs-signature` header is `t=<unix secs>,v0=<hex hmac-sha256>` where
+the HMAC covers `<t>.<raw body>`. SignatureVerifier keys one HMAC state per
+secret up front and copies it per request, hashes the raw body bytes as they
+are (no decode/encode round trip), and rejects stale or malformed headers
+before hashing anything. Several secrets can be active at once so the secret
+can be rotated without dropping deliveries.
+"""
+import hmac
+import os
+import time
+from hashlib import sha256
+
+SIGNATURE_TOLERANCE_SECS = int(os.environ.get('SIGNATURE_TOLERANCE_SECS', str(30 * 60)))
+# More v0= entries than a rotation needs only serve to vary the header of a replay
+MAX_SIGNATURES = 4
+
+class SignatureError(ValueError):
+    """Rejected signature; `reason` is missing, malformed, stale or invalid"""
+
+    def __init__(self, reason):
+        super().__init__(f"Signature {reason}")
+        self.reason = reason
+
+def parse_secrets(value):
+    """Comma-separated secrets (newest first) -> list, ignoring blanks"""
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.split(',')
+    return [secret.strip() for secret in value if secret and secret.strip()]
+
+def parse_header(header):
+    """Return (timestamp, [v0 signatures]) from the header; timestamp is None if absent or not an int"""
+    timestamp = None
+    signatures = []
+    for part in header.split(','):
+        part = part.strip()
+        if part.startswith('t='):
+            try:
+                timestamp = int(part[2:])
+            except ValueError:
+                return None, []
+        elif part.startswith('v0='):
+            signatures.append(part[3:].encode('ascii', 'replace'))
+    return timestamp, signatures
+
+class PendingSignature:
+    """
+    A header that passed the cheap checks; feed it the body with update()
+    (all at once or chunk by chunk) and call matches() at the end. It returns
+    the header signature that verified (also kept as `matched`), or None;
+    that signature plus the timestamp is the request's replay nonce.
+    """
+
+    def __init__(self, signers, timestamp, signatures):
+        self.timestamp = timestamp
+        self.signatures = signatures
+        self.matched = None
+        prefix = str(timestamp).encode('ascii') + b'.'
+        self._macs = []
+        for signer in signers:
+            mac = signer.copy()
+            mac.update(prefix)
+            self._macs.append(mac)
+
+    def update(self, chunk):
+        for mac in self._macs:
+            mac.update(chunk)
+
+    def matches(self):
+        for mac in self._macs:
+            expected = mac.hexdigest().encode('ascii')
+            for signature in self.signatures:
+                if hmac.compare_digest(expected, signature):
+                    self.matched = signature
+                    return signature
+        return None
+
+class SignatureVerifier:
+    """
+    verify(body, header) -> bool for one-shot checks, or start(header) for
+    incremental hashing. With no secrets configured, verification is
+    disabled (`enabled` is False) and callers decide what to accept.
+    """
+
+    def __init__(self, secrets, tolerance_secs=SIGNATURE_TOLERANCE_SECS):
+        self.tolerance_secs = tolerance_secs
+        self._signers = [hmac.new(secret.encode('utf-8'), digestmod=sha256) for secret in parse_secrets(secrets)]
+
+    @property
+    def enabled(self):
+        return bool(self._signers)
+
+    def start(self, header, now=None):
+        """Check the header's shape and freshness; raises SignatureError before any hashing"""
+        if not header:
+            raise SignatureError('missing')
+        timestamp, signatures = parse_header(header)
+        if timestamp is None or not signatures or len(signatures) > MAX_SIGNATURES:
+            raise SignatureError('malformed')
+        now = time.time() if now is None else now
+        if abs(now - timestamp) > self.tolerance_secs:
+            raise SignatureError('stale')
+        return PendingSignature(self._signers, timestamp, signatures)
+
+    def check(self, body, header, now=None):
+        """Raise SignatureError unless the header signs body (bytes) with an active secret"""
+        pending = self.start(header, now)
+        pending.update(body)
+        if not pending.matches():
+            raise SignatureError('invalid')
+        return pending
+
+    def verify(self, body, header, now=None):
+        try:
+            self.check(body, header, now)
+            return True
+        except SignatureError:
+            return False
+
+    def sign(self, body, timestamp=None):
+        """Header for body signed with the newest secret (for tests and load generators)"""
+        timestamp = int(time.time()) if timestamp is None else int(timestamp)
+        mac = self._signers[0].copy()
+        mac.update(str(timestamp).encode('ascii') + b'.')
+        mac.update(body)
+        return f"t={timestamp},v0={mac.hexdigest()}"
@@ -5,92 +5,51 @@ import random
 import time
 import os
 
+import summary_cache
+import summary_templates
+from simulation_scenarios import SCENARIOS
+
+try:
+    import simulation_engine
+    import simulation_shards
+    import simulation_sinks
+except ImportError:  # NumPy not packaged with this deployment
+    simulation_engine = None
+    simulation_shards = None
+
 # Initialize AWS clients
 bedrock = boto3.client('bedrock-runtime')
 dynamodb = boto3.resource('dynamodb')
+_lambda_client = None
+ai_summary_cache = summary_cache.SummaryCache()
 
 # Configuration
 DEFAULT_TABLE_NAME = os.environ.get('DYNAMODB_TABLE', 'wildfire-simulation-calls')
 DEFAULT_REGION = os.environ.get('AWS_REGION', 'us-east-1')
 DEFAULT_BEDROCK_MODEL = os.environ.get('BEDROCK_MODEL', 'us.anthropic.claude-3-5-sonnet-20241022-v2:0')
+# Calls per shard when a request doesn't ask for a shard count (0 = never shard automatically)
+SHARD_SIZE = int(os.environ.get('SHARD_SIZE', '0'))
 
-# Scenario configurations
-SCENARIOS = {
-    'la_wildfire': {
-        'name': 'Los Angeles Wildfire',
-        'locations': [
-            {'area': 'Pacific Palisades', 'lat': 34.0453, 'lon': -118.5270},
-            {'area': 'Malibu', 'lat': 34.0259, 'lon': -118.7798},
-            {'area': 'Topanga', 'lat': 34.0941, 'lon': -118.6018},
-            {'area': 'Brentwood', 'lat': 34.0622, 'lon': -118.4747},
-            {'area': 'Santa Monica Mountains', 'lat': 34.0954, 'lon': -118.7513}
-        ],
-        'streets': ['Sunset Mesa Dr', 'Palisades Dr', 'Via de la Paz', 'Porto Marina Way', 'Revello Dr'],
-        'emergency_types': [
-            {'type': 'structure_fire', 'desc': 'house fire with family evacuating', 'sev': 'critical'},
-            {'type': 'evacuation_assistance', 'desc': 'resident needs evacuation help', 'sev': 'high'},
-            {'type': 'trapped_person', 'desc': 'person trapped by fire', 'sev': 'critical'},
-            {'type': 'medical_emergency', 'desc': 'smoke inhalation injury', 'sev': 'high'},
-            {'type': 'shelter_information', 'desc': 'evacuee requesting shelter location', 'sev': 'moderate'}
-        ]
-    },
-    'hurricane_florida': {
-        'name': 'Florida Hurricane',
-        'locations': [
-            {'area': 'Miami Beach', 'lat': 25.7907, 'lon': -80.1300},
-            {'area': 'Fort Lauderdale', 'lat': 26.1224, 'lon': -80.1373},
-            {'area': 'West Palm Beach', 'lat': 26.7153, 'lon': -80.0534}
-        ],
-        'streets': ['Ocean Dr', 'Collins Ave', 'Washington Ave', 'Lincoln Rd', 'Alton Rd'],
-        'emergency_types': [
-            {'type': 'flooding', 'desc': 'severe flooding in home', 'sev': 'critical'},
-            {'type': 'wind_damage', 'desc': 'roof damaged by wind', 'sev': 'high'},
-            {'type': 'power_outage', 'desc': 'power lines down', 'sev': 'high'},
-            {'type': 'evacuation_needed', 'desc': 'requesting evacuation', 'sev': 'critical'}
-        ]
-    },
-    'earthquake_sf': {
-        'name': 'San Francisco Earthquake',
-        'locations': [
-            {'area': 'Marina District', 'lat': 37.8033, 'lon': -122.4377},
-            {'area': 'Mission District', 'lat': 37.7599, 'lon': -122.4148},
-            {'area': 'Financial District', 'lat': 37.7946, 'lon': -122.3999}
-        ],
-        'streets': ['Market St', 'Mission St', 'Valencia St', 'Folsom St', 'Howard St'],
-        'emergency_types': [
-            {'type': 'building_collapse', 'desc': 'partial building collapse', 'sev': 'critical'},
-            {'type': 'gas_leak', 'desc': 'gas leak detected', 'sev': 'critical'},
-            {'type': 'trapped_person', 'desc': 'person trapped in debris', 'sev': 'critical'},
-            {'type': 'medical_injury', 'desc': 'injuries from falling objects', 'sev': 'high'}
-        ]
-    },
-    'nashville_tornado': {
-        'name': 'Nashville Tornado Outbreak',
-        'locations': [
-            {'area': 'Downtown Nashville', 'lat': 36.1627, 'lon': -86.7816},
-            {'area': 'East Nashville', 'lat': 36.1714, 'lon': -86.7489},
-            {'area': 'Germantown', 'lat': 36.1752, 'lon': -86.7845},
-            {'area': 'The Gulch', 'lat': 36.1540, 'lon': -86.7782},
-            {'area': 'Music Row', 'lat': 36.1487, 'lon': -86.7977}
-        ],
-        'streets': ['Broadway', 'Music Valley Dr', 'Dickerson Pike', 'Gallatin Pike', 'Woodland St', 'Main St', 'Church St'],
-        'emergency_types': [
-            {'type': 'building_damage', 'desc': 'severe structural damage from tornado', 'sev': 'critical'},
-            {'type': 'trapped_person', 'desc': 'person trapped in collapsed building', 'sev': 'critical'},
-            {'type': 'debris_injury', 'desc': 'injuries from flying debris', 'sev': 'high'},
-            {'type': 'power_lines_down', 'desc': 'downed power lines blocking road', 'sev': 'high'},
-            {'type': 'gas_leak', 'desc': 'gas line ruptured by tornado', 'sev': 'critical'},
-            {'type': 'vehicle_accident', 'desc': 'multi-vehicle accident during storm', 'sev': 'high'},
-            {'type': 'shelter_needed', 'desc': 'displaced resident needs shelter', 'sev': 'moderate'}
-        ]
-    }
-}
+def get_lambda_client():
+    """Lambda client for shard self-invocations: long read timeout, no retries (a retry would re-run a shard)"""
+    global _lambda_client
+    if _lambda_client is None:
+        from botocore.config import Config
+        _lambda_client = boto3.client('lambda', config=Config(read_timeout=900, retries={'max_attempts': 0}))
+    return _lambda_client
 
 def lambda_handler(event, context):
     """
     Generalized emergency call simulator
     """
     
+    # Shard worker: invoked directly by a sharded run, not through API Gateway
+    if 'shard' in event:
+        shard = event['shard']
+        print(f"🧩 Running shard {shard['shard_index'] + 1}/{shard['shard_count']} ({shard['num_calls']} calls)")
+        sink = simulation_sinks.DynamoDBSink(event.get('table_name', DEFAULT_TABLE_NAME), dynamodb=dynamodb)
+        return simulation_shards.run_shard(shard, [sink])
+    
     print("🚨 Starting Emergency Call Simulation")
     
     # Parse request parameters
@@ -99,6 +58,10 @@ def lambda_handler(event, context):
     num_calls = body.get('num_calls', 1)
     scenario_name = body.get('scenario', 'la_wildfire')
     table_name = body.get('table_name', DEFAULT_TABLE_NAME)
+    seed = body.get('seed')
+    start_ts = body.get('start_ts', int(time.time()))
+    shards = int(body.get('shards') or (-(-num_calls // SHARD_SIZE) if SHARD_SIZE else 1))
+    wait_for_shards = not body.get('async', False)
     
     # Validate scenario
     if scenario_name not in SCENARIOS:
@@ -122,6 +85,57 @@ def lambda_handler(event, context):
     print(f"Generating {num_calls} calls to table {table_name}")
     print(f"Generation method: {generation_method}")
     
+    # Template runs always use (and report) a concrete seed so they can be repeated;
+    # Bedrock and random-module generation aren't seeded, so they report none
+    use_engine = not use_ai and simulation_engine is not None
+    seed = simulation_engine.resolve_seed(seed) if use_engine else None
+
+    shard_plan = []
+    if use_engine and simulation_shards and shards > 1 and context is not None:
+        seed, shard_plan = simulation_shards.plan_shards(scenario_name, num_calls, shards, seed, start_ts)
+        generation_method += f", {len(shard_plan)} shards"
+        print(f"Fanning out to {len(shard_plan)} shards (root seed {seed})")
+        results = simulation_shards.run_lambda(
+            shard_plan, get_lambda_client(), context.invoked_function_arn, table_name, wait=wait_for_shards
+        )
+        successful, sample_calls, errors = simulation_shards.aggregate(results)
+    elif use_engine:
+        successful, sample_calls, errors = write_vectorized_calls(table, num_calls, scenario_name, seed, start_ts)
+    else:
+        successful, sample_calls, errors = write_calls(table, num_calls, scenario_name, scenario, use_ai)
+    
+    queued = bool(shard_plan) and not wait_for_shards
+    if queued:
+        message = f'Queued {len(shard_plan)} shards of {scenario["name"]} calls'
+        print(f"✅ {message}")
+    else:
+        message = f'Generated {successful} calls for {scenario["name"]}'
+        print(f"✅ Completed: {successful}/{num_calls} successful")
+    
+    return {
+        'statusCode': 202 if queued else 200,
+        'headers': {
+            'Content-Type': 'application/json',
+            'Access-Control-Allow-Origin': '*'
+        },
+        'body': json.dumps({
+            'message': message,
+            'scenario': scenario_name,
+            'total_requested': num_calls,
+            'successful': successful,
+            'failed': len(errors),
+            'generation_method': generation_method,
+            'seed': seed,
+            'start_ts': start_ts if use_engine else None,
+            'shards': len(shard_plan) or 1,
+            'sample_calls': sample_calls[:5],
+            'errors': errors[:3] if errors else []
+        }, indent=2)
+    }
+
+def write_calls(table, num_calls, scenario_name, scenario, use_ai):
+    """Generate and write calls one at a time (used for Bedrock summaries)"""
+    
     # Generate unique locations for all calls upfront
     unique_locations = generate_unique_locations(num_calls, scenario)
     
@@ -147,25 +161,40 @@ def lambda_handler(event, context):
             print(f"✗ {error_msg}")
             errors.append(error_msg)
     
-    print(f"✅ Completed: {len(generated_calls)}/{num_calls} successful")
+    return len(generated_calls), generated_calls[:5], errors
+
+def write_vectorized_calls(table, num_calls, scenario_name, seed=None, start_ts=None):
+    """
+    Template-mode bulk path: sample calls in columnar NumPy batches and
+    write them with DynamoDB batch writes (reproducible for a given seed + start_ts)
+    """
+    successful = 0
+    sample_calls = []
+    errors = []
+    
+    for compiled, batch in simulation_engine.generate_batches(scenario_name, num_calls, seed, start_ts):
+        records = simulation_engine.batch_to_records(compiled, batch)
+        try:
+            with table.batch_writer() as writer:
+                for call in records:
+                    writer.put_item(Item=call)
+            successful += len(records)
+        except Exception as e:
+            error_msg = f"Error writing calls {int(batch['index'][0]) + 1}-{int(batch['index'][-1]) + 1}: {str(e)}"
+            print(f"✗ {error_msg}")
+            errors.append(error_msg)
+            continue
+        
+        if len(sample_calls) < 5:
+            sample_calls.extend({
+                'call_id': call['call_id'],
+                'location': call['location']['area'],
+                'emergency_type': call['emergency_type']
+            } for call in records[:5 - len(sample_calls)])
+        
+        print(f"✓ Progress: {successful}/{num_calls}")
     
-    return {
-        'statusCode': 200,
-        'headers': {
-            'Content-Type': 'application/json',
-            'Access-Control-Allow-Origin': '*'
-        },
-        'body': json.dumps({
-            'message': f'Generated {len(generated_calls)} calls for {scenario["name"]}',
-            'scenario': scenario_name,
-            'total_requested': num_calls,
-            'successful': len(generated_calls),
-            'failed': len(errors),
-            'generation_method': generation_method,
-            'sample_calls': generated_calls[:5],
-            'errors': errors[:3] if errors else []
-        }, indent=2)
-    }
+    return successful, sample_calls, errors
 
 def generate_unique_locations(num_calls, scenario):
     """
@@ -241,7 +270,7 @@ def generate_call(idx, total, scenario, scenario_name, use_ai, unique_location):
     emergency = random.choice(scenario['emergency_types'])
     
     # Generate summary (AI or template based on batch size)
-    summary = generate_ai_summary(emergency['desc'], address, use_ai)
+    summary = generate_ai_summary(emergency['desc'], address, use_ai, scenario_name, emergency['sev'])
     
     # Calculate realistic metrics
     duration = calculate_duration(emergency['sev'])
@@ -279,50 +308,23 @@ def generate_call(idx, total, scenario, scenario_name, use_ai, unique_location):
     
     return call_record
 
-def generate_ai_summary(emergency_desc, address, use_ai=True):
+def generate_ai_summary(emergency_desc, address, use_ai=True, scenario_name='la_wildfire', severity=None):
     """
     Generate summary - uses AI for small batches, templates for large batches
     """
     
     # For bulk operations (>20 calls), use templates to avoid throttling
     if not use_ai:
-        templates = [
-            f"Caller reported {emergency_desc} at {address}. Emergency services have been dispatched to the scene.",
-            f"911 dispatch received report of {emergency_desc} at {address}. First responders en route with ETA 5-7 minutes.",
-            f"Emergency call regarding {emergency_desc} at {address}. Fire and EMS units notified and responding.",
-            f"Dispatch center received call about {emergency_desc} at {address}. Multiple units have been deployed.",
-            f"Report of {emergency_desc} at {address}. Emergency personnel dispatched immediately to location.",
-        ]
-        return random.choice(templates)
-    
-    # For small batches (≤20 calls), use Bedrock AI for realistic variety
-    prompt = f"Write a brief 2-sentence 911 dispatcher summary for: {emergency_desc} at {address}. Include emergency services dispatched."
+        return summary_templates.render_summary(scenario_name, SCENARIOS[scenario_name], emergency_desc, address, severity)
     
+    # For small batches (≤20 calls), use Bedrock AI for realistic variety (cached per prompt, address templated out)
     try:
-        response = bedrock.invoke_model(
-            modelId=DEFAULT_BEDROCK_MODEL,
-            body=json.dumps({
-                "anthropic_version": "bedrock-2023-05-31",
-                "max_tokens": 200,
-                "temperature": 0.8,
-                "messages": [{
-                    "role": "user",
-                    "content": prompt
-                }]
-            })
+        return summary_cache.cached_summary(
+            bedrock, DEFAULT_BEDROCK_MODEL, emergency_desc, address, temperature=0.8, cache=ai_summary_cache
         )
-        
-        result = json.loads(response['body'].read())
-        return result['content'][0]['text'].strip()
-        
     except Exception as e:
         print(f"Bedrock error (falling back to template): {e}")
-        # Fallback to template
-        templates = [
-            f"Caller reported {emergency_desc} at {address}. Fire and EMS units dispatched to scene.",
-            f"Emergency call regarding {emergency_desc} at {address}. First responders en route.",
-        ]
-        return random.choice(templates)
+        return summary_templates.render_summary(scenario_name, SCENARIOS[scenario_name], emergency_desc, address, severity)
 
 def calculate_duration(severity):
     """Calculate realistic call duration based on severity"""